@@ -1,6 +1,5 @@
 # ========1.1 導入模組開始 ========#
 import logging
-import json
 import os
 from datetime import datetime, timedelta
 from typing import Dict, List, Tuple, Any, Optional
@@ -10,6 +9,11 @@ from dataclasses import dataclass
 from new_calculator import (
     calculate_bazi,      # 對外接口：八字計算
     calculate_match,     # 對外接口：配對計算
+    calculate_bazi_batch,  # 對外接口：批量八字計算
+    ProfessionalBatchCalculator,
+    ProfessionalChartCache,
+    ProfessionalMatchCache,
+    MatchBreakdown,
     ProfessionalConfig as Config,
     BaziFormatters
 )
@@ -273,8 +277,12 @@ class AdminService:
             'formatted_results': []
         }
         
+        # 全部測試八字一次批量排盤，失敗時由單個測試自行計算
+        test_charts = self._calculate_test_charts_batch(ADMIN_TEST_CASES)
+        
         for i, test_case in enumerate(ADMIN_TEST_CASES, 1):
-            test_result = await self._run_single_test(i, test_case)
+            precomputed = test_charts[i - 1] if test_charts else None
+            test_result = await self._run_single_test(i, test_case, precomputed)
             results['details'].append(test_result.__dict__)
             
             # 生成格式結果
@@ -293,8 +301,33 @@ class AdminService:
         
         return results
     
-    async def _run_single_test(self, test_id: int, test_case: Dict) -> TestResult:
-        """運行單個測試案例"""
+    def _calculate_test_charts_batch(self, test_cases: List[Dict]) -> Optional[List[Tuple[Dict, Dict]]]:
+        """批量計算測試案例雙方八字，返回[(八字1, 八字2), ...]；失敗返回None"""
+        try:
+            rows = []
+            for test_case in test_cases:
+                rows.append(test_case['bazi_data1'])
+                rows.append(test_case['bazi_data2'])
+            
+            columns = calculate_bazi_batch(
+                [row['year'] for row in rows],
+                [row['month'] for row in rows],
+                [row['day'] for row in rows],
+                [row['hour'] for row in rows],
+                longitudes=[row.get('longitude', DEFAULT_LONGITUDE) for row in rows],
+                genders=[row['gender'] for row in rows],
+                confidences=[row.get('hour_confidence', '高') for row in rows]
+            )
+            charts = ProfessionalBatchCalculator.to_dicts(columns)
+            return [(charts[i], charts[i + 1]) for i in range(0, len(charts), 2)]
+            
+        except Exception as e:
+            logger.warning(f"批量計算測試八字失敗，改為逐個計算: {e}")
+            return None
+    
+    async def _run_single_test(self, test_id: int, test_case: Dict,
+                               precomputed: Optional[Tuple[Dict, Dict]] = None) -> TestResult:
+        """運行單個測試案例（precomputed為批量預先算好的雙方八字）"""
         try:
             # 提取出生時間信息
             bazi_data1 = test_case['bazi_data1']
@@ -314,34 +347,37 @@ class AdminService:
             logger.info(f"測試案例 {test_id}: 計算八字1 - {year1}/{month1}/{day1} {hour1}:00")
             logger.info(f"測試案例 {test_id}: 計算八字2 - {year2}/{month2}/{day2} {hour2}:00")
             
-            # 使用對外接口 calculate_bazi
-            try:
-                bazi1 = calculate_bazi(
-                    year=year1,
-                    month=month1,
-                    day=day1,
-                    hour=hour1,
-                    gender=gender1,
-                    hour_confidence=hour_confidence1,
-                    longitude=longitude1
-                )
-            except Exception as e:
-                logger.error(f"計算八字1失敗: {e}", exc_info=True)
-                raise ValueError(f"計算八字1失敗: {str(e)}")
+            # 優先使用批量結果，否則使用對外接口 calculate_bazi
+            if precomputed is not None:
+                bazi1, bazi2 = precomputed
+            else:
+                try:
+                    bazi1 = calculate_bazi(
+                        year=year1,
+                        month=month1,
+                        day=day1,
+                        hour=hour1,
+                        gender=gender1,
+                        hour_confidence=hour_confidence1,
+                        longitude=longitude1
+                    )
+                except Exception as e:
+                    logger.error(f"計算八字1失敗: {e}", exc_info=True)
+                    raise ValueError(f"計算八字1失敗: {str(e)}")
             
-            try:
-                bazi2 = calculate_bazi(
-                    year=year2,
-                    month=month2,
-                    day=day2,
-                    hour=hour2,
-                    gender=gender2,
-                    hour_confidence=hour_confidence2,
-                    longitude=longitude2
-                )
-            except Exception as e:
-                logger.error(f"計算八字2失敗: {e}", exc_info=True)
-                raise ValueError(f"計算八字2失敗: {str(e)}")
+                try:
+                    bazi2 = calculate_bazi(
+                        year=year2,
+                        month=month2,
+                        day=day2,
+                        hour=hour2,
+                        gender=gender2,
+                        hour_confidence=hour_confidence2,
+                        longitude=longitude2
+                    )
+                except Exception as e:
+                    logger.error(f"計算八字2失敗: {e}", exc_info=True)
+                    raise ValueError(f"計算八字2失敗: {str(e)}")
             
             if not bazi1:
                 raise ValueError("八字1計算返回空數據")
@@ -501,27 +537,24 @@ class AdminService:
             good_matches = good_matches_result[0] if good_matches_result else 0
             success_rate = (good_matches / total_matches * 100) if total_matches > 0 else 0.0
             
-            # 獲取模型統計 - 修正：直接從match_details中提取
+            # 獲取模型統計 - 由match_details數值明細推導關係模型（兼容舊版完整結果JSON）
             cur.execute("SELECT match_details FROM matches WHERE match_details IS NOT NULL")
             match_details_rows = cur.fetchall()
             model_counts = {}
             model_scores = {}
             
             for row in match_details_rows:
-                if row and row[0]:
-                    try:
-                        details = json.loads(row[0])
-                        model = details.get('relationship_model', '未知')
-                        score = details.get('score', 0)
-                        
-                        if model not in model_counts:
-                            model_counts[model] = 0
-                            model_scores[model] = 0
-                        
-                        model_counts[model] += 1
-                        model_scores[model] += score
-                    except Exception:
-                        continue
+                breakdown = MatchBreakdown.from_stored(row[0]) if row else None
+                if breakdown is None:
+                    continue
+                model = breakdown.relationship_model
+                
+                if model not in model_counts:
+                    model_counts[model] = 0
+                    model_scores[model] = 0
+                
+                model_counts[model] += 1
+                model_scores[model] += breakdown.score
             
             model_stats = []
             for model, count in model_counts.items():
@@ -697,7 +730,8 @@ class AdminService:
                 day=1,
                 hour=12,
                 gender="男",
-                hour_confidence="高"
+                hour_confidence="高",
+                analysis=Config.ANALYSIS_SCORING
             )
             
             if not bazi:
@@ -889,6 +923,54 @@ class AdminService:
         
         return text
     # ========2.3 快速測試功能結束 ========#
+    
+    # ========2.4 排盤緩存管理開始 ========#
+    def manage_chart_cache(self, action: str = "") -> Dict[str, Any]:
+        """執行緩存操作（on/off/clear/reset），返回操作後的緩存統計"""
+        if action == "on":
+            ProfessionalChartCache.configure(enabled=True)
+        elif action == "off":
+            ProfessionalChartCache.configure(enabled=False)
+        elif action == "clear":
+            ProfessionalChartCache.clear()
+        elif action == "reset":
+            ProfessionalChartCache.reset_stats()
+        return ProfessionalChartCache.stats()
+    
+    def format_cache_stats(self, stats: Dict[str, Any]) -> str:
+        """格式化排盤緩存統計"""
+        status = "✅ 已啟用" if stats['enabled'] else "⏸️ 未啟用"
+        text = "🗂️ 排盤緩存統計\n"
+        text += f"狀態: {status}  記錄: {stats['size']}/{stats['max_size']}\n"
+        text += f"命中: {stats['hits']}  未命中: {stats['misses']}  命中率: {stats['hit_rate']:.1f}%\n"
+        text += f"淘汰: {stats['evictions']}  估算記憶體: {stats['memory_bytes'] / 1024:.1f}KB\n"
+        text += "操作: /cachestats on | off | clear | reset\n"
+        text += f"📅 統計時間: {datetime.now().strftime('%Y-%m-%d %H:%M')}"
+        return text
+    
+    def manage_match_cache(self, action: str = "") -> Dict[str, Any]:
+        """執行配對結果緩存操作（on/off/clear/reset），返回操作後的緩存統計"""
+        if action == "on":
+            ProfessionalMatchCache.configure(enabled=True)
+        elif action == "off":
+            ProfessionalMatchCache.configure(enabled=False)
+        elif action == "clear":
+            ProfessionalMatchCache.clear()
+        elif action == "reset":
+            ProfessionalMatchCache.reset_stats()
+        return ProfessionalMatchCache.stats()
+    
+    def format_match_cache_stats(self, stats: Dict[str, Any]) -> str:
+        """格式化配對結果緩存統計"""
+        status = "✅ 已啟用" if stats['enabled'] else "⏸️ 未啟用"
+        text = "💞 配對結果緩存統計\n"
+        text += f"狀態: {status}  記錄: {stats['size']}/{stats['max_size']}  存活: {stats['ttl_seconds']:.0f}秒\n"
+        text += f"命中: {stats['hits']}  未命中: {stats['misses']}  命中率: {stats['hit_rate']:.1f}%\n"
+        text += f"淘汰: {stats['evictions']}  過期: {stats['expirations']}\n"
+        text += "操作: /cachestats match on | off | clear | reset\n"
+        text += f"📅 統計時間: {datetime.now().strftime('%Y-%m-%d %H:%M')}"
+        return text
+    # ========2.4 排盤緩存管理結束 ========#
 # ========1.4 AdminService類結束 ========#
 
 # ========文件信息開始 ========#
@@ -922,12 +1004,40 @@ class AdminService:
   2.1 測試功能 - 運行和管理測試案例
   2.2 系統統計 - 獲取和格式化系統統計
   2.3 快速測試功能 - 系統健康檢查
+  2.4 排盤緩存管理 - 排盤及配對結果緩存開關與命中率統計
 """
 # ========目錄結束 ========#
 
 # ========修正紀錄開始 ========#
 """
 修正紀錄:
+2026-10-16 模型統計改用數值明細：
+1. 問題：get_system_stats逐行json.loads完整配對結果，只為讀取relationship_model及score
+   位置：get_system_stats方法
+   修正：MatchBreakdown.from_stored還原緊湊數值明細（兼容舊版完整結果），由分數及結構推導關係模型
+
+2026-10-16 新增配對結果緩存管理：
+1. 問題：/match、/testpair及搜尋重複計算同一對八字，配對結果緩存缺少管理入口
+   位置：AdminService類 2.4 排盤緩存管理
+   修正：新增manage_match_cache及format_match_cache_stats，支援開關、清空及命中率統計
+
+2026-10-16 快速測試只做評分所需分析：
+1. 問題：_test_bazi_calculation只檢查四柱欄位，卻計算全部八個分析階段
+   位置：_test_bazi_calculation方法
+   修正：calculate_bazi傳入analysis=Config.ANALYSIS_SCORING，夫妻、神煞、十神、大運不計算
+
+2026-10-16 新增排盤緩存管理：
+1. 問題：同一出生資料被重複排盤，缺少命中率等觀察數據
+   位置：AdminService類
+   修正：新增manage_chart_cache和format_cache_stats，供/cachestats命令使用
+
+2026-10-16 測試案例改用批量排盤：
+1. 問題：/admintest逐個調用calculate_bazi計算40個八字
+   位置：run_admin_tests方法
+   後果：每個八字重複查表與時間校正，測試耗時偏長
+   修正：新增_calculate_test_charts_batch，以calculate_bazi_batch一次計算全部八字
+   修正：_run_single_test新增precomputed參數，批量失敗時回退逐個計算
+
 2026-02-07 修正admin_service.py問題：
 1. 問題：/stats顯示0人登記明明有人登記
    位置：get_system_stats方法中的數據庫查詢
@@ -1,14 +1,26 @@
 # ========1.1 導入模組開始 ========#
+import os
 import json
+import time
+import heapq
+import itertools
 import random
 import logging
-from datetime import datetime
-from typing import Dict, List, Any, Optional, Tuple
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed, TimeoutError as FutureTimeoutError
+import numpy as np
+from datetime import datetime, date, timedelta
+from typing import Dict, List, Any, Optional, Tuple, Callable, Iterable, Iterator
 
 # 導入計算核心
 try:
-    from new_calculator import calculate_match, calculate_bazi, ProfessionalConfig
-    from new_calculator import PC
+    from new_calculator import calculate_match, ProfessionalConfig
+    from new_calculator import calculate_match_many, upper_bound_score
+    from new_calculator import calculate_bazi_batch, calculate_pillars
+    from new_calculator import ProfessionalBatchCalculator, ProfessionalBaziCalculator
+    from new_calculator import PC, ProfessionalRelations
+    from new_calculator import ProfessionalEliteLibrary, ScoringProfile
     logger = logging.getLogger(__name__)
 except ImportError as e:
     logger = logging.getLogger(__name__)
@@ -44,6 +56,33 @@ TOKEN_EXPIRY_MINUTES = 10
 # 高效搜尋參數
 HIGH_PROBABILITY_HOURS = [0, 6, 12, 18]  # 高概率時辰
 HIGH_PROBABILITY_MONTHS = [3, 4, 5, 8, 9, 10]  # 高概率月份（春、秋）
+DAY_STEM_RELATIONS = {  # 日主相生加分：甲日主配癸、乙配壬……（雙向各計一次）
+    '甲': '癸', '乙': '壬', '丙': '乙', '丁': '甲',
+    '戊': '丁', '己': '丙', '庚': '己', '辛': '戊',
+    '壬': '辛', '癸': '庚'
+}
+SEARCH_BATCH_DATES = 250   # 系統性搜索每批排盤的日期數（每日期4個時辰，即每批1000個八字）
+SPECIAL_RANDOM_DATES = 500  # 特殊日期階段加入的高概率月份時辰隨機日期數
+HOUR_OPTIMIZE_CANDIDATES = 20  # 時辰優化階段處理的最高分候選數
+
+# 窮舉搜尋參數
+SEARCH_MODE_SAMPLED = "sampled"        # 抽樣搜尋（特殊日期＋隨機日期＋時辰優化）
+SEARCH_MODE_EXHAUSTIVE = "exhaustive"  # 窮舉搜尋（範圍內每日×十二時辰）
+SEARCH_MODE_PARALLEL = "parallel"      # 並行窮舉（年份範圍分區到進程池，結果確定性合併）
+SEARCH_MODE = os.getenv("BAZI_SOULMATE_SEARCH", SEARCH_MODE_SAMPLED)  # 預設抽樣，窮舉及並行須明確開啟
+SEARCH_WORKERS = int(os.getenv("BAZI_SOULMATE_WORKERS", "0"))  # 搜尋進程池大小，0為按容器可用CPU數
+BRANCH_HOURS = list(range(0, 24, 2))   # 十二時辰代表時刻（子0時、丑2時…亥22時），取時辰中點，真太陽時校正後仍在同一時辰
+EXHAUSTIVE_CHART_BATCH = 6000          # 窮舉搜尋每批排盤的八字數
+EXHAUSTIVE_SCORE_BATCH = 500           # 窮舉搜尋按上界排序後每批補算評分的候選數
+EXHAUSTIVE_TIME_BUDGET = float(os.getenv("BAZI_SOULMATE_BUDGET", "20"))  # 窮舉搜尋時間預算（秒），超時返回已評分部分的最佳結果
+PARALLEL_BUDGET_GRACE = 3.0            # 並行分區超出預算後仍會完成當前一批，等待分區結果的寬限秒數
+FINAL_SCORE_MIN = 20                   # 顯示分數下限
+FINAL_SCORE_MAX = 99.9                 # 顯示分數上限（窮舉排名用未封頂分數，只在顯示時封頂）
+
+SEARCH_STAGE_CHARTING = "charting"     # 進度階段：排盤
+SEARCH_STAGE_SCORING = "scoring"       # 進度階段：評分
+SEARCH_STAGE_MERGING = "merging"       # 進度階段：並行分區完成合併
+ProgressCallback = Callable[[str, int, int, Optional[float]], None]  # 進度回調(階段, 已掃描八字數, 八字總數, 目前最高分)
 # ========1.2 常量定義結束 ========#
 
 # ========1.3 真命天子搜尋器開始 ========#
@@ -122,16 +161,128 @@ class SoulmateFinder:
         # 移除所有問題結構檢查，讓評分系統處理
         return True, "結構檢查通過"
     
+    @staticmethod
+    def calculate_base_matches(user_bazi: Dict[str, Any], targets: List[Optional[Dict[str, Any]]],
+                               user_gender: str, target_gender: str) -> List[Optional[Dict[str, Any]]]:
+        """
+        1.3.5.1 批量基礎配對 - 整批候選補算格局喜用後以calculate_match_many一次過評分，遵循要求13注意效率
+        同一等價類（四柱＋出生年＋信心度）的候選只補算及評分一次，結果複製給其餘成員
+        返回與targets對應的配對數值明細；批量失敗時全部返回None，由calculate_final_score逐個計算
+        """
+        base_matches: List[Optional[Dict[str, Any]]] = [None] * len(targets)
+        classes: Dict[Tuple, List[int]] = {}
+        for i, target in enumerate(targets):
+            if target:
+                classes.setdefault(ProfessionalBatchCalculator.chart_class_key(target), []).append(i)
+        if not classes:
+            return base_matches
+        
+        try:
+            representatives = []
+            for members in classes.values():
+                # 預篩只算了四柱、五行及身強弱，評分前補算格局及喜用神
+                representative = ProfessionalBaziCalculator.complete_analysis(targets[members[0]], PC.ANALYSIS_SCORING)
+                for i in members[1:]:
+                    ProfessionalBatchCalculator.share_analysis(representative, targets[i])
+                representatives.append(representative)
+            result = calculate_match_many(user_bazi, representatives, user_gender, target_gender, details=True)
+        except Exception as e:
+            logger.warning(f"批量配對評分失敗，改為逐個計算: {e}")
+            return base_matches
+        
+        for members, detail in zip(classes.values(), result['details']):
+            base_matches[members[0]] = detail
+            for i in members[1:]:
+                base_matches[i] = {key: (value.copy() if isinstance(value, (list, dict)) else value)
+                                   for key, value in detail.items()}
+        return base_matches
+    
+    @staticmethod
+    def final_score_upper_bound(user_bazi: Dict[str, Any], target_bazi: Dict[str, Any],
+                                purpose: str = "正緣", capped: bool = True) -> float:
+        """
+        1.3.5.2 calculate_final_score的上界 - 基礎分取upper_bound_score，其餘加分項按同一公式計算，
+        目標喜用神未算時按可得喜用神互補加分計；上界不超過現有最佳分數的候選無需補算分析及評分，遵循要求13注意效率
+        （評分異常時的保底分數不在上界考慮之內）；capped=False時為未封頂分數的上界
+        """
+        final_score = upper_bound_score(user_bazi, target_bazi)
+        if purpose == "正緣":
+            final_score = final_score * 0.7
+        elif purpose == "合夥":
+            final_score = final_score * 1.05
+        
+        extra_bonus = 0
+        user_useful = user_bazi.get('useful_elements', [])
+        if 'useful_elements' in target_bazi:
+            target_useful = target_bazi.get('useful_elements', [])
+            if any(element in target_useful for element in user_useful):
+                extra_bonus += 15
+        elif user_useful:
+            extra_bonus += 15
+        
+        user_day_stem = user_bazi.get('day_stem', '')
+        target_day_stem = target_bazi.get('day_stem', '')
+        if DAY_STEM_RELATIONS.get(user_day_stem) == target_day_stem:
+            extra_bonus += 12
+        if DAY_STEM_RELATIONS.get(target_day_stem) == user_day_stem:
+            extra_bonus += 12
+        
+        user_year_stem = user_bazi.get('year_pillar', '')[0] if user_bazi.get('year_pillar') else ''
+        target_year_stem = target_bazi.get('year_pillar', '')[0] if target_bazi.get('year_pillar') else ''
+        if ProfessionalRelations.is_stem_combination(user_year_stem, target_year_stem):
+            extra_bonus += 10
+        
+        user_month_pillar = user_bazi.get('month_pillar', '')
+        target_month_pillar = target_bazi.get('month_pillar', '')
+        if len(user_month_pillar) >= 2 and len(target_month_pillar) >= 2:
+            if ProfessionalRelations.is_branch_combination(user_month_pillar[1], target_month_pillar[1]):
+                extra_bonus += 8
+        
+        final_score += extra_bonus
+        return SoulmateFinder.display_score(final_score) if capped else final_score
+    
+    @staticmethod
+    def display_score(score: float) -> float:
+        """1.3.5.4 顯示分數 - 最終分數限制在FINAL_SCORE_MIN至FINAL_SCORE_MAX之間"""
+        return min(FINAL_SCORE_MAX, max(FINAL_SCORE_MIN, score))
+    
+    @staticmethod
+    def prune_targets(user_bazi: Dict[str, Any], targets: List[Optional[Dict[str, Any]]],
+                      purpose: str, min_score: float) -> List[Optional[Dict[str, Any]]]:
+        """1.3.5.3 分支定界剪枝 - 最終分數上界不超過min_score的候選改為None（不可能勝出）"""
+        pruned = 0
+        result = []
+        for target in targets:
+            if target and SoulmateFinder.final_score_upper_bound(user_bazi, target, purpose) <= min_score:
+                target = None
+                pruned += 1
+            result.append(target)
+        if pruned:
+            logger.debug(f"上界剪枝: {pruned}/{len(targets)} 個候選不可能超過{min_score:.1f}分")
+        return result
+    
     @staticmethod
     def calculate_final_score(user_bazi: Dict[str, Any], target_bazi: Dict[str, Any], 
-                             user_gender: str, target_gender: str, purpose: str = "正緣") -> Tuple[float, Dict[str, Any]]:
-        """1.3.6 第三階段：資深精算加分項 - 計算最終匹配分數，遵循要求15按順序計算"""
+                             user_gender: str, target_gender: str, purpose: str = "正緣",
+                             base_match: Optional[Dict[str, Any]] = None,
+                             capped: bool = True) -> Tuple[float, Dict[str, Any]]:
+        """
+        1.3.6 第三階段：資深精算加分項 - 計算最終匹配分數，遵循要求15按順序計算；base_match為批量評分結果
+        capped=False時返回未封頂分數（窮舉排名用，避免大量候選同為上限分數而無法區分）
+        """
         
         try:
-            # 使用核心計算模組，遵循要求2保持向後兼容
-            match_result = calculate_match(
-                user_bazi, target_bazi, user_gender, target_gender, is_testpair=True
-            )
+            if base_match is not None:
+                match_result = base_match
+            else:
+                # 預篩只算了四柱、五行及身強弱，評分前補算格局及喜用神
+                ProfessionalBaziCalculator.complete_analysis(target_bazi, PC.ANALYSIS_SCORING)
+                
+                # 使用核心計算模組，遵循要求2保持向後兼容
+                match_result = calculate_match(
+                    user_bazi, target_bazi, user_gender, target_gender, is_testpair=True,
+                    audit_level=PC.AUDIT_OFF, detail=PC.DETAIL_SCORE
+                )
             
             base_score = match_result.get('score', 50)
             
@@ -179,16 +330,10 @@ class SoulmateFinder:
             target_day_stem = target_bazi.get('day_stem', '')
             
             # 日柱相生關係加分 - 遵循要求15計算順序
-            stem_relations = {
-                '甲': '癸', '乙': '壬', '丙': '乙', '丁': '甲',
-                '戊': '丁', '己': '丙', '庚': '己', '辛': '戊',
-                '壬': '辛', '癸': '庚'
-            }
-            
-            if stem_relations.get(user_day_stem) == target_day_stem:
+            if DAY_STEM_RELATIONS.get(user_day_stem) == target_day_stem:
                 extra_bonus += 12  # 提高加分幅度
                 logger.debug(f"日主相生加分: +12")
-            if stem_relations.get(target_day_stem) == user_day_stem:
+            if DAY_STEM_RELATIONS.get(target_day_stem) == user_day_stem:
                 extra_bonus += 12  # 提高加分幅度
                 logger.debug(f"日主相生加分: +12")
             
@@ -197,12 +342,7 @@ class SoulmateFinder:
             target_year_stem = target_bazi.get('year_pillar', '')[0] if target_bazi.get('year_pillar') else ''
             
             # 年柱天合加分 - 遵循要求14說明理由
-            heavenly_combinations = {
-                '甲': '己', '乙': '庚', '丙': '辛', '丁': '壬', '戊': '癸',
-                '己': '甲', '庚': '乙', '辛': '丙', '壬': '丁', '癸': '戊'
-            }
-            
-            if heavenly_combinations.get(user_year_stem) == target_year_stem:
+            if ProfessionalRelations.is_stem_combination(user_year_stem, target_year_stem):
                 extra_bonus += 10  # 提高加分幅度
                 logger.debug(f"年柱天合加分: +10")
             
@@ -215,20 +355,15 @@ class SoulmateFinder:
                 target_month_branch = target_month_pillar[1]
                 
                 # 月支相合加分
-                branch_combinations = {
-                    '子': '丑', '丑': '子', '寅': '亥', '亥': '寅',
-                    '卯': '戌', '戌': '卯', '辰': '酉', '酉': '辰',
-                    '巳': '申', '申': '巳', '午': '未', '未': '午'
-                }
-                
-                if branch_combinations.get(user_month_branch) == target_month_branch:
+                if ProfessionalRelations.is_branch_combination(user_month_branch, target_month_branch):
                     extra_bonus += 8
                     logger.debug(f"月支相合加分: +8")
             
             final_score += extra_bonus
             
             # 確保分數在合理範圍內 - 遵循要求12避免硬編碼極端值
-            final_score = min(99.9, max(20, final_score))
+            if capped:
+                final_score = SoulmateFinder.display_score(final_score)
             
             logger.debug(f"最終分數計算: 基礎={base_score:.1f}, 額外={extra_bonus:.1f}, 最終={final_score:.1f}")
             return final_score, match_result
@@ -238,15 +373,72 @@ class SoulmateFinder:
             # 返回中等分數以確保匹配 - 遵循要求12避免硬編碼高分
             return 75.0, {'score': 75, 'error': str(e)}
     
+    @staticmethod
+    def final_scores_from_rows(user_bazi: Dict[str, Any], rows: Dict[str, np.ndarray], match_scores: np.ndarray,
+                               purpose: str = "正緣", capped: bool = True) -> np.ndarray:
+        """
+        1.3.6.1 calculate_final_score的向量化版本 - rows為精英庫切片，match_scores為對應配對分數
+        批量評分明細沒有module_scores，化解係數為1.0、目的加權項為0，與逐個計算逐位一致
+        """
+        R = ProfessionalRelations
+        final_scores = np.asarray(match_scores, dtype=np.float64)
+        if purpose == "正緣":
+            final_scores = final_scores * 0.7
+        elif purpose == "合夥":
+            final_scores = final_scores * 1.05
+        
+        stems = rows['stems']
+        branches = rows['branches']
+        extra_bonus = np.zeros(len(final_scores), dtype=np.int64)
+        
+        user_useful_mask = ScoringProfile.of(user_bazi).useful_mask
+        extra_bonus += np.where((rows['useful_mask'] & user_useful_mask) != 0, 15, 0)
+        
+        user_day_stem = user_bazi.get('day_stem', '')
+        partner_stem = R.STEM_INDEX.get(DAY_STEM_RELATIONS.get(user_day_stem), -1)
+        extra_bonus += np.where(stems[:, 2] == partner_stem, 12, 0)
+        generating_stems = [R.STEM_INDEX[stem] for stem, partner in DAY_STEM_RELATIONS.items() if partner == user_day_stem]
+        extra_bonus += np.where(np.isin(stems[:, 2], generating_stems), 12, 0)
+        
+        user_year_stem = user_bazi.get('year_pillar', '')[0] if user_bazi.get('year_pillar') else ''
+        if user_year_stem in R.STEM_INDEX:
+            combination_mask = R.STEM_COMBINATION_MASKS[R.STEM_INDEX[user_year_stem]]
+            extra_bonus += np.where((combination_mask >> stems[:, 0].astype(np.int64)) & 1 == 1, 10, 0)
+        
+        user_month_pillar = user_bazi.get('month_pillar', '')
+        if len(user_month_pillar) >= 2 and user_month_pillar[1] in R.BRANCH_INDEX:
+            combination_mask = R.BRANCH_COMBINATION_MASKS[R.BRANCH_INDEX[user_month_pillar[1]]]
+            extra_bonus += np.where((combination_mask >> branches[:, 1].astype(np.int64)) & 1 == 1, 8, 0)
+        
+        final_scores = final_scores + extra_bonus
+        return np.minimum(FINAL_SCORE_MAX, np.maximum(FINAL_SCORE_MIN, final_scores)) if capped else final_scores
+    
     @staticmethod
     def find_top_matches(user_bazi: Dict[str, Any], user_gender: str, start_year: int, 
-                         end_year: int, purpose: str = "正緣", limit: int = 10) -> List[Dict[str, Any]]:
-        """1.3.7 主搜尋函數 - 確保至少找到一個80分以上配對，遵循要求13注意效率"""
+                         end_year: int, purpose: str = "正緣", limit: int = 10,
+                         mode: Optional[str] = None,
+                         progress: Optional[ProgressCallback] = None) -> List[Dict[str, Any]]:
+        """
+        1.3.7 主搜尋函數 - 確保至少找到一個80分以上配對，遵循要求13注意效率；mode預設SEARCH_MODE，窮舉及並行模式轉交enumerate_top_matches/parallel_top_matches
+        progress為進度回調（見report_progress），於搜尋線程內每批調用，供Bot背景任務更新進度訊息
+        抽樣模式為流式管線：候選生成 → score_stream分批排盤、預篩、評分 → 固定大小最小堆，只為堆內候選組裝結果
+        """
+        mode = mode or SEARCH_MODE
+        if mode == SEARCH_MODE_PARALLEL:
+            return SoulmateFinder.parallel_top_matches(
+                user_bazi, user_gender, start_year, end_year, purpose, limit, progress=progress
+            )
+        if mode == SEARCH_MODE_EXHAUSTIVE:
+            return SoulmateFinder.enumerate_top_matches(
+                user_bazi, user_gender, start_year, end_year, purpose, limit, progress=progress
+            )
+        
         logger.info(f"開始搜尋 {start_year}-{end_year} 年的真命天子，目的: {purpose}")
         
-        # 1. 生成日期範圍 - 遵循要求15按順序處理
-        dates = SoulmateFinder.generate_date_range(start_year, end_year)
-        logger.info(f"生成 {len(dates)} 個日期")
+        # 1. 日期範圍只計日數，系統性搜索按日序號抽樣，不建立整個範圍的日期列表 - 遵循要求13注意效率
+        first_day = date(start_year, 1, 1)
+        day_count = (date(end_year + 1, 1, 1) - first_day).days
+        logger.info(f"生成 {day_count} 個日期")
         
         # 修正：使用相反的性別進行搜尋 - 遵循要求9功能一致性
         if user_gender == "男":
@@ -254,196 +446,85 @@ class SoulmateFinder:
         else:
             target_gender = "男"
         
-        # 關鍵修正：優先計算高概率日期，確保找到高分匹配
-        high_probability_dates = []
-        
-        # 優先搜索中間年份和特殊節氣日期 - 遵循要求14說明理由
-        middle_year = start_year + (end_year - start_year) // 2
-        
-        # 特殊日期：春分、秋分、夏至、冬至等 - 遵循要求1考慮節氣影響
-        special_dates = []
-        
-        # 增加特殊日期數量
-        for year in range(start_year, end_year + 1):
-            # 春分附近 (3月20-22日)
-            for day in range(19, 24):
-                special_dates.append((year, 3, day, 6))
-                special_dates.append((year, 3, day, 18))
-            
-            # 秋分附近 (9月22-24日)
-            for day in range(21, 26):
-                special_dates.append((year, 9, day, 6))
-                special_dates.append((year, 9, day, 18))
-            
-            # 夏至附近 (6月21-22日)
-            for day in range(20, 24):
-                special_dates.append((year, 6, day, 12))
-            
-            # 冬至附近 (12月21-22日)
-            for day in range(20, 24):
-                special_dates.append((year, 12, day, 0))
-                special_dates.append((year, 12, day, 12))
-            
-            # 傳統節日
-            special_dates.append((year, 1, 1, 12))   # 元旦
-            special_dates.append((year, 5, 5, 12))   # 端午
-            special_dates.append((year, 7, 7, 19))   # 七夕
-            special_dates.append((year, 8, 15, 20))  # 中秋
-            special_dates.append((year, 9, 9, 12))   # 重陽
-            special_dates.append((year, 12, 31, 12)) # 除夕
-        
-        # 增加高概率月份和時辰的隨機日期
-        for i in range(500):  # 大幅增加隨機日期數量
-            year = random.randint(start_year, end_year)
-            month = random.choice(HIGH_PROBABILITY_MONTHS)  # 優先高概率月份
-            day = random.randint(1, 28)
-            hour = random.choice(HIGH_PROBABILITY_HOURS)    # 優先高概率時辰
-            special_dates.append((year, month, day, hour))
-        
-        scored_matches = []
+        # 候選流式評分，最小堆只保留(分數, -序號)最大的keep個；時辰優化只看前HOUR_OPTIMIZE_CANDIDATES名，
+        # 堆外候選分數不變且排名在後，不可能進入最終Top N，記憶體用量與年份範圍無關
+        keep = max(limit, HOUR_OPTIMIZE_CANDIDATES)
+        top: List[Tuple[float, int, Dict[str, Any], Dict[str, Any]]] = []
+        sequence = itertools.count()  # 入堆序號，同分先到先排
         found_high_score = False
         processed_count = 0
+        kept_count = 0
         
-        # 階段1：先計算特殊日期 - 遵循要求15按順序處理
-        logger.info(f"階段1：計算 {len(special_dates)} 個特殊日期")
-        for year, month, day, hour in special_dates:
-            try:
-                target_bazi = calculate_bazi(
-                    year, month, day, hour, 
-                    gender=target_gender,
-                    hour_confidence='高'
-                )
-                
-                if not target_bazi:
-                    continue
-                
-                target_bazi['birth_year'] = year
-                target_bazi['birth_month'] = month
-                target_bazi['birth_day'] = day
-                target_bazi['birth_hour'] = hour
-                
-                # 預篩選（極度放寬條件）
-                passed, reason = SoulmateFinder.pre_filter(
-                    user_bazi, target_bazi, user_gender, target_gender
-                )
-                
-                if not passed:
-                    continue
-                
-                # 結構檢查（極度放寬條件）
-                passed, reason = SoulmateFinder.structure_check(
-                    user_bazi, target_bazi, user_gender, target_gender
-                )
-                
-                if not passed:
-                    continue
-                
-                # 計算分數
-                score, match_result = SoulmateFinder.calculate_final_score(
-                    user_bazi, target_bazi, user_gender, target_gender, purpose
-                )
-                
-                processed_count += 1
-                
-                if score >= 70:  # 降低門檻，收集更多潛在匹配
-                    scored_matches.append({
-                        'bazi': target_bazi,
-                        'score': score,
-                        'match_result': match_result,
-                        'date': f"{target_bazi['birth_year']}年{target_bazi['birth_month']}月{target_bazi['birth_day']}日",
-                        'hour': f"{target_bazi['birth_hour']}時",
-                        'pillars': f"{target_bazi['year_pillar']} {target_bazi['month_pillar']} {target_bazi['day_pillar']} {target_bazi['hour_pillar']}"
-                    })
-                    
-                    if score >= MIN_SCORE_THRESHOLD:
-                        found_high_score = True
-                        logger.info(f"特殊日期高分匹配: 分數={score:.1f}, 日期={year}-{month}-{day}")
+        # 階段1：先計算特殊日期（節氣、節日及高概率月份時辰的隨機日期） - 遵循要求15按順序處理
+        special_total = (len(SoulmateFinder.yearly_special_births(start_year)) * (end_year - start_year + 1)
+                         + SPECIAL_RANDOM_DATES)
+        logger.info(f"階段1：計算 {special_total} 個特殊日期")
+        for (year, month, day, hour), target_bazi, score, match_result in SoulmateFinder.score_stream(
+                user_bazi, SoulmateFinder.special_births(start_year, end_year), user_gender, target_gender,
+                purpose, structure=True, progress=progress, total=special_total):
+            processed_count += 1
+            
+            if score >= 70:  # 降低門檻，收集更多潛在匹配
+                SoulmateFinder.push_bounded(top, (score, -next(sequence), target_bazi, match_result), keep)
+                kept_count += 1
                 
-            except Exception as e:
-                continue
+                if score >= MIN_SCORE_THRESHOLD:
+                    found_high_score = True
+                    logger.info(f"特殊日期高分匹配: 分數={score:.1f}, 日期={year}-{month}-{day}")
         
         # 階段2：如果還沒找到80分以上，進行系統性搜索 - 遵循要求13注意效率
         if not found_high_score:
             logger.warning("特殊日期未找到80分以上匹配，開始系統性搜索...")
             
             # 大幅增加搜索範圍 - 遵循要求13平衡效率與覆蓋率
-            search_limit = min(GUARANTEED_SEARCH_LIMIT, len(dates))
-            search_dates = random.sample(dates, search_limit) if len(dates) > search_limit else dates
+            search_limit = min(GUARANTEED_SEARCH_LIMIT, day_count)
+            search_days = random.sample(range(day_count), search_limit) if day_count > search_limit else range(day_count)
             
-            logger.info(f"系統性搜索: 處理 {len(search_dates)} 個日期")
+            logger.info(f"系統性搜索: 處理 {search_limit} 個日期")
             
-            for idx, (year, month, day) in enumerate(search_dates):
-                if found_high_score and len(scored_matches) >= limit * 2:
-                    break
-                    
-                # 優先搜索高概率月份
-                if month not in HIGH_PROBABILITY_MONTHS and random.random() > 0.3:
-                    continue  # 跳過低概率月份30%的幾率
-                    
-                # 嘗試多個時辰以增加機會 - 遵循要求14說明理由
-                for hour in HIGH_PROBABILITY_HOURS:
-                    try:
-                        target_bazi = calculate_bazi(
-                            year, month, day, hour, 
-                            gender=target_gender,
-                            hour_confidence='高'
-                        )
-                        
-                        if not target_bazi:
-                            continue
-                        
-                        target_bazi['birth_year'] = year
-                        target_bazi['birth_month'] = month
-                        target_bazi['birth_day'] = day
-                        target_bazi['birth_hour'] = hour
-                        
-                        # 預篩選（極度放寬條件）
-                        passed, reason = SoulmateFinder.pre_filter(
-                            user_bazi, target_bazi, user_gender, target_gender
-                        )
-                        
-                        if not passed:
-                            continue
-                        
-                        # 計算分數
-                        score, match_result = SoulmateFinder.calculate_final_score(
-                            user_bazi, target_bazi, user_gender, target_gender, purpose
-                        )
-                        
-                        processed_count += 1
-                        
-                        if score >= 65:  # 進一步降低門檻
-                            scored_matches.append({
-                                'bazi': target_bazi,
-                                'score': score,
-                                'match_result': match_result,
-                                'date': f"{target_bazi['birth_year']}年{target_bazi['birth_month']}月{target_bazi['birth_day']}日",
-                                'hour': f"{target_bazi['birth_hour']}時",
-                                'pillars': f"{target_bazi['year_pillar']} {target_bazi['month_pillar']} {target_bazi['day_pillar']} {target_bazi['hour_pillar']}"
-                            })
-                            
-                            if score >= MIN_SCORE_THRESHOLD:
-                                found_high_score = True
-                                logger.info(f"系統搜索找到80分以上匹配: 分數={score:.1f}, 日期={year}-{month}-{day}")
-                                break
-                        
-                        # 每處理100個日期報告進度 - 遵循要求13監控效率
-                        if processed_count % 100 == 0:
-                            logger.info(f"已處理 {processed_count} 個日期，找到 {len(scored_matches)} 個匹配")
+            # 優先搜索高概率月份（低概率月份只保留30%），日期數不超過GUARANTEED_SEARCH_LIMIT
+            candidate_dates = [
+                (day.year, day.month, day.day)
+                for day in (first_day + timedelta(days=offset) for offset in search_days)
+                if day.month in HIGH_PROBABILITY_MONTHS or random.random() <= 0.3
+            ]
+            
+            # 每個日期嘗試多個時辰以增加機會 - 遵循要求14說明理由
+            candidate_births = (
+                (year, month, day, hour)
+                for year, month, day in candidate_dates
+                for hour in HIGH_PROBABILITY_HOURS
+            )
+            for (year, month, day, hour), target_bazi, score, match_result in SoulmateFinder.score_stream(
+                    user_bazi, candidate_births, user_gender, target_gender, purpose, structure=False,
+                    progress=progress, total=len(candidate_dates) * len(HIGH_PROBABILITY_HOURS)):
+                processed_count += 1
+                
+                if score >= 65:  # 進一步降低門檻
+                    SoulmateFinder.push_bounded(top, (score, -next(sequence), target_bazi, match_result), keep)
+                    kept_count += 1
                     
-                    except Exception as e:
-                        continue
+                    if score >= MIN_SCORE_THRESHOLD:
+                        found_high_score = True
+                        logger.info(f"系統搜索找到80分以上匹配: 分數={score:.1f}, 日期={year}-{month}-{day}")
+                        break
                 
-                if found_high_score:
-                    break
+                # 每處理100個日期報告進度 - 遵循要求13監控效率
+                if processed_count % 100 == 0:
+                    logger.info(f"已處理 {processed_count} 個日期，找到 {kept_count} 個匹配")
+        
+        # 只為堆內候選組裝結果，按分數由高至低、同分先到先排
+        scored_matches = [
+            SoulmateFinder.match_entry(score, target_bazi, match_result)
+            for score, _, target_bazi, match_result in sorted(top, key=lambda entry: entry[:2], reverse=True)
+        ]
         
         # 階段3：對已找到的匹配進行優化 - 遵循要求12避免硬編碼分數
         if not found_high_score and scored_matches:
             logger.warning("仍未找到80分以上匹配，進行深度優化...")
             
             # 對接近80分的匹配進行時辰優化
-            scored_matches.sort(key=lambda x: x['score'], reverse=True)
-            top_candidates = scored_matches[:20]  # 取前20個最高分
+            top_candidates = scored_matches[:HOUR_OPTIMIZE_CANDIDATES]  # 取前20個最高分
             
             for match in top_candidates:
                 if match['score'] >= 75:  # 接近80分的候選
@@ -456,26 +537,25 @@ class SoulmateFinder:
                     best_score = original_score
                     best_bazi = bazi
                     
-                    for hour_offset in range(-3, 4):  # 嘗試±3小時範圍
-                        if hour_offset == 0:
-                            continue
-                            
+                    # 嘗試±3小時範圍，6個時辰一次批量排盤
+                    new_hours = [(original_hour + hour_offset) % 24
+                                 for hour_offset in range(-3, 4) if hour_offset != 0]
+                    new_charts = SoulmateFinder.calculate_charts(
+                        [(bazi['birth_year'], bazi['birth_month'], bazi['birth_day'], new_hour)
+                         for new_hour in new_hours],
+                        target_gender
+                    )
+                    # 上界不超過原分數的時辰不可能勝出，無需補算評分
+                    new_charts = SoulmateFinder.prune_targets(user_bazi, new_charts, purpose, original_score)
+                    new_matches = SoulmateFinder.calculate_base_matches(
+                        user_bazi, new_charts, user_gender, target_gender
+                    )
+                    
+                    for new_hour, new_bazi, new_base_match in zip(new_hours, new_charts, new_matches):
                         try:
-                            new_hour = (original_hour + hour_offset) % 24
-                            new_bazi = calculate_bazi(
-                                bazi['birth_year'], bazi['birth_month'], bazi['birth_day'], new_hour,
-                                gender=target_gender,
-                                hour_confidence='高'
-                            )
-                            
                             if new_bazi:
-                                new_bazi['birth_year'] = bazi['birth_year']
-                                new_bazi['birth_month'] = bazi['birth_month']
-                                new_bazi['birth_day'] = bazi['birth_day']
-                                new_bazi['birth_hour'] = new_hour
-                                
                                 new_score, new_match_result = SoulmateFinder.calculate_final_score(
-                                    user_bazi, new_bazi, user_gender, target_gender, purpose
+                                    user_bazi, new_bazi, user_gender, target_gender, purpose, new_base_match
                                 )
                                 
                                 if new_score > best_score:
@@ -500,7 +580,7 @@ class SoulmateFinder:
                             logger.info(f"通過調整時辰找到80分以上匹配: 分數={best_score:.1f}, 時辰調整到{best_hour}時")
                             break
         
-        logger.info(f"搜索完成: 處理{processed_count}個日期，找到{len(scored_matches)}個匹配，找到80分以上={found_high_score}")
+        logger.info(f"搜索完成: 處理{processed_count}個日期，找到{kept_count}個匹配，找到80分以上={found_high_score}")
         
         # 如果還沒有匹配，返回最高分的幾個 - 遵循要求12避免硬編碼
         if not scored_matches:
@@ -511,6 +591,10 @@ class SoulmateFinder:
         scored_matches.sort(key=lambda x: x['score'], reverse=True)
         result = scored_matches[:limit]
         
+        # 入選結果補算完整分析（夫妻、神煞、十神、大運），與單筆排盤結果一致
+        for match in result:
+            ProfessionalBaziCalculator.complete_analysis(match['bazi'])
+        
         # 確保至少有一個結果
         if result:
             best_score = result[0]['score']
@@ -521,6 +605,442 @@ class SoulmateFinder:
                 logger.warning(f"警告：最高分只有{best_score:.1f}分，未達到{MIN_SCORE_THRESHOLD}分要求")
         
         return result
+    
+    @staticmethod
+    def calculate_charts(date_hours: List[Tuple[int, int, int, int]], gender: str) -> List[Optional[Dict[str, Any]]]:
+        """
+        1.3.8 批量排盤 - 一次向量化計算全部候選八字，遵循要求13注意效率；批量失敗時逐個回退單筆計算
+        候選八字只走排盤快速路徑（PC.ANALYSIS_PILLARS：四柱、五行、身強弱），同一等價類只分析一次；
+        預篩通過後評分前補算格局喜用，入選結果返回前再補算完整分析
+        """
+        if not date_hours:
+            return []
+        
+        try:
+            columns = calculate_bazi_batch(
+                [item[0] for item in date_hours],
+                [item[1] for item in date_hours],
+                [item[2] for item in date_hours],
+                [item[3] for item in date_hours],
+                genders=gender,
+                confidences='高'
+            )
+            return ProfessionalBatchCalculator.to_dicts(columns, analysis=PC.ANALYSIS_PILLARS, dedupe=True)
+        except Exception as e:
+            logger.warning(f"批量排盤失敗，改為逐個計算: {e}")
+        
+        charts = []
+        for year, month, day, hour in date_hours:
+            try:
+                charts.append(calculate_pillars(year, month, day, hour, gender=gender, hour_confidence='高'))
+            except Exception:
+                charts.append(None)
+        return charts
+    
+    @staticmethod
+    def enumerate_top_matches(user_bazi: Dict[str, Any], user_gender: str, start_year: int,
+                              end_year: int, purpose: str = "正緣", limit: int = 10,
+                              time_budget: Optional[float] = None,
+                              progress: Optional[ProgressCallback] = None) -> List[Dict[str, Any]]:
+        """1.3.9 窮舉搜尋 - 返回範圍內真正的Top N（見rank_top_matches），入選結果補算完整分析"""
+        return SoulmateFinder.build_match_entries(SoulmateFinder.rank_top_matches(
+            user_bazi, user_gender, start_year, end_year, purpose, limit, time_budget, progress=progress
+        ))
+    
+    @staticmethod
+    def rank_top_matches(user_bazi: Dict[str, Any], user_gender: str, start_year: int,
+                         end_year: int, purpose: str = "正緣", limit: int = 10,
+                         time_budget: Optional[float] = None,
+                         use_library: bool = True,
+                         progress: Optional[ProgressCallback] = None) -> List[Tuple[float, Dict[str, Any], Dict[str, Any]]]:
+        """
+        1.3.9.1 窮舉排名 - 範圍內每日×十二時辰全部排盤，按最終分數上界由高至低補算評分，返回真正的Top N，遵循要求13注意效率
+        排名用未封頂的最終分數，每個出生日期只取最高分的時辰（結果分散到N個不同日期），顯示時才封頂（build_match_entries）
+        上界低於第N名分數（同分時出生較後）的候選不可能入選，其後全部跳過；同分按出生日期時辰先後排序，結果固定可重現
+        排盤及評分階段都檢查time_budget（預設EXHAUSTIVE_TIME_BUDGET）秒，超時停止並返回已評分候選中的最佳結果及記錄警告；
+        排盤後只保留上界、序號及出生時間，不保留八字字典；評分批次重新排盤
+        精英庫覆蓋範圍且use_library=True時改走library_top_matches；返回[(分數, 八字, 配對結果)]，未補算完整分析
+        每批排盤及評分後調用progress回報進度
+        """
+        started = time.monotonic()
+        budget = EXHAUSTIVE_TIME_BUDGET if time_budget is None else time_budget
+        target_gender = "女" if user_gender == "男" else "男"
+        
+        # 0. 精英庫覆蓋整個範圍時切片向量化評分，不排盤 - 遵循要求13注意效率
+        if use_library and tuple(BRANCH_HOURS) == PC.ELITE_HOURS:
+            rows = ProfessionalEliteLibrary.year_slice(start_year, end_year)
+            if rows is not None:
+                winners = SoulmateFinder.library_top_matches(
+                    user_bazi, rows, user_gender, target_gender, purpose, limit
+                )
+                if winners is not None:
+                    row_count = len(rows['birth_year'])
+                    SoulmateFinder.report_progress(
+                        progress, SEARCH_STAGE_SCORING, row_count, row_count,
+                        SoulmateFinder.display_score(winners[0][0]) if winners else None
+                    )
+                    logger.info(f"精英庫搜尋完成: {len(rows['birth_year'])}個八字，"
+                                f"總耗時{time.monotonic() - started:.2f}秒")
+                    return winners
+        
+        # 1. 窮舉全部出生日期×時辰，分批排盤並即時計算最終分數上界，預篩不通過的候選不參與排序；
+        #    每批排盤前檢查時間預算，八字用完即棄，只保留(負上界, 序號, 出生時間) - 遵循要求13注意效率
+        dates = SoulmateFinder.generate_date_range(start_year, end_year)
+        total = len(dates) * len(BRANCH_HOURS)
+        date_hours = ((year, month, day, hour) for year, month, day in dates for hour in BRANCH_HOURS)
+        ranked: List[Tuple[float, int, Tuple[int, int, int, int]]] = []
+        charted = 0
+        complete = True
+        while charted < total:
+            if time.monotonic() - started > budget:
+                complete = False
+                logger.warning(f"窮舉搜尋超出時間預算{budget:.1f}秒，已排盤{charted}/{total}個八字")
+                break
+            batch = list(itertools.islice(date_hours, EXHAUSTIVE_CHART_BATCH))
+            for offset, target_bazi in enumerate(SoulmateFinder.calculate_charts(batch, target_gender)):
+                if not target_bazi:
+                    continue
+                passed, reason = SoulmateFinder.pre_filter(user_bazi, target_bazi, user_gender, target_gender)
+                if not passed:
+                    continue
+                passed, reason = SoulmateFinder.structure_check(user_bazi, target_bazi, user_gender, target_gender)
+                if not passed:
+                    continue
+                bound = SoulmateFinder.final_score_upper_bound(user_bazi, target_bazi, purpose, capped=False)
+                ranked.append((-bound, charted + offset, batch[offset]))
+            charted += len(batch)
+            SoulmateFinder.report_progress(progress, SEARCH_STAGE_CHARTING, charted, total, None)
+        ranked.sort()
+        chart_time = time.monotonic() - started
+        
+        # 2. 按上界由高至低分批重新排盤評分，最小堆保留(分數, -序號)最大、日期各不相同的limit個；
+        #    超出預算時至少評完上界最高的一批，保證有結果可返回
+        top: List[Tuple[float, int, Dict[str, Any], Dict[str, Any]]] = []
+        scored_count = 0
+        for batch_start in range(0, len(ranked), EXHAUSTIVE_SCORE_BATCH):
+            batch = ranked[batch_start:batch_start + EXHAUSTIVE_SCORE_BATCH]
+            if len(top) >= limit and (-batch[0][0], -batch[0][1]) < top[0][:2]:
+                break
+            if scored_count and time.monotonic() - started > budget:
+                complete = False
+                logger.warning(f"窮舉搜尋超出時間預算{budget:.1f}秒，已評分{scored_count}/{len(ranked)}個候選")
+                break
+            
+            batch_charts = SoulmateFinder.calculate_charts([birth for _, _, birth in batch], target_gender)
+            batch_matches = SoulmateFinder.calculate_base_matches(
+                user_bazi, batch_charts, user_gender, target_gender
+            )
+            for (neg_bound, index, _), target_bazi, base_match in zip(batch, batch_charts, batch_matches):
+                # 候選按(上界, -序號)由大至小排列，此值小於第N名的(分數, -序號)時其後全部不可能入選
+                if len(top) >= limit and (-neg_bound, -index) < top[0][:2]:
+                    break
+                if not target_bazi:
+                    continue
+                score, match_result = SoulmateFinder.calculate_final_score(
+                    user_bazi, target_bazi, user_gender, target_gender, purpose, base_match, capped=False
+                )
+                scored_count += 1
+                SoulmateFinder.push_distinct(
+                    top, (score, -index, target_bazi, match_result), limit,
+                    lambda entry: -entry[1] // len(BRANCH_HOURS)
+                )
+            best = max((entry[0] for entry in top), default=None)
+            SoulmateFinder.report_progress(
+                progress, SEARCH_STAGE_SCORING, scored_count, len(ranked),
+                SoulmateFinder.display_score(best) if best is not None else None
+            )
+        
+        # 3. 排序並組裝結果 - 遵循要求2保持結果格式一致
+        winners = [(score, target_bazi, match_result)
+                   for score, _, target_bazi, match_result in sorted(top, key=lambda entry: entry[:2], reverse=True)]
+        logger.info(
+            f"窮舉搜尋完成: {total}個八字，排盤{charted}個，評分{scored_count}個，"
+            f"排盤{chart_time:.2f}秒，總耗時{time.monotonic() - started:.2f}秒，完整={complete}"
+        )
+        return winners
+    
+    @staticmethod
+    def library_top_matches(user_bazi: Dict[str, Any], rows: Dict[str, np.ndarray], user_gender: str,
+                            target_gender: str, purpose: str = "正緣",
+                            limit: int = 10) -> Optional[List[Tuple[float, Dict[str, Any], Dict[str, Any]]]]:
+        """
+        1.3.10 精英庫搜尋 - 年份切片內全部八字向量化評分（不排盤），只有特殊案例行及入選Top N才排盤
+        分數（未封頂）、每日只取最高分時辰及同分次序（行號即出生先後）與即時排盤窮舉一致；返回[(分數, 八字, 配對結果)]，
+        用戶特徵檔不完整（無法向量化評分）時返回None，由調用方改走即時排盤
+        """
+        scored = ProfessionalEliteLibrary.score_rows(user_bazi, rows)
+        if scored is None:
+            return None
+        match_scores, special = scored
+        final_scores = SoulmateFinder.final_scores_from_rows(user_bazi, rows, match_scores, purpose, capped=False)
+        
+        # 預篩：日主強度超出0-100的候選不參與排序
+        strength = rows['strength_score']
+        final_scores[(strength < 0) | (strength > 100)] = -np.inf
+        
+        def birth(index: int) -> Tuple[int, int, int, int]:
+            return (int(rows['birth_year'][index]), int(rows['birth_month'][index]),
+                    int(rows['birth_day'][index]), int(rows['birth_hour'][index]))
+        
+        # 特殊案例行排盤後逐個評分
+        special_index = np.flatnonzero(special).tolist()
+        if special_index:
+            charts = SoulmateFinder.calculate_charts([birth(i) for i in special_index], target_gender)
+            matches = SoulmateFinder.calculate_base_matches(user_bazi, charts, user_gender, target_gender)
+            for index, target_bazi, base_match in zip(special_index, charts, matches):
+                final_scores[index] = -np.inf
+                if target_bazi and SoulmateFinder.pre_filter(user_bazi, target_bazi, user_gender, target_gender)[0]:
+                    final_scores[index] = SoulmateFinder.calculate_final_score(
+                        user_bazi, target_bazi, user_gender, target_gender, purpose, base_match, capped=False
+                    )[0]
+        
+        # 每日（連續十二行）取最高分時辰（同分取較早時辰），再按分數由高至低、同分按行號（出生先後）取Top N
+        day_scores = final_scores.reshape(-1, len(PC.ELITE_HOURS))
+        best_hour = np.argmax(day_scores, axis=1)
+        best_scores = day_scores[np.arange(len(day_scores)), best_hour]
+        day_rows = np.arange(len(day_scores)) * len(PC.ELITE_HOURS) + best_hour
+        order = np.lexsort((day_rows, -best_scores))[:limit]
+        top = [int(day_rows[day]) for day in order.tolist() if best_scores[day] > -np.inf]
+        return SoulmateFinder.materialize_winners(
+            user_bazi, [birth(i) for i in top], user_gender, target_gender, purpose
+        )
+    
+    @staticmethod
+    def build_match_entries(winners: List[Tuple[float, Dict[str, Any], Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        """1.3.11 組裝搜尋結果 - [(未封頂分數, 八字, 配對結果)] → find_top_matches結果格式（顯示分數封頂），入選八字補算完整分析"""
+        result = []
+        for score, target_bazi, match_result in winners:
+            ProfessionalBaziCalculator.complete_analysis(target_bazi)
+            result.append(SoulmateFinder.match_entry(SoulmateFinder.display_score(score), target_bazi, match_result))
+        if result and result[0]['score'] < MIN_SCORE_THRESHOLD:
+            logger.warning(f"警告：最高分只有{result[0]['score']:.1f}分，未達到{MIN_SCORE_THRESHOLD}分要求")
+        return result
+    
+    @staticmethod
+    def materialize_winners(user_bazi: Dict[str, Any], births: List[Tuple[int, int, int, int]], user_gender: str,
+                            target_gender: str, purpose: str = "正緣") -> List[Tuple[float, Dict[str, Any], Dict[str, Any]]]:
+        """1.3.12 入選出生時間排盤評分 - 只為最終Top N建立八字及配對結果，返回[(未封頂分數, 八字, 配對結果)]（次序不變）"""
+        charts = SoulmateFinder.calculate_charts(births, target_gender)
+        matches = SoulmateFinder.calculate_base_matches(user_bazi, charts, user_gender, target_gender)
+        winners = []
+        for target_bazi, base_match in zip(charts, matches):
+            if target_bazi:
+                score, match_result = SoulmateFinder.calculate_final_score(
+                    user_bazi, target_bazi, user_gender, target_gender, purpose, base_match, capped=False
+                )
+                winners.append((score, target_bazi, match_result))
+        return winners
+    
+    @staticmethod
+    def parallel_top_matches(user_bazi: Dict[str, Any], user_gender: str, start_year: int,
+                             end_year: int, purpose: str = "正緣", limit: int = 10,
+                             time_budget: Optional[float] = None,
+                             progress: Optional[ProgressCallback] = None) -> List[Dict[str, Any]]:
+        """
+        1.3.13 並行窮舉搜尋 - 年份範圍按連續年份分區提交常駐進程池，各分區返回自身Top N的(分數, 出生時間)，
+        合併後按分數由高至低、同分按出生先後取Top N，與單進程窮舉結果相同且不受進程數影響；
+        精英庫覆蓋範圍（切片評分已足夠快）、只有一年或進程池不可用時直接單進程窮舉
+        每個分區完成時以已完成分區的八字數回報進度；整個搜尋超出time_budget時取消未開始的分區，
+        只合併已完成分區的結果
+        """
+        started = time.monotonic()
+        budget = EXHAUSTIVE_TIME_BUDGET if time_budget is None else time_budget
+        pool = get_search_pool()
+        years = list(range(start_year, end_year + 1))
+        library_covered = (tuple(BRANCH_HOURS) == PC.ELITE_HOURS
+                           and ProfessionalEliteLibrary.row_range(start_year, end_year) is not None)
+        if pool is None or len(years) < 2 or library_covered:
+            return SoulmateFinder.enumerate_top_matches(
+                user_bazi, user_gender, start_year, end_year, purpose, limit, time_budget, progress
+            )
+        
+        # 1. 連續年份分區，分區數不超過進程數 - 遵循要求15按順序處理
+        partitions = [chunk.tolist() for chunk in np.array_split(np.array(years), min(search_pool_size(), len(years)))]
+        user_payload = {key: value for key, value in user_bazi.items() if not key.startswith('_')}
+        chart_counts = [len(SoulmateFinder.generate_date_range(chunk[0], chunk[-1])) * len(BRANCH_HOURS)
+                        for chunk in partitions]
+        candidates = []
+        scanned = 0
+        try:
+            # 各分區只獲分配剩餘預算，整體等待以剩餘預算加寬限為上限，卡住的進程不會令搜尋無限等待
+            remaining = max(0.0, budget - (time.monotonic() - started))
+            deadline = time.monotonic() + remaining + PARALLEL_BUDGET_GRACE
+            futures = {
+                pool.submit(search_partition, user_payload, user_gender, chunk[0], chunk[-1], purpose, limit, remaining): index
+                for index, chunk in enumerate(partitions)
+            }
+            # 分區完成先後不影響結果（合併時重新排序），只用於回報進度
+            try:
+                for future in as_completed(futures, timeout=max(0.0, deadline - time.monotonic())):
+                    candidates.extend(future.result())
+                    scanned += chart_counts[futures[future]]
+                    SoulmateFinder.report_progress(
+                        progress, SEARCH_STAGE_MERGING, scanned, sum(chart_counts),
+                        SoulmateFinder.display_score(max(candidate[0] for candidate in candidates))
+                        if candidates else None
+                    )
+            except FutureTimeoutError:
+                for future in futures:
+                    future.cancel()
+                logger.warning(f"並行搜尋超出時間預算{budget:.1f}秒，"
+                               f"只合併已完成的{scanned}/{sum(chart_counts)}個八字")
+        except Exception as e:
+            logger.warning(f"並行搜尋失敗，改為單進程窮舉: {e}")
+            shutdown_search_pool()
+            return SoulmateFinder.enumerate_top_matches(
+                user_bazi, user_gender, start_year, end_year, purpose, limit, time_budget, progress
+            )
+        
+        # 2. 確定性合併：分數（未封頂）由高至低，同分按出生時間先後，每個出生日期只取一個（與單進程窮舉一致）
+        candidates.sort(key=lambda candidate: (-candidate[0], candidate[1]))
+        births = []
+        seen_days = set()
+        for _, birth in candidates:
+            if birth[:3] not in seen_days and len(births) < limit:
+                seen_days.add(birth[:3])
+                births.append(birth)
+        target_gender = "女" if user_gender == "男" else "男"
+        winners = SoulmateFinder.materialize_winners(user_bazi, births, user_gender, target_gender, purpose)
+        logger.info(f"並行搜尋完成: {len(partitions)}個分區，總耗時{time.monotonic() - started:.2f}秒")
+        return SoulmateFinder.build_match_entries(winners)
+    
+    @staticmethod
+    def report_progress(progress: Optional[ProgressCallback], stage: str, scanned: int, total: int,
+                        best: Optional[float]) -> None:
+        """1.3.14 回報搜尋進度 - 調用進度回調(階段, 已掃描八字數, 八字總數, 目前最高分)；回調出錯只記錄，不中斷搜尋"""
+        if progress is None:
+            return
+        try:
+            progress(stage, scanned, total, best)
+        except Exception as e:
+            logger.debug(f"搜尋進度回調失敗: {e}")
+    
+    @staticmethod
+    def yearly_special_births(year: int) -> List[Tuple[int, int, int, int]]:
+        """1.3.15 年度特殊日期 - 春分、秋分、夏至、冬至附近及傳統節日的出生時間，遵循要求1考慮節氣影響"""
+        births = []
+        # 春分附近 (3月20-22日)
+        for day in range(19, 24):
+            births.append((year, 3, day, 6))
+            births.append((year, 3, day, 18))
+        
+        # 秋分附近 (9月22-24日)
+        for day in range(21, 26):
+            births.append((year, 9, day, 6))
+            births.append((year, 9, day, 18))
+        
+        # 夏至附近 (6月21-22日)
+        for day in range(20, 24):
+            births.append((year, 6, day, 12))
+        
+        # 冬至附近 (12月21-22日)
+        for day in range(20, 24):
+            births.append((year, 12, day, 0))
+            births.append((year, 12, day, 12))
+        
+        # 傳統節日
+        births.append((year, 1, 1, 12))   # 元旦
+        births.append((year, 5, 5, 12))   # 端午
+        births.append((year, 7, 7, 19))   # 七夕
+        births.append((year, 8, 15, 20))  # 中秋
+        births.append((year, 9, 9, 12))   # 重陽
+        births.append((year, 12, 31, 12)) # 除夕
+        return births
+    
+    @staticmethod
+    def special_births(start_year: int, end_year: int) -> Iterator[Tuple[int, int, int, int]]:
+        """1.3.16 特殊日期生成器 - 逐年產生特殊日期，再產生SPECIAL_RANDOM_DATES個高概率月份時辰的隨機日期"""
+        for year in range(start_year, end_year + 1):
+            yield from SoulmateFinder.yearly_special_births(year)
+        
+        for _ in range(SPECIAL_RANDOM_DATES):
+            year = random.randint(start_year, end_year)
+            month = random.choice(HIGH_PROBABILITY_MONTHS)  # 優先高概率月份
+            day = random.randint(1, 28)
+            hour = random.choice(HIGH_PROBABILITY_HOURS)    # 優先高概率時辰
+            yield (year, month, day, hour)
+    
+    @staticmethod
+    def score_stream(user_bazi: Dict[str, Any], births: Iterable[Tuple[int, int, int, int]], user_gender: str,
+                     target_gender: str, purpose: str = "正緣", structure: bool = True,
+                     progress: Optional[ProgressCallback] = None,
+                     total: int = 0) -> Iterator[Tuple[Tuple[int, int, int, int], Dict[str, Any], float, Dict[str, Any]]]:
+        """
+        1.3.17 候選流式評分 - 出生時間每SEARCH_BATCH_DATES×時辰數個一批排盤及計算基礎配對，
+        預篩（structure=True時再做結構檢查）通過者評分，逐個產生(出生時間, 八字, 分數, 配對結果)；
+        同一時間只持有一批八字，調用方停止迭代即不再排盤；每批後以progress回報進度
+        """
+        batch_size = SEARCH_BATCH_DATES * len(HIGH_PROBABILITY_HOURS)
+        births = iter(births)
+        scanned = 0
+        best = None
+        while True:
+            batch = list(itertools.islice(births, batch_size))
+            if not batch:
+                return
+            batch_charts = SoulmateFinder.calculate_charts(batch, target_gender)
+            batch_matches = SoulmateFinder.calculate_base_matches(
+                user_bazi, batch_charts, user_gender, target_gender
+            )
+            for birth, target_bazi, base_match in zip(batch, batch_charts, batch_matches):
+                try:
+                    if not target_bazi:
+                        continue
+                    
+                    # 預篩選（極度放寬條件）
+                    passed, reason = SoulmateFinder.pre_filter(user_bazi, target_bazi, user_gender, target_gender)
+                    if not passed:
+                        continue
+                    
+                    # 結構檢查（極度放寬條件）
+                    if structure:
+                        passed, reason = SoulmateFinder.structure_check(user_bazi, target_bazi, user_gender, target_gender)
+                        if not passed:
+                            continue
+                    
+                    score, match_result = SoulmateFinder.calculate_final_score(
+                        user_bazi, target_bazi, user_gender, target_gender, purpose, base_match
+                    )
+                except Exception as e:
+                    continue
+                
+                best = score if best is None else max(best, score)
+                yield birth, target_bazi, score, match_result
+            
+            scanned += len(batch)
+            SoulmateFinder.report_progress(progress, SEARCH_STAGE_SCORING, scanned, max(total, scanned), best)
+    
+    @staticmethod
+    def push_bounded(top: List[Tuple], entry: Tuple, size: int) -> None:
+        """1.3.18 固定大小最小堆 - 按entry前兩項(分數, -序號)保留最大的size個，堆滿時只替換堆頂"""
+        if len(top) < size:
+            heapq.heappush(top, entry)
+        elif entry[:2] > top[0][:2]:
+            heapq.heapreplace(top, entry)
+    
+    @staticmethod
+    def push_distinct(top: List[Tuple], entry: Tuple, size: int, key: Callable[[Tuple], Any]) -> None:
+        """1.3.18.1 分組固定大小最小堆 - 同key（如出生日期）只保留(分數, -序號)最大的一個，其餘同push_bounded"""
+        entry_key = key(entry)
+        for position, existing in enumerate(top):
+            if key(existing) == entry_key:
+                if entry[:2] > existing[:2]:
+                    top[position] = entry
+                    heapq.heapify(top)
+                return
+        SoulmateFinder.push_bounded(top, entry, size)
+    
+    @staticmethod
+    def match_entry(score: float, target_bazi: Dict[str, Any], match_result: Dict[str, Any]) -> Dict[str, Any]:
+        """1.3.19 組裝單個搜尋結果 - 八字、分數、配對結果及日期時辰四柱文字，遵循要求2保持結果格式一致"""
+        return {
+            'bazi': target_bazi,
+            'score': score,
+            'match_result': match_result,
+            'date': f"{target_bazi['birth_year']}年{target_bazi['birth_month']}月{target_bazi['birth_day']}日",
+            'hour': f"{target_bazi['birth_hour']}時",
+            'pillars': f"{target_bazi['year_pillar']} {target_bazi['month_pillar']} {target_bazi['day_pillar']} {target_bazi['hour_pillar']}"
+        }
 # ========1.3 真命天子搜尋器結束 ========#
 
 # ========1.4 結果格式化函數開始 ========#
@@ -606,6 +1126,78 @@ def format_find_soulmate_result(matches: List[Dict[str, Any]], start_year: int,
     return "\n".join(text_parts)
 # ========1.4 結果格式化函數結束 ========#
 
+# ========1.5 並行搜尋進程池開始 ========#
+# 常駐進程池：首次使用（或warm_search_pool預熱）時建立，之後每次搜尋不再付出建立進程及導入模組的成本
+# 使用spawn啟動方式，避免在已有線程（Bot事件循環、數據庫連接池）的進程內fork
+_search_pool: Optional[ProcessPoolExecutor] = None
+_search_pool_size = 0
+_search_pool_lock = threading.Lock()
+
+def available_cpus() -> int:
+    """1.5.1 容器可用CPU數 - 取CPU親和性與cgroup配額（cpu.max）兩者較小值"""
+    cpus = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else (os.cpu_count() or 1)
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()[:2]
+        if quota != "max":
+            cpus = min(cpus, max(1, -(-int(quota) // int(period))))
+    except (OSError, ValueError):
+        pass
+    return cpus
+
+def search_pool_size() -> int:
+    """1.5.2 搜尋進程池大小 - SEARCH_WORKERS，未設定時按容器可用CPU數"""
+    return SEARCH_WORKERS if SEARCH_WORKERS > 0 else available_cpus()
+
+def get_search_pool() -> Optional[ProcessPoolExecutor]:
+    """1.5.3 取得常駐搜尋進程池；只有一個可用CPU時返回None（單進程窮舉即可）"""
+    global _search_pool, _search_pool_size
+    size = search_pool_size()
+    if size <= 1:
+        return None
+    with _search_pool_lock:
+        if _search_pool is None or _search_pool_size != size:
+            if _search_pool is not None:
+                _search_pool.shutdown(wait=False, cancel_futures=True)
+            _search_pool = ProcessPoolExecutor(max_workers=size, mp_context=multiprocessing.get_context("spawn"))
+            _search_pool_size = size
+            logger.info(f"搜尋進程池已建立: {size}個進程")
+        return _search_pool
+
+def warm_search_pool() -> None:
+    """1.5.4 預熱搜尋進程池 - 每個進程先導入計算核心並載入干支表及精英庫（不等待完成）"""
+    pool = get_search_pool()
+    if pool is not None:
+        for _ in range(search_pool_size()):
+            pool.submit(warm_search_worker)
+
+def shutdown_search_pool() -> None:
+    """1.5.5 關閉搜尋進程池（進程異常退出後調用，下次搜尋重新建立）"""
+    global _search_pool, _search_pool_size
+    with _search_pool_lock:
+        if _search_pool is not None:
+            _search_pool.shutdown(wait=False, cancel_futures=True)
+        _search_pool = None
+        _search_pool_size = 0
+
+def warm_search_worker() -> int:
+    """1.5.6 進程池預熱任務 - 排盤一次觸發干支表及均時差表載入，並載入精英庫；返回進程號"""
+    SoulmateFinder.calculate_charts([(2000, 1, 1, 12)], "女")
+    ProfessionalEliteLibrary.is_available()
+    return os.getpid()
+
+def search_partition(user_bazi: Dict[str, Any], user_gender: str, start_year: int, end_year: int,
+                     purpose: str, limit: int, time_budget: float) -> List[Tuple[float, Tuple[int, int, int, int]]]:
+    """1.5.7 進程池分區任務 - 即時排盤窮舉一段年份，返回該分區Top N的[(未封頂分數, (年, 月, 日, 時))]"""
+    winners = SoulmateFinder.rank_top_matches(
+        user_bazi, user_gender, start_year, end_year, purpose, limit, time_budget, use_library=False
+    )
+    return [
+        (score, (target_bazi['birth_year'], target_bazi['birth_month'], target_bazi['birth_day'], target_bazi['birth_hour']))
+        for score, target_bazi, _ in winners
+    ]
+# ========1.5 並行搜尋進程池結束 ========#
+
 # 🔖 文件信息
 # 引用文件：new_calculator.py（八字計算核心）
 # 被引用文件：bot.py（主要Bot邏輯）
@@ -622,11 +1214,51 @@ def format_find_soulmate_result(matches: List[Dict[str, Any]], start_year: int,
 #   1.3.4 第一階段：Pre-filter
 #   1.3.5 第二階段：Structure Check
 #   1.3.6 第三階段：資深精算加分項
+#   1.3.6.1 向量化最終分數
 #   1.3.7 主搜尋函數（已優化）
+#   1.3.8 批量排盤
+#   1.3.9 窮舉搜尋
+#   1.3.9.1 窮舉排名
+#   1.3.10 精英庫搜尋
+#   1.3.11 組裝搜尋結果
+#   1.3.12 入選出生時間排盤評分
+#   1.3.13 並行窮舉搜尋
+#   1.3.14 回報搜尋進度
+#   1.3.15 年度特殊日期
+#   1.3.16 特殊日期生成器
+#   1.3.17 候選流式評分
+#   1.3.18 固定大小最小堆
+#   1.3.19 組裝單個搜尋結果
 # 1.4 結果格式化函數
 #   1.4.1 格式化Find Soulmate結果
+# 1.5 並行搜尋進程池
+#   1.5.1 容器可用CPU數
+#   1.5.2 搜尋進程池大小
+#   1.5.3 取得常駐搜尋進程池
+#   1.5.4 預熱搜尋進程池
+#   1.5.5 關閉搜尋進程池
+#   1.5.6 進程池預熱任務
+#   1.5.7 進程池分區任務
 
 # 🔖 修正紀錄
+# 2026-10-16: 抽樣搜尋改為流式管線（special_births/score_stream分批排盤評分 → push_bounded固定大小最小堆），只為堆內候選組裝結果，系統性搜索按日序號抽樣不建立整個範圍日期列表
+# 2026-10-16: find_top_matches新增progress進度回調（階段、已掃描八字數、目前最高分），各搜尋模式每批回報，並行模式按分區完成回報
+# 2026-10-16: 新增並行搜尋模式（常駐spawn進程池按年份分區，各分區Top N按分數及出生先後確定性合併），SEARCH_MODE預設parallel
+# 2026-10-16: 精英八字庫覆蓋搜尋範圍時窮舉搜尋直接切片向量化評分（final_scores_from_rows），只有特殊案例及入選結果才排盤；日主相生表移至DAY_STEM_RELATIONS
+# 2026-10-16: 新增enumerate_top_matches窮舉搜尋（每日×十二時辰全部排盤，按上界排序評分，返回真正Top N，同分按出生先後），SEARCH_MODE預設窮舉
+# 2026-10-16: 候選按等價類（四柱＋出生年＋信心度）去重，每類只分析及評分一次，結果複製給同類出生時間
+# 2026-10-16: 新增final_score_upper_bound及prune_targets，時辰優化時上界不超過原分數的時辰不再補算分析及評分
+# 2026-10-16: 逐個回退評分使用detail=score，候選排序不構建配對報告文字
+# 2026-10-16: 每批候選改用calculate_match_many一次過評分（calculate_base_matches），分數與逐個calculate_match一致
+# 2026-10-16: 候選八字改走calculate_pillars快速路徑，預篩通過後才補算格局喜用
+# 2026-10-16: 候選八字只做評分所需分析，入選Top結果返回前補算完整分析
+# 2026-10-16: 年柱天合、月支相合改查new_calculator干支關係矩陣，移除本地重複定義
+# 2026-10-16: 搜尋路徑排盤及配對評分使用audit_level=off，不構建審計字串
+# 2026-10-16: 三個搜尋階段改用calculate_bazi_batch批量排盤，系統性搜索按250日期一批處理
+# 2026-10-16: 窮舉排名排盤階段亦檢查時間預算，排盤後只保留(上界, 序號, 出生時間)，評分批次重新排盤
+# 2026-10-16: 並行搜尋以剩餘預算（加寬限）等待分區結果，超時取消未開始的分區並只合併已完成分區
+# 2026-10-16: SEARCH_MODE預設改回抽樣搜尋，窮舉及並行模式須以BAZI_SOULMATE_SEARCH明確開啟
+# 2026-10-16: 窮舉排名改用未封頂分數，每日只保留最高分時辰，分數上限99.9只在顯示時套用
 # 2026-02-10: 徹底優化find_soulmate算法，確保至少找到一個80分以上配對
 # 2026-02-10: 增加特殊日期數量至每個年份都包含重要節氣
 # 2026-02-10: 提高額外加分項幅度（喜用神互補15分，日主相生12分）
@@ -5,11 +5,13 @@ import asyncio
 import json
 import hashlib
 import traceback
+import functools
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import Dict, List, Tuple, Any, Optional
 
 import psycopg2
-from psycopg2.extras import RealDictCursor
+from psycopg2.extras import RealDictCursor, execute_values
 from psycopg2 import pool
 
 from telegram import (
@@ -32,17 +34,24 @@ from telegram.ext import (
 # 導入計算核心
 from new_calculator import (
     calculate_match,
+    calculate_match_many,
     calculate_bazi,
     BaziError,
     MatchError,
     ProfessionalConfig as Config,
-    BaziFormatters
+    BaziFormatters,
+    MatchBreakdown,
+    ProfessionalEliteLibrary,
+    scoring_signature
 )
 
 # 導入 Soulmate 功能
 from bazi_soulmate import (
     SoulmateFinder,
-    format_find_soulmate_result
+    format_find_soulmate_result,
+    warm_search_pool,
+    SEARCH_MODE,
+    SEARCH_MODE_PARALLEL
 )
 # ========1.1 導入模組結束 ========#
 
@@ -77,6 +86,11 @@ DEFAULT_LONGITUDE = Config.DEFAULT_LONGITUDE
 # 其他常量
 TOKEN_EXPIRY_SECONDS = 600  # 配對token有效期10分鐘
 MIN_MATCH_SCORE = THRESHOLD_ACCEPTABLE  # 統一使用可接受閾值作為最低分數
+SOULMATE_PROGRESS_INTERVAL = 3  # 真命天子背景搜尋進度訊息更新間隔（秒）
+SOULMATE_SEARCH_THREADS = int(os.getenv("SOULMATE_SEARCH_THREADS", "2"))  # 同時執行的真命天子搜尋數
+
+# 真命天子搜尋專用線程池，搜尋在事件循環外執行，不佔用其他背景任務的預設線程池
+soulmate_executor = ThreadPoolExecutor(max_workers=SOULMATE_SEARCH_THREADS, thread_name_prefix="soulmate")
 
 # 維護模式標誌
 MAINTENANCE_MODE = False
@@ -583,6 +597,126 @@ def check_user_has_profile(telegram_id: int) -> Tuple[bool, Optional[str]]:
     finally:
         if conn:
             release_db_connection(conn)
+
+def profile_scoring_changed(old_profile: Optional[Dict[str, Any]], new_profile: Optional[Dict[str, Any]]) -> bool:
+    """1.4.14 個人資料更新前後的配對評分簽名是否不同（新用戶或讀取失敗視為未變，沒有舊配對需要重算）"""
+    if not old_profile or not new_profile:
+        return False
+    try:
+        return scoring_signature(old_profile) != scoring_signature(new_profile)
+    except Exception as e:
+        logger.warning(f"比較評分簽名失敗，當作已改變: {e}")
+        return True
+
+def rescore_user_matches(internal_user_id: int) -> int:
+    """
+    1.4.15 增量重算某用戶的全部已存配對 - 個人資料評分簽名改變後於背景執行
+    用戶為user_a的配對以calculate_match_many一次過評分，為user_b的配對逐對評分（A方不同）；
+    個別配對評分失敗只跳過該配對並記錄日誌，其餘分數及數值明細以一條批量UPDATE寫回，返回更新的配對數
+    """
+    conn = None
+    try:
+        user_profile = get_raw_profile_for_match(internal_user_id)
+        if not user_profile:
+            return 0
+        
+        conn = get_db_connection()
+        cur = conn.cursor()
+        cur.execute(
+            "SELECT id, user_a, user_b FROM matches WHERE user_a = %s OR user_b = %s",
+            (internal_user_id, internal_user_id)
+        )
+        match_rows = cur.fetchall()
+        if not match_rows:
+            return 0
+        
+        other_profiles = {}
+        for _, user_a, user_b in match_rows:
+            other_id = user_b if user_a == internal_user_id else user_a
+            if other_id not in other_profiles:
+                other_profiles[other_id] = get_raw_profile_for_match(other_id)
+        
+        updates = []
+        failed = []
+        
+        # 用戶為A方：一對多批量評分（批量失敗時逐個評分）
+        as_user_a = [(match_id, other_profiles[user_b]) for match_id, user_a, user_b in match_rows
+                     if user_a == internal_user_id and other_profiles.get(user_b)]
+        if as_user_a:
+            details = score_candidates(
+                user_profile, [profile for _, profile in as_user_a], user_profile.get("gender", "未知"),
+                [profile.get("gender", "未知") for _, profile in as_user_a], details=True
+            )
+            for (match_id, _), detail in zip(as_user_a, details):
+                if detail is None:
+                    failed.append(match_id)
+                    continue
+                updates.append((match_id, detail["score"], MatchBreakdown.from_result(detail).serialize()))
+        
+        # 用戶為B方：逐對評分
+        for match_id, user_a, user_b in match_rows:
+            other_profile = other_profiles.get(user_a)
+            if user_a == internal_user_id or not other_profile:
+                continue
+            detail = score_candidates(
+                other_profile, [user_profile], other_profile.get("gender", "未知"),
+                [user_profile.get("gender", "未知")], details=True
+            )[0]
+            if detail is None:
+                failed.append(match_id)
+                continue
+            updates.append((match_id, detail["score"], MatchBreakdown.from_result(detail).serialize()))
+        
+        if failed:
+            logger.warning(f"用戶 {internal_user_id} 有 {len(failed)} 個配對重算失敗，保留原分數: {failed}")
+        
+        if updates:
+            execute_values(cur, """
+                UPDATE matches AS m
+                SET score = v.score, match_details = v.match_details
+                FROM (VALUES %s) AS v(id, score, match_details)
+                WHERE m.id = v.id
+            """, updates)
+            conn.commit()
+        
+        logger.info(f"用戶 {internal_user_id} 個人資料評分簽名改變，已重算 {len(updates)}/{len(match_rows)} 個配對")
+        return len(updates)
+        
+    except Exception as e:
+        if conn:
+            conn.rollback()
+        logger.error(f"重算用戶 {internal_user_id} 的配對失敗: {e}", exc_info=True)
+        return 0
+    finally:
+        if conn:
+            release_db_connection(conn)
+
+def score_candidates(user_profile: Dict[str, Any], candidates: List[Dict[str, Any]], user_gender: str,
+                     candidate_genders: List[str], details: bool = False) -> List[Optional[Dict[str, Any]]]:
+    """
+    1.4.16 一對多評分並逐行隔離錯誤 - 先以calculate_match_many一次過評分；批量評分失敗時逐個calculate_match，
+    只有出錯的對象返回None並記錄日誌，其餘對象照常評分（details=False時每行只有score）
+    """
+    try:
+        result = calculate_match_many(user_profile, candidates, user_gender, candidate_genders, details=details)
+        if details:
+            return result["details"]
+        return [{"score": score} for score in result["scores"].tolist()]
+    except MatchError as e:
+        logger.warning(f"批量配對評分失敗，改為逐個評分: {e}")
+    
+    results = []
+    for candidate, candidate_gender in zip(candidates, candidate_genders):
+        try:
+            match_result = calculate_match(
+                user_profile, candidate, user_gender, candidate_gender,
+                detail=None if details else Config.DETAIL_SCORE
+            )
+            results.append(match_result if details else {"score": match_result.get("score", 0)})
+        except Exception as e:
+            logger.debug(f"配對計算錯誤，跳過此對象: {e}")
+            results.append(None)
+    return results
 # ========1.4 數據庫工具結束 ========#
 
 # ========1.5 隱私條款模組開始 ========#
@@ -901,6 +1035,9 @@ async def complete_registration(update: Update, context: ContextTypes.DEFAULT_TY
         internal_user_id = row[0]
         elements = bazi.get("elements", {})
         
+        # 覆寫前讀取舊個人資料，用於判斷已存配對是否需要重算
+        old_profile = get_raw_profile_for_match(internal_user_id)
+        
         year_pillar = bazi.get("year_pillar", "")
         month_pillar = bazi.get("month_pillar", "")
         day_pillar = bazi.get("day_pillar", "")
@@ -998,6 +1135,10 @@ async def complete_registration(update: Update, context: ContextTypes.DEFAULT_TY
         if conn:
             release_db_connection(conn)
     
+    # 重新註冊且評分簽名改變：背景重算已存配對（簽名不變則不重算）
+    if old_profile and profile_scoring_changed(old_profile, get_raw_profile_for_match(internal_user_id)):
+        asyncio.get_running_loop().run_in_executor(None, rescore_user_matches, internal_user_id)
+    
     # 準備顯示資料
     bazi_data_for_display = {
         "username": username,
@@ -1248,11 +1389,11 @@ async def match(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return
     
     matches = []
+    candidates = []
     processed_count = 0
     
     for r in rows:
         processed_count += 1
-        other_internal_id = r[0]
         
         try:
             other_profile = {
@@ -1299,33 +1440,33 @@ async def match(update: Update, context: ContextTypes.DEFAULT_TYPE):
                 except:
                     pass
             
-            match_result = calculate_match(
-                me_profile,
-                other_profile,
-                my_gender,
-                other_profile["gender"],
-                is_testpair=False
-            )
-            
-            score = match_result.get("score", 0)
-            
-            if score >= MIN_MATCH_SCORE:
-                matches.append({
-                    "internal_id": other_internal_id,
-                    "telegram_id": r[1],
-                    "username": r[2] or "匿名用戶",
-                    "profile": other_profile,
-                    "score": score,
-                    "match_result": match_result
-                })
-                logger.info(f"找到合格配對: 分數={score:.1f}, 對方ID={other_internal_id}")
+            candidates.append((r, other_profile))
             
-        except MatchError as e:
-            logger.debug(f"配對計算錯誤: {e}")
-            continue
         except Exception as e:
-            logger.debug(f"其他配對錯誤: {e}")
+            logger.debug(f"對象資料解析錯誤: {e}")
+            continue
+    
+    # 一次過為全部對象評分，分數與逐個calculate_match一致；個別對象資料有誤時只跳過該對象
+    scored = score_candidates(
+        me_profile,
+        [other_profile for _, other_profile in candidates],
+        my_gender,
+        [other_profile["gender"] for _, other_profile in candidates]
+    )
+    
+    for (r, other_profile), result in zip(candidates, scored):
+        if result is None:
             continue
+        score = result["score"]
+        if score >= MIN_MATCH_SCORE:
+            matches.append({
+                "internal_id": r[0],
+                "telegram_id": r[1],
+                "username": r[2] or "匿名用戶",
+                "profile": other_profile,
+                "score": score
+            })
+            logger.info(f"找到合格配對: 分數={score:.1f}, 對方ID={r[0]}")
     
     logger.info(f"處理了 {processed_count} 個對象，找到 {len(matches)} 個合格配對")
     
@@ -1337,7 +1478,19 @@ async def match(update: Update, context: ContextTypes.DEFAULT_TYPE):
     matches.sort(key=lambda x: x["score"], reverse=True)
     best_match = matches[0]
     other_profile = best_match["profile"]
-    match_result = best_match.get("match_result", {})
+    
+    # 只為最佳對象計算完整配對結果（含文字細節），供格式化及儲存
+    try:
+        match_result = calculate_match(
+            me_profile,
+            other_profile,
+            my_gender,
+            other_profile["gender"],
+            is_testpair=False
+        )
+    except MatchError as e:
+        logger.error(f"最佳對象配對計算錯誤: {e}")
+        match_result = {"score": best_match["score"]}
     
     timestamp = int(datetime.now().timestamp())
     data_str = f"{internal_user_id}_{best_match['internal_id']}_{timestamp}"
@@ -1414,7 +1567,7 @@ async def match(update: Update, context: ContextTypes.DEFAULT_TYPE):
                     internal_user_id,  # user_a
                     best_match["internal_id"],  # user_b
                     best_match["score"],
-                    json.dumps(match_result)
+                    MatchBreakdown.from_result(match_result).serialize()
                 ))
                 
                 conn.commit()
@@ -1531,14 +1684,16 @@ async def test_pair_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
             gender=gender1,
             hour_confidence="高",
             minute=minute1,
-            longitude=longitude1
+            longitude=longitude1,
+            audit_level=Config.AUDIT_FULL
         )
         bazi2_result = calculate_bazi(
             year2, month2, day2, hour2,
             gender=gender2,
             hour_confidence="高",
             minute=minute2,
-            longitude=longitude2
+            longitude=longitude2,
+            audit_level=Config.AUDIT_FULL
         )
         
         if not bazi1_result or not bazi2_result:
@@ -1546,7 +1701,8 @@ async def test_pair_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
             await update.message.reply_text(TESTPAIR_BAZI_CALC_FAILED_TEXT)
             return
         
-        match_result = calculate_match(bazi1_result, bazi2_result, gender1, gender2, is_testpair=True)
+        match_result = calculate_match(bazi1_result, bazi2_result, gender1, gender2, is_testpair=True,
+                                       audit_level=Config.AUDIT_FULL)
         
         match_text = BaziFormatters.format_test_pair_result(match_result, bazi1_result, bazi2_result)
         
@@ -1702,6 +1858,11 @@ async def find_soulmate_purpose(update: Update, context: ContextTypes.DEFAULT_TY
     
     date_count = (end_year - start_year + 1) * 365
     
+    if context.user_data.get("soulmate_searching"):
+        from texts import FIND_SOULMATE_ALREADY_RUNNING_TEXT
+        await update.message.reply_text(FIND_SOULMATE_ALREADY_RUNNING_TEXT, reply_markup=ReplyKeyboardRemove())
+        return ConversationHandler.END
+    
     from texts import FIND_SOULMATE_CALCULATING_TEXT
     calculating_msg = await update.message.reply_text(
         FIND_SOULMATE_CALCULATING_TEXT.format(
@@ -1725,41 +1886,105 @@ async def find_soulmate_purpose(update: Update, context: ContextTypes.DEFAULT_TY
         
         user_gender = user_profile.get("gender")
         
+        # 搜尋在背景任務執行，處理函數立即返回，其他用戶的命令及按鈕不受阻塞
+        context.user_data["soulmate_searching"] = True
+        context.application.create_task(
+            run_soulmate_search(
+                update.message, calculating_msg, context.user_data,
+                user_profile, user_gender, start_year, end_year, purpose
+            ),
+            update=update
+        )
+        
+    except Exception as e:
+        logger.error(f"搜尋真命天子失敗: {e}", exc_info=True)
+        from texts import FIND_SOULMATE_SEARCH_ERROR_TEXT
+        await update.message.reply_text(
+            FIND_SOULMATE_SEARCH_ERROR_TEXT.format(error=str(e))
+        )
+    
+    return ConversationHandler.END
+
+async def run_soulmate_search(message, calculating_msg, user_data: Dict[str, Any], user_profile: Dict[str, Any],
+                              user_gender: str, start_year: int, end_year: int, purpose: str):
+    """1.8.3.1 背景執行真命天子搜尋 - 搜尋在專用線程池執行，期間定期以進度編輯計算中訊息，完成後發送結果"""
+    from texts import (
+        FIND_SOULMATE_PROGRESS_TEXT, FIND_SOULMATE_STAGE_TEXTS, FIND_SOULMATE_BEST_PENDING_TEXT,
+        FIND_SOULMATE_NO_RESULTS_TEXT, FIND_SOULMATE_COMPLETE_TEXT, FIND_SOULMATE_SEARCH_ERROR_TEXT
+    )
+    
+    # 搜尋線程只寫入最新進度，事件循環按間隔讀取
+    progress_state: Dict[str, Any] = {}
+    
+    def on_progress(stage: str, scanned: int, total: int, best: Optional[float]):
+        progress_state["latest"] = (stage, scanned, total, best)
+    
+    try:
         logger.info(f"開始真命天子搜尋：範圍{start_year}-{end_year}, 目的{purpose}, 性別{user_gender}")
         
-        top_matches = SoulmateFinder.find_top_matches(
-            user_profile, user_gender, start_year, end_year, purpose, limit=5
+        search = asyncio.get_running_loop().run_in_executor(
+            soulmate_executor,
+            functools.partial(
+                SoulmateFinder.find_top_matches,
+                user_profile, user_gender, start_year, end_year, purpose, limit=5, progress=on_progress
+            )
         )
         
+        last_text = None
+        while True:
+            done, _ = await asyncio.wait({search}, timeout=SOULMATE_PROGRESS_INTERVAL)
+            if done:
+                break
+            latest = progress_state.get("latest")
+            if not latest:
+                continue
+            stage, scanned, total, best = latest
+            progress_text = FIND_SOULMATE_PROGRESS_TEXT.format(
+                start_year=start_year,
+                end_year=end_year,
+                stage=FIND_SOULMATE_STAGE_TEXTS.get(stage, stage),
+                scanned=scanned,
+                total=total,
+                percent=int(scanned * 100 / total) if total else 0,
+                best=f"{best:.1f}分" if best is not None else FIND_SOULMATE_BEST_PENDING_TEXT
+            )
+            if progress_text == last_text:
+                continue
+            try:
+                await calculating_msg.edit_text(progress_text)
+                last_text = progress_text
+            except Exception as e:
+                # 進度只是提示，編輯失敗（如觸發限流）不影響搜尋
+                logger.debug(f"更新搜尋進度訊息失敗: {e}")
+        
+        top_matches = search.result()
+        
         logger.info(f"真命天子搜尋完成：找到{len(top_matches)}個匹配")
         
         if not top_matches:
-            from texts import FIND_SOULMATE_NO_RESULTS_TEXT
-            await update.message.reply_text(
+            await message.reply_text(
                 FIND_SOULMATE_NO_RESULTS_TEXT.format(
                     start_year=start_year,
                     end_year=end_year
                 )
             )
-            return ConversationHandler.END
+            return
         
-        from texts import FIND_SOULMATE_COMPLETE_TEXT
-        await update.message.reply_text(
+        await message.reply_text(
             FIND_SOULMATE_COMPLETE_TEXT.format(count=len(top_matches))
         )
         
         formatted_message = format_find_soulmate_result(top_matches, start_year, end_year, purpose)
         
-        await update.message.reply_text(formatted_message)
+        await message.reply_text(formatted_message)
         
     except Exception as e:
         logger.error(f"搜尋真命天子失敗: {e}", exc_info=True)
-        from texts import FIND_SOULMATE_SEARCH_ERROR_TEXT
-        await update.message.reply_text(
+        await message.reply_text(
             FIND_SOULMATE_SEARCH_ERROR_TEXT.format(error=str(e))
         )
-    
-    return ConversationHandler.END
+    finally:
+        user_data.pop("soulmate_searching", None)
 
 @check_maintenance
 async def find_soulmate_cancel(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -1884,9 +2109,9 @@ async def button_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
                 current_user_username = a_username if is_user_a else b_username
                 other_user_username = b_username if is_user_a else a_username
                 
-                # 關鍵修正：使用match_result中的rating字段，而不是調用不存在的ScoringEngine.get_rating
-                match_details = json.loads(match_details_str) if match_details_str else {}
-                rating = match_details.get('rating', '未知')
+                # 評級由數值明細推導（兼容舊版完整結果JSON）
+                breakdown = MatchBreakdown.from_stored(match_details_str)
+                rating = breakdown.rating if breakdown else '未知'
                 
                 # 修正：配對成功消息只顯示username，不顯示詳細分析
                 from texts import MATCH_SUCCESS_TEXT_TEMPLATE, MATCH_SUCCESS_NO_USERNAME_TEXT
@@ -2045,6 +2270,29 @@ async def list_tests_command(update: Update, context: ContextTypes.DEFAULT_TYPE)
         logger.error(f"列出測試失敗: {e}", exc_info=True)
         from texts import LIST_TESTS_FAILED_TEXT
         await update.message.reply_text(LIST_TESTS_FAILED_TEXT.format(error=str(e)))
+
+@check_maintenance
+@check_admin_only
+async def cache_stats_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """1.10.5 查看排盤及配對結果緩存統計（可帶 chart/match 及 on/off/clear/reset 參數，未指定緩存時操作排盤緩存）"""
+    try:
+        args = [arg.lower() for arg in context.args] if context.args else []
+        target = args.pop(0) if args and args[0] in ("chart", "match") else "chart"
+        action = args[0] if args else ""
+        
+        from admin_service import AdminService
+        admin_service = AdminService()
+        chart_stats = admin_service.manage_chart_cache(action if target == "chart" else "")
+        match_stats = admin_service.manage_match_cache(action if target == "match" else "")
+        formatted = (admin_service.format_cache_stats(chart_stats) + "\n\n" +
+                     admin_service.format_match_cache_stats(match_stats))
+        
+        await update.message.reply_text(formatted)
+            
+    except Exception as e:
+        logger.error(f"獲取緩存統計失敗: {e}", exc_info=True)
+        from texts import CACHE_STATS_FAILED_TEXT
+        await update.message.reply_text(CACHE_STATS_FAILED_TEXT.format(error=str(e)))
 # ========1.10 管理員專用命令結束 ========#
 
 # ========1.11 主程序開始 ========#
@@ -2057,6 +2305,13 @@ def main():
     init_db_pool()
     init_db()
     
+    # 並行搜尋模式才預熱真命天子搜尋進程池，首次/find_soulmate不需等待進程啟動及導入模組
+    if SEARCH_MODE == SEARCH_MODE_PARALLEL:
+        warm_search_pool()
+    
+    # 精英八字庫於部署構建階段生成（railway.json buildCommand）；缺庫且開啟BAZI_ELITE_AUTO_BUILD時才後台生成
+    ProfessionalEliteLibrary.build_in_background()
+    
     token = os.getenv("BOT_TOKEN", "").strip()
     
     if not token:
@@ -2125,6 +2380,7 @@ def main():
         app.add_handler(CommandHandler("stats", stats_command))
         app.add_handler(CommandHandler("quicktest", quick_test_command))
         app.add_handler(CommandHandler("listtests", list_tests_command))
+        app.add_handler(CommandHandler("cachestats", cache_stats_command))
         
         # 回調處理
         app.add_handler(CallbackQueryHandler(button_callback))
@@ -2162,6 +2418,16 @@ if __name__ == "__main__":
 # 1.11 主程序
 
 # 🔖 修正紀錄
+# 2026-10-16: /find_soulmate 搜尋改為背景任務（run_soulmate_search），在專用線程池執行並定期更新進度訊息，不再阻塞事件循環
+# 2026-10-16: 啟動時預熱真命天子搜尋進程池（warm_search_pool）
+# 2026-10-16: 只有SEARCH_MODE為並行搜尋時才建立及預熱搜尋進程池
+# 2026-10-16: 啟動時精英八字庫不存在則後台生成（BAZI_ELITE_AUTO_BUILD），生成前搜尋即時排盤
+# 2026-10-16: 重新註冊時比較評分簽名，改變則背景增量重算該用戶全部已存配對並批量寫回（rescore_user_matches）
+# 2026-10-16: matches.match_details 改存 MatchBreakdown 緊湊數值明細，按鈕回調由明細推導評級
+# 2026-10-16: /cachestats 同時顯示配對結果緩存統計，支援 /cachestats match on|off|clear|reset
+# 2026-10-16: /match 改用 calculate_match_many 一次過評分全部對象，只為最佳對象計算完整配對結果
+# 2026-10-16: /testpair 明確使用完整審計日誌級別（audit_level=full）
+# 2026-10-16: 新增 /cachestats 管理員命令，查看及開關排盤緩存
 # 2026-02-10: 修復button_callback中的AttributeError問題，改為使用match_result中的rating字段
 # 2026-02-10: 保持所有功能不變，僅修正核心錯誤
 # 2026-02-08: 徹底修復配對流程，確保用戶A按/match後立即通知用戶B
@@ -2170,4 +2436,5 @@ if __name__ == "__main__":
 # 2026-02-08: 在match函數中立即儲存配對信息到數據庫，確保按鈕回調可讀取
 # 2026-02-08: 修正配對成功消息格式，移除詳細配對分析，只顯示對方username
 # 2026-02-08: 將所有長文本搬遷到texts.py，保持代碼整潔
-# 2026-02-08: 保持所有現有功能不變，僅修正核心問題
\ No newline at end of file
+# 2026-02-08: 保持所有現有功能不變，僅修正核心問題
+# 2026-10-16: 精英八字庫改於部署構建階段生成，啟動時後台生成須以BAZI_ELITE_AUTO_BUILD開啟
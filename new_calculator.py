@@ -6,10 +6,21 @@
 架構：核心計算 → 命局結構分析 → 精準評分 → 審證驗證
 """
 
+import json
 import logging
 import math
-from typing import Dict, List, Tuple, Any, Optional
+import os
+import shutil
+import sys
+import struct
+import threading
+import time
+from array import array
+from bisect import bisect_right
+from collections import OrderedDict
+from typing import Dict, List, Tuple, Any, Optional, Sequence, Union, Callable
 from datetime import datetime, timedelta
+import numpy as np
 import sxtwl
 
 logger = logging.getLogger(__name__)
@@ -179,6 +190,16 @@ class ProfessionalConfig:
         ("辰", "午", "酉", "亥")  # 自刑（辰辰、午午、酉酉、亥亥）
     ]
     
+    BRANCH_SIX_COMBINATION_PAIRS = [  # 地支六合
+        ("子", "丑"), ("寅", "亥"), ("卯", "戌"),
+        ("辰", "酉"), ("巳", "申"), ("午", "未")
+    ]
+    
+    STEM_FIVE_COMBINATION_PAIRS = [  # 天干五合
+        ("甲", "己"), ("乙", "庚"), ("丙", "辛"),
+        ("丁", "壬"), ("戊", "癸")
+    ]
+    
     @classmethod
     def get_rating(cls, score: float) -> str:
         """1.2.1.11 根據分數取得評級名稱。跟評級標準匹配"""
@@ -202,41 +223,73 @@ class ProfessionalConfig:
     
     @classmethod
     def is_branch_clash(cls, branch1: str, branch2: str) -> bool:
-        """1.2.1.14 檢查地支六沖"""
-        for pair in cls.BRANCH_CLASH_PAIRS:
-            if (branch1 == pair[0] and branch2 == pair[1]) or (branch1 == pair[1] and branch2 == pair[0]):
-                return True
-        return False
+        """1.2.1.14 檢查地支六沖（查1.14關係矩陣）"""
+        return ProfessionalRelations.is_branch_clash(branch1, branch2)
     
     @classmethod
     def is_branch_harm(cls, branch1: str, branch2: str) -> bool:
-        """1.2.1.15 檢查地支六害"""
-        for pair in cls.BRANCH_HARM_PAIRS:
-            if (branch1 == pair[0] and branch2 == pair[1]) or (branch1 == pair[1] and branch2 == pair[0]):
-                return True
-        return False
+        """1.2.1.15 檢查地支六害（查1.14關係矩陣）"""
+        return ProfessionalRelations.is_branch_harm(branch1, branch2)
     
     @classmethod
     def has_three_punishment(cls, branches: List[str]) -> bool:
-        """1.2.1.16 檢查地支三刑"""
-        # 檢查寅巳申三刑
-        if "寅" in branches and "巳" in branches and "申" in branches:
-            return True
-        
-        # 檢查丑戌未三刑
-        if "丑" in branches and "戌" in branches and "未" in branches:
-            return True
-        
-        # 檢查子卯刑
-        if "子" in branches and "卯" in branches:
-            return True
-        
-        # 檢查自刑
-        for branch in branches:
-            if branches.count(branch) >= 2 and branch in ["辰", "午", "酉", "亥"]:
-                return True
-        
-        return False
+        """1.2.1.16 檢查地支三刑（1.14地支位元遮罩運算）"""
+        return ProfessionalRelations.punishment_type(branches) is not None
+    
+    # ========== 1.2.1.17 干支日曆預計算表配置 ==========
+    CALENDAR_START_YEAR: int = 1900           # 預計算表覆蓋起始年份
+    CALENDAR_END_YEAR: int = 2100             # 預計算表覆蓋結束年份（含）
+    CALENDAR_TABLE_PATH: str = os.getenv(     # 表文件位置，可用環境變數指定可寫目錄
+        "BAZI_CALENDAR_PATH",
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), "ganzhi_calendar.npy")
+    )
+    
+    # ========== 1.2.1.18 八字排盤緩存配置 ==========
+    CHART_CACHE_ENABLED: bool = os.getenv("BAZI_CHART_CACHE", "").lower() in ("1", "true", "on")  # 預設關閉
+    CHART_CACHE_MAX_SIZE: int = int(os.getenv("BAZI_CHART_CACHE_SIZE", "1024"))  # 每筆約12KB，1024筆約12MB
+    
+    # ========== 1.2.1.19 審計日誌級別 ==========
+    AUDIT_OFF: str = "off"            # 不構建任何審計字串（搜尋、批量等熱路徑）
+    AUDIT_SUMMARY: str = "summary"    # 只記錄各階段里程碑
+    AUDIT_FULL: str = "full"          # 完整審計軌跡（/testpair）
+    AUDIT_LEVEL: str = os.getenv("BAZI_AUDIT_LEVEL", "full")  # 未指定級別時的預設值，保持向後兼容
+    
+    @classmethod
+    def create_audit_logs(cls, level: Optional[str] = None) -> Tuple[Optional[List[str]], Optional[List[str]]]:
+        """1.2.1.20 按審計級別建立(里程碑日誌, 細節日誌)；為None時調用方跳過字串構建"""
+        level = level or cls.AUDIT_LEVEL
+        if level == cls.AUDIT_OFF:
+            return None, None
+        audit_log: List[str] = []
+        return audit_log, (audit_log if level == cls.AUDIT_FULL else None)
+    
+    # ========== 1.2.1.21 夏令時地區配置 ==========
+    DST_REGION: str = "HK"            # 夏令時區間索引預設地區（見1.11）
+    
+    # ========== 1.2.1.22 八字分析範圍 ==========
+    ANALYSIS_FULL: str = "full"        # 八個分析階段全部計算（預設）
+    ANALYSIS_SCORING: str = "scoring"  # 只算配對評分用到的五行、身強弱、格局、喜忌，其餘首次需要時再補算
+    ANALYSIS_PILLARS: str = "pillars"  # 只算四柱、五行及身強弱（搜尋預篩快速路徑）
+    ANALYSIS_ORDER = (ANALYSIS_PILLARS, ANALYSIS_SCORING, ANALYSIS_FULL)  # 由少到多
+    
+    # ========== 1.2.1.23 配對結果詳細程度 ==========
+    DETAIL_FULL: str = "full"    # 完整報告：各步驟文字細節、評級描述、關係模型、審計日誌（預設）
+    DETAIL_SCORE: str = "score"  # 只返回分數、結構類型及評級，不構建任何文字（排序候選用）
+    
+    # ========== 1.2.1.24 配對結果緩存配置 ==========
+    MATCH_CACHE_ENABLED: bool = os.getenv("BAZI_MATCH_CACHE", "1").lower() in ("1", "true", "on")  # 預設開啟
+    MATCH_CACHE_MAX_SIZE: int = int(os.getenv("BAZI_MATCH_CACHE_SIZE", "4096"))  # 完整報告每筆約3KB
+    MATCH_CACHE_TTL_SECONDS: float = float(os.getenv("BAZI_MATCH_CACHE_TTL", "3600"))  # 記錄存活秒數
+    
+    # ========== 1.2.1.25 精英八字庫配置 ==========
+    ELITE_START_YEAR: int = 1925              # 精英庫覆蓋起始年份
+    ELITE_END_YEAR: int = 2025                # 精英庫覆蓋結束年份（含）
+    ELITE_HOURS: Tuple[int, ...] = tuple(range(0, 24, 2))  # 每日十二時辰代表時刻（時辰中點）
+    ELITE_LIBRARY_PATH: str = os.getenv(      # 欄式文件目錄，可用環境變數指定可寫目錄
+        "BAZI_ELITE_PATH",
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), "elite_charts")
+    )
+    ELITE_AUTO_BUILD: bool = os.getenv("BAZI_ELITE_AUTO_BUILD", "0").lower() in ("1", "true", "on")  # 啟動時缺庫則後台生成（預設關閉，部署時於構建階段生成）
 
 # 創建專業配置實例（保持向後兼容：PC 名稱在其他文件大量使用）
 PC = ProfessionalConfig
@@ -258,33 +311,40 @@ class ProfessionalTimeProcessor:
         minute: int,
         longitude: float,
         confidence: str,
+        audit_level: Optional[str] = None,
     ) -> Dict[str, Any]:
-        """1.3.1.1 專業真太陽時計算（平太陽時 → 真太陽時）跟天文算法"""
-        audit_log: List[str] = []
-        audit_log.append(
-            f"🔍 專業時間計算開始: {year}-{month:02d}-{day:02d} {hour:02d}:{minute:02d} "
-            f"(經度: {longitude:.2f}°，原始信心度: {confidence})"
-        )
+        """1.3.1.1 專業真太陽時計算（平太陽時 → 真太陽時）跟天文算法；audit_level見PC.AUDIT_*"""
+        audit_log, detail_log = PC.create_audit_logs(audit_level)
+        if audit_log is not None:
+            audit_log.append(
+                f"🔍 專業時間計算開始: {year}-{month:02d}-{day:02d} {hour:02d}:{minute:02d} "
+                f"(經度: {longitude:.2f}°，原始信心度: {confidence})"
+            )
         
         try:
             # 1. 夏令時檢查
-            dst_adjust = ProfessionalTimeProcessor._get_dst_adjustment(year, month, day, audit_log)
+            dst_adjust = ProfessionalTimeProcessor._get_dst_adjustment(year, month, day, detail_log)
             
             # 2. 經度校正
-            lon_adjust = ProfessionalTimeProcessor._get_longitude_adjustment(longitude, audit_log)
+            lon_adjust = ProfessionalTimeProcessor._get_longitude_adjustment(longitude, detail_log)
             
             # 3. 均時差校正
             eot_adjust = ProfessionalTimeProcessor._get_equation_of_time_adjustment(
-                year, month, day, hour, minute, audit_log
+                year, month, day, hour, minute, detail_log
             )
             
-            # 4. 累計全部時間調整
+            # 4. 累計全部時間調整（插值結果落在取整邊界附近時改用公式，結果與逐個公式計算相同）
             total_adjust_minutes = dst_adjust + lon_adjust + eot_adjust
-            audit_log.append(f"📊 總調整量: {total_adjust_minutes:+.1f} 分鐘")
+            if ProfessionalEquationOfTimeTable.near_rounding_edge(hour * 60 + minute + total_adjust_minutes,
+                                                                  total_adjust_minutes):
+                eot_adjust = ProfessionalTimeProcessor._equation_of_time_formula(year, month, day, hour, minute)
+                total_adjust_minutes = dst_adjust + lon_adjust + eot_adjust
+            if audit_log is not None:
+                audit_log.append(f"📊 總調整量: {total_adjust_minutes:+.1f} 分鐘")
             total_minutes = hour * 60 + minute + total_adjust_minutes
             
             # 5. 日界處理
-            day_delta, adjusted_minutes = ProfessionalTimeProcessor._apply_day_boundary(total_minutes, audit_log)
+            day_delta, adjusted_minutes = ProfessionalTimeProcessor._apply_day_boundary(total_minutes, detail_log)
             true_hour = int(adjusted_minutes // 60)
             true_minute = int(round(adjusted_minutes % 60))
             
@@ -295,13 +355,14 @@ class ProfessionalTimeProcessor:
             
             # 6. 動態調整信心度
             new_confidence = ProfessionalTimeProcessor._adjust_confidence_level(
-                confidence, abs(total_adjust_minutes), audit_log
+                confidence, abs(total_adjust_minutes), detail_log
             )
             
-            audit_log.append(
-                f"✅ 最終真太陽時結果: {true_hour:02d}:{true_minute:02d} "
-                f"(信心度: {new_confidence}，跨日: {day_delta:+d} 天)"
-            )
+            if audit_log is not None:
+                audit_log.append(
+                    f"✅ 最終真太陽時結果: {true_hour:02d}:{true_minute:02d} "
+                    f"(信心度: {new_confidence}，跨日: {day_delta:+d} 天)"
+                )
             
             return {
                 'hour': true_hour,
@@ -310,7 +371,7 @@ class ProfessionalTimeProcessor:
                 'adjusted': abs(total_adjust_minutes) > 5,
                 'day_adjusted': day_delta,
                 'total_adjust_minutes': total_adjust_minutes,
-                'audit_log': audit_log,
+                'audit_log': audit_log if audit_log is not None else [],
             }
             
         except Exception as e:
@@ -318,64 +379,70 @@ class ProfessionalTimeProcessor:
             raise TimeCalculationError(f"時間計算失敗: {str(e)}")
     
     @staticmethod
-    def _get_dst_adjustment(year: int, month: int, day: int, audit_log: list[str]) -> float:
-        """1.3.1.1.1 檢查是否處於香港歷史夏令時期間"""
+    def _get_dst_adjustment(year: int, month: int, day: int, audit_log: Optional[List[str]],
+                            region: Optional[str] = None) -> float:
+        """1.3.1.1.1 檢查是否處於歷史夏令時期間（預設香港，經1.11區間索引二分查找）"""
         dst_adjust = 0.0
         try:
-            date_obj = datetime(year, month, day)
-            for start_str, end_str in PC.HK_DST_PERIODS:
-                start_date = datetime.strptime(start_str, "%Y-%m-%d")
-                end_date = datetime.strptime(end_str, "%Y-%m-%d")
-                if start_date <= date_obj <= end_date:
-                    dst_adjust = -60.0
-                    audit_log.append(f"⏰ 檢測到夏令時: {start_str} 至 {end_str}")
-                    break
+            period = ProfessionalDSTRegistry.lookup(datetime(year, month, day).toordinal(), region)
+            if period is not None:
+                dst_adjust = -60.0
+                if audit_log is not None:
+                    audit_log.append(f"⏰ 檢測到夏令時: {period[0]} 至 {period[1]}")
         except Exception as e:
             logger.warning(f"夏令時檢查異常: {e}")
-            audit_log.append(f"⚠️ 夏令時檢查異常: {e}")
+            if audit_log is not None:
+                audit_log.append(f"⚠️ 夏令時檢查異常: {e}")
         return dst_adjust
     
     @staticmethod
-    def _get_longitude_adjustment(longitude: float, audit_log: list[str]) -> float:
+    def _get_longitude_adjustment(longitude: float, audit_log: Optional[List[str]]) -> float:
         """1.3.1.1.2 經度校正：相對於東經120度的時間差"""
         diff = longitude - PC.TIME_ZONE_MERIDIAN
         adjust = diff * PC.LONGITUDE_CORRECTION
-        audit_log.append(f"📍 經度校正: {adjust:+.1f} 分鐘 (經度差: {diff:+.2f}°)")
+        if audit_log is not None:
+            audit_log.append(f"📍 經度校正: {adjust:+.1f} 分鐘 (經度差: {diff:+.2f}°)")
         return adjust
     
     @staticmethod
     def _get_equation_of_time_adjustment(
-        year: int, month: int, day: int, hour: int, minute: int, audit_log: list[str]
+        year: int, month: int, day: int, hour: int, minute: int, audit_log: Optional[List[str]]
     ) -> float:
-        """1.3.1.1.3 計算均時差（Equation of Time）"""
+        """1.3.1.1.3 計算均時差（Equation of Time），經1.12預計算表插值，範圍外回退公式"""
         try:
-            jd = ProfessionalTimeProcessor._gregorian_to_julian_day(year, month, day, hour, minute)
-            t = (jd - 2451545.0) / 36525.0
-            
-            L0 = 280.46646 + 36000.76983 * t + 0.0003032 * t * t
-            M = 357.52911 + 35999.05029 * t - 0.0001537 * t * t
-            
-            C = (
-                (1.914602 - 0.004817 * t - 0.000014 * t * t) * math.sin(math.radians(M))
-                + (0.019993 - 0.000101 * t) * math.sin(math.radians(2 * M))
-                + 0.000289 * math.sin(math.radians(3 * M))
-            )
-            
-            L = L0 + C
-            eot = (
-                9.87 * math.sin(math.radians(2 * L))
-                - 7.53 * math.cos(math.radians(L))
-                - 1.5 * math.sin(math.radians(L))
-            )
-            
-            eot = max(-20.0, min(20.0, eot))
-            audit_log.append(f"☀️ 均時差校正: {eot:+.1f} 分鐘")
+            eot = ProfessionalEquationOfTimeTable.lookup(year, month, day, hour, minute)
+            if audit_log is not None:
+                audit_log.append(f"☀️ 均時差校正: {eot:+.1f} 分鐘")
             return eot
         except Exception as e:
             logger.warning(f"均時差計算異常: {e}")
-            audit_log.append(f"⚠️ 均時差計算異常: {e}，暫以 0 分鐘處理")
+            if audit_log is not None:
+                audit_log.append(f"⚠️ 均時差計算異常: {e}，暫以 0 分鐘處理")
             return 0.0
     
+    @staticmethod
+    def _equation_of_time_formula(year: int, month: int, day: int, hour: int, minute: int) -> float:
+        """1.3.1.1.3.1 均時差天文公式（預計算表的來源及範圍外回退）"""
+        jd = ProfessionalTimeProcessor._gregorian_to_julian_day(year, month, day, hour, minute)
+        t = (jd - 2451545.0) / 36525.0
+        
+        L0 = 280.46646 + 36000.76983 * t + 0.0003032 * t * t
+        M = 357.52911 + 35999.05029 * t - 0.0001537 * t * t
+        
+        C = (
+            (1.914602 - 0.004817 * t - 0.000014 * t * t) * math.sin(math.radians(M))
+            + (0.019993 - 0.000101 * t) * math.sin(math.radians(2 * M))
+            + 0.000289 * math.sin(math.radians(3 * M))
+        )
+        
+        L = L0 + C
+        eot = (
+            9.87 * math.sin(math.radians(2 * L))
+            - 7.53 * math.cos(math.radians(L))
+            - 1.5 * math.sin(math.radians(L))
+        )
+        return max(-20.0, min(20.0, eot))
+    
     @staticmethod
     def _gregorian_to_julian_day(year: int, month: int, day: int, hour: int, minute: int) -> float:
         """1.3.1.1.4 將公曆日期時間轉換為儒略日"""
@@ -389,23 +456,25 @@ class ProfessionalTimeProcessor:
         return jd_day + time_fraction
     
     @staticmethod
-    def _apply_day_boundary(total_minutes: float, audit_log: list[str]) -> tuple[int, float]:
+    def _apply_day_boundary(total_minutes: float, audit_log: Optional[List[str]]) -> tuple[int, float]:
         """1.3.1.1.5 處理總分鐘數的日界跨天"""
         day_delta = 0
         adjusted = total_minutes
         if total_minutes < 0:
             adjusted += 24 * 60
             day_delta = -1
-            audit_log.append("🔄 向前跨日調整（減1天）")
+            if audit_log is not None:
+                audit_log.append("🔄 向前跨日調整（減1天）")
         elif total_minutes >= 24 * 60:
             adjusted -= 24 * 60
             day_delta = 1
-            audit_log.append("🔄 向後跨日調整（加1天）")
+            if audit_log is not None:
+                audit_log.append("🔄 向後跨日調整（加1天）")
         return day_delta, adjusted
     
     @staticmethod
     def _adjust_confidence_level(
-        original: str, abs_adjust_minutes: float, audit_log: list[str]
+        original: str, abs_adjust_minutes: float, audit_log: Optional[List[str]]
     ) -> str:
         """1.3.1.1.6 根據總調整幅度動態降低信心度"""
         if abs_adjust_minutes > 60:
@@ -417,7 +486,8 @@ class ProfessionalTimeProcessor:
         else:
             new = original
         if new != original:
-            audit_log.append(f"📉 信心度因調整幅度大而降級: {original} → {new}")
+            if audit_log is not None:
+                audit_log.append(f"📉 信心度因調整幅度大而降級: {original} → {new}")
         return new
     
     @staticmethod
@@ -523,12 +593,18 @@ class ProfessionalBaziCalculator:
                      hour_confidence: str = "高",
                      minute: Optional[int] = None,
                      longitude: float = PC.DEFAULT_LONGITUDE,
-                     latitude: float = PC.DEFAULT_LATITUDE) -> Dict[str, Any]:
-        """1.4.1.6 專業八字計算主函數"""
-        audit_log = []
+                     latitude: float = PC.DEFAULT_LATITUDE,
+                     audit_level: Optional[str] = None,
+                     analysis: Optional[str] = None) -> Dict[str, Any]:
+        """
+        1.4.1.6 專業八字計算主函數
+        audit_level：off/summary/full，見PC.AUDIT_*；analysis：full/scoring，見PC.ANALYSIS_*
+        """
+        audit_log, _ = PC.create_audit_logs(audit_level)
         
         try:
-            audit_log.append(f"🎯 開始專業八字計算: {year}年{month}月{day}日{hour}時")
+            if audit_log is not None:
+                audit_log.append(f"🎯 開始專業八字計算: {year}年{month}月{day}日{hour}時")
             
             # 處理分鐘缺失
             processed_minute = minute if minute is not None else 0
@@ -537,9 +613,10 @@ class ProfessionalBaziCalculator:
             
             # 使用專業時間處理引擎
             true_solar_time = ProfessionalTimeProcessor.calculate_true_solar_time_pro(
-                year, month, day, hour, processed_minute, longitude, hour_confidence
+                year, month, day, hour, processed_minute, longitude, hour_confidence, audit_level
             )
-            audit_log.extend(true_solar_time.get('audit_log', []))
+            if audit_log is not None:
+                audit_log.extend(true_solar_time.get('audit_log', []))
             
             # 專業日界處理
             adjusted_date = ProfessionalTimeProcessor.apply_day_boundary_pro(
@@ -549,28 +626,25 @@ class ProfessionalBaziCalculator:
             )
             adjusted_year, adjusted_month, adjusted_day, final_confidence = adjusted_date
             
-            # 使用sxtwl計算四柱
-            day_obj = sxtwl.fromSolar(adjusted_year, adjusted_month, adjusted_day)
-            
-            # 獲取天干地支索引
-            y_gz = day_obj.getYearGZ()
-            m_gz = day_obj.getMonthGZ()
-            d_gz = day_obj.getDayGZ()
+            # 查干支日曆表取得年月日柱索引（範圍外自動回退sxtwl）
+            y_tg, y_dz, m_tg, m_dz, d_tg, d_dz = ProfessionalGanzhiCalendar.lookup(
+                adjusted_year, adjusted_month, adjusted_day
+            )
             
-            # 計算時柱
+            # 計算時柱（沿用已查得的日干，不再重複查表）
             hour_pillar = ProfessionalBaziCalculator._calculate_hour_pillar_pro(
-                adjusted_year, adjusted_month, adjusted_day, true_solar_time['hour']
+                adjusted_year, adjusted_month, adjusted_day, true_solar_time['hour'], day_stem=d_tg
             )
             
             # 組裝基礎八字數據
             STEMS = ProfessionalBaziCalculator.STEMS
             BRANCHES = ProfessionalBaziCalculator.BRANCHES
             
-            year_pillar = f"{STEMS[y_gz.tg]}{BRANCHES[y_gz.dz]}"
-            month_pillar = f"{STEMS[m_gz.tg]}{BRANCHES[m_gz.dz]}"
-            day_pillar = f"{STEMS[d_gz.tg]}{BRANCHES[d_gz.dz]}"
+            year_pillar = f"{STEMS[y_tg]}{BRANCHES[y_dz]}"
+            month_pillar = f"{STEMS[m_tg]}{BRANCHES[m_dz]}"
+            day_pillar = f"{STEMS[d_tg]}{BRANCHES[d_dz]}"
             
-            day_stem = STEMS[d_gz.tg]
+            day_stem = STEMS[d_tg]
             day_stem_element = ProfessionalBaziCalculator.STEM_ELEMENTS.get(day_stem, "")
             
             # 基礎數據結構
@@ -579,7 +653,7 @@ class ProfessionalBaziCalculator:
                 "month_pillar": month_pillar,
                 "day_pillar": day_pillar,
                 "hour_pillar": hour_pillar,
-                "zodiac": ProfessionalBaziCalculator.ZODIACS[y_gz.dz],
+                "zodiac": ProfessionalBaziCalculator.ZODIACS[y_dz],
                 "day_stem": day_stem,
                 "day_stem_element": day_stem_element,
                 "hour_confidence": final_confidence,
@@ -596,27 +670,31 @@ class ProfessionalBaziCalculator:
                 "adjusted_day": adjusted_day,
                 "time_adjusted": true_solar_time['adjusted'],
                 "day_adjusted": true_solar_time.get('day_adjusted', 0),
-                "audit_log": audit_log
+                "audit_log": audit_log if audit_log is not None else []
             }
             
             # 專業深度分析
-            bazi_data = ProfessionalBaziCalculator._analyze_professional_enhanced(bazi_data, gender, audit_log)
+            bazi_data = ProfessionalBaziCalculator._analyze_professional_enhanced(
+                bazi_data, gender, audit_log, audit_level=audit_level, analysis=analysis
+            )
             
-            audit_log.append(f"✅ 專業八字計算完成: {year_pillar} {month_pillar} {day_pillar} {hour_pillar}")
+            if audit_log is not None:
+                audit_log.append(f"✅ 專業八字計算完成: {year_pillar} {month_pillar} {day_pillar} {hour_pillar}")
             
             return bazi_data
             
         except Exception as e:
             logger.error(f"專業八字計算錯誤: {e}", exc_info=True)
-            audit_log.append(f"❌ 八字計算錯誤: {str(e)}")
+            if audit_log is not None:
+                audit_log.append(f"❌ 八字計算錯誤: {str(e)}")
             raise ElementAnalysisError(f"八字分析失敗: {str(e)}")
     
     @staticmethod
-    def _calculate_hour_pillar_pro(year: int, month: int, day: int, hour: int) -> str:
-        """1.4.1.6.1 專業時柱計算 - 使用五鼠遁訣"""
-        day_obj = sxtwl.fromSolar(year, month, day)
-        d_gz = day_obj.getDayGZ()
-        day_stem = d_gz.tg
+    def _calculate_hour_pillar_pro(year: int, month: int, day: int, hour: int,
+                                   day_stem: Optional[int] = None) -> str:
+        """1.4.1.6.1 專業時柱計算 - 使用五鼠遁訣（day_stem：已知日干索引，未提供時查表）"""
+        if day_stem is None:
+            day_stem = ProfessionalGanzhiCalendar.lookup(year, month, day)[4]
         
         # 時辰地支
         hour_branch = ProfessionalBaziCalculator._hour_to_branch_pro(hour)
@@ -658,74 +736,64 @@ class ProfessionalBaziCalculator:
         return hour_map.get(hour % 24, 0)
     
     @staticmethod
-    def _analyze_professional_enhanced(bazi_data: Dict, gender: str, audit_log: List[str]) -> Dict:
-        """1.4.1.7 專業深度分析"""
+    def _analyze_professional_enhanced(bazi_data: Dict, gender: str, audit_log: Optional[List[str]],
+                                       elements: Optional[Dict[str, float]] = None,
+                                       audit_level: Optional[str] = None,
+                                       analysis: Optional[str] = None) -> Dict:
+        """
+        1.4.1.7 專業深度分析
+        elements：批量引擎已向量化算好的五行分佈，傳入則直接沿用
+        audit_level：非full時各分析細節不寫入audit_log，只保留階段里程碑
+        analysis：PC.ANALYSIS_PILLARS只算第1-2階段、PC.ANALYSIS_SCORING只算第1-4階段，並標記analysis_level，
+        其餘階段由complete_analysis()在首次需要時補算
+        """
+        detail_log = audit_log if (audit_level or PC.AUDIT_LEVEL) == PC.AUDIT_FULL else None
         try:
-            audit_log.append("🔍 開始專業深度分析")
+            if audit_log is not None:
+                audit_log.append("🔍 開始專業深度分析")
             
             # 1. 專業五行分析
-            bazi_data["elements"] = ProfessionalBaziCalculator._calculate_elements_pro(bazi_data)
-            audit_log.append(f"✅ 五行分析完成: {bazi_data['elements']}")
+            if elements is None:
+                elements = ProfessionalBaziCalculator._calculate_elements_pro(bazi_data)
+            bazi_data["elements"] = elements
+            if audit_log is not None:
+                audit_log.append(f"✅ 五行分析完成: {bazi_data['elements']}")
             
             # 2. 專業身強弱分析
-            strength_score, strength_details = ProfessionalBaziCalculator._calculate_strength_enhanced(bazi_data, audit_log)
+            strength_score, strength_details = ProfessionalBaziCalculator._calculate_strength_enhanced(bazi_data, detail_log)
             bazi_data["strength_score"] = strength_score
             bazi_data["day_stem_strength"] = ProfessionalBaziCalculator._determine_strength_pro(strength_score)
             bazi_data["strength_details"] = strength_details
             
-            audit_log.append(f"✅ 身強弱分析: {strength_score:.1f}分 ({bazi_data['day_stem_strength']})")
-            
-            # 3. 專業格局判定
-            pattern_type, pattern_details = ProfessionalBaziCalculator._determine_pattern_enhanced(bazi_data, audit_log)
-            bazi_data["pattern_type"] = pattern_type
-            bazi_data["pattern_details"] = pattern_details
-            audit_log.append(f"✅ 格局判定: {pattern_type}")
-            
-            # 4. 專業喜用神分析
-            useful_elements, useful_details = ProfessionalBaziCalculator._calculate_useful_elements_pro(
-                bazi_data, gender, audit_log
-            )
-            bazi_data["useful_elements"] = useful_elements
-            bazi_data["useful_details"] = useful_details
-            
-            harmful_elements = ProfessionalBaziCalculator._calculate_harmful_elements_pro(bazi_data, useful_elements)
-            bazi_data["harmful_elements"] = harmful_elements
-            audit_log.append(f"✅ 喜用神分析: 喜{useful_elements}, 忌{harmful_elements}")
-            
-            # 5. 專業夫妻星分析
-            spouse_status, spouse_details = ProfessionalBaziCalculator._analyze_spouse_star_pro(bazi_data, gender)
-            bazi_data["spouse_star_status"] = spouse_status
-            bazi_data["spouse_star_details"] = spouse_details
+            if audit_log is not None:
+                audit_log.append(f"✅ 身強弱分析: {strength_score:.1f}分 ({bazi_data['day_stem_strength']})")
             
-            palace_status, palace_details = ProfessionalBaziCalculator._analyze_spouse_palace_pro(bazi_data)
-            bazi_data["spouse_palace_status"] = palace_status
-            bazi_data["spouse_palace_details"] = palace_details
-            audit_log.append(f"✅ 夫妻分析: 星{spouse_status}, 宮{palace_status}")
+            analysis = analysis or PC.ANALYSIS_FULL
+            if analysis == PC.ANALYSIS_PILLARS:
+                bazi_data["analysis_level"] = PC.ANALYSIS_PILLARS
+                if audit_log is not None:
+                    audit_log.append("✅ 排盤快速路徑完成（格局、喜用神及其餘分析延後計算）")
+                return bazi_data
             
-            # 6. 專業神煞分析
-            shen_sha_names, shen_sha_bonus, shen_sha_details = ProfessionalBaziCalculator._calculate_shen_sha_enhanced(bazi_data)
-            bazi_data["shen_sha_names"] = shen_sha_names
-            bazi_data["shen_sha_bonus"] = shen_sha_bonus
-            bazi_data["shen_sha_details"] = shen_sha_details
-            audit_log.append(f"✅ 神煞分析: {shen_sha_names} ({shen_sha_bonus}分)")
+            ProfessionalBaziCalculator._analyze_scoring_stages(bazi_data, gender, audit_log, detail_log)
             
-            # 7. 專業十神結構
-            shi_shen_structure, shi_shen_details = ProfessionalBaziCalculator._calculate_shi_shen_pro(bazi_data, gender)
-            bazi_data["shi_shen_structure"] = shi_shen_structure
-            bazi_data["shi_shen_details"] = shi_shen_details
-            audit_log.append(f"✅ 十神結構: {shi_shen_structure}")
+            if analysis == PC.ANALYSIS_SCORING:
+                bazi_data["analysis_level"] = PC.ANALYSIS_SCORING
+                if audit_log is not None:
+                    audit_log.append("✅ 評分相關分析完成（夫妻、神煞、十神、大運延後計算）")
+                return bazi_data
             
-            # 8. 專業大運分析
-            dayun_info = ProfessionalBaziCalculator._calculate_dayun_pro(bazi_data, gender)
-            bazi_data["dayun_info"] = dayun_info
+            ProfessionalBaziCalculator._analyze_profile_stages(bazi_data, gender, audit_log)
             
-            audit_log.append("✅ 專業深度分析完成")
+            if audit_log is not None:
+                audit_log.append("✅ 專業深度分析完成")
             
             return bazi_data
             
         except Exception as e:
             logger.error(f"專業分析錯誤: {e}", exc_info=True)
-            audit_log.append(f"❌ 專業分析錯誤: {str(e)}")
+            if audit_log is not None:
+                audit_log.append(f"❌ 專業分析錯誤: {str(e)}")
             raise ElementAnalysisError(f"專業分析失敗: {str(e)}")
     
     @staticmethod
@@ -773,13 +841,14 @@ class ProfessionalBaziCalculator:
         return elements
     
     @staticmethod
-    def _calculate_strength_enhanced(bazi_data: Dict, audit_log: List[str]) -> Tuple[float, Dict[str, float]]:
+    def _calculate_strength_enhanced(bazi_data: Dict, audit_log: Optional[List[str]]) -> Tuple[float, Dict[str, float]]:
         """1.4.1.7.2 專業身強弱計算"""
         day_stem = bazi_data.get('day_stem', '')
         day_element = ProfessionalBaziCalculator.STEM_ELEMENTS.get(day_stem, '')
         
         if not day_element:
-            audit_log.append("⚠️ 日主不明，使用默認強度50分")
+            if audit_log is not None:
+                audit_log.append("⚠️ 日主不明，使用默認強度50分")
             return 50.0, {}
         
         # 1. 月令氣勢分數（40%權重）
@@ -817,7 +886,8 @@ class ProfessionalBaziCalculator:
             "raw_total": round(total_score, 3)
         }
         
-        audit_log.append(f"📊 四維度強度分數: {final_score:.1f}分")
+        if audit_log is not None:
+            audit_log.append(f"📊 四維度強度分數: {final_score:.1f}分")
         
         return round(final_score, 2), strength_details
     
@@ -953,7 +1023,7 @@ class ProfessionalBaziCalculator:
             return '極弱'
     
     @staticmethod
-    def _determine_pattern_enhanced(bazi_data: Dict, audit_log: List[str]) -> Tuple[str, List[str]]:
+    def _determine_pattern_enhanced(bazi_data: Dict, audit_log: Optional[List[str]]) -> Tuple[str, List[str]]:
         """1.4.1.7.3 專業格局判定"""
         details = []
         strength_score = bazi_data.get('strength_score', 50.0)
@@ -961,7 +1031,8 @@ class ProfessionalBaziCalculator:
         day_element = bazi_data.get('day_stem_element', '')
         elements = bazi_data.get('elements', {})
         
-        audit_log.append(f"📈 格局判定輸入: 強度{strength_score:.1f}分, 日主{day_stem}{day_element}")
+        if audit_log is not None:
+            audit_log.append(f"📈 格局判定輸入: 強度{strength_score:.1f}分, 日主{day_stem}{day_element}")
         
         # 1. 檢查從格（身極弱 < 20分）
         if strength_score < 20:
@@ -970,7 +1041,8 @@ class ProfessionalBaziCalculator:
             if max_element != day_element and max_value > 40:
                 pattern_type = f"從{max_element}格"
                 details.append(f"身極弱({strength_score:.1f}分)，順從最旺五行{max_element}({max_value:.1f}%)")
-                audit_log.append(f"✅ 判定為從格: {pattern_type}")
+                if audit_log is not None:
+                    audit_log.append(f"✅ 判定為從格: {pattern_type}")
                 return pattern_type, details
         
         # 2. 檢查專旺格（身極強 > 85分且同類五行極旺）
@@ -982,12 +1054,14 @@ class ProfessionalBaziCalculator:
                 if special_pattern:
                     pattern_type = special_pattern
                     details.append(f"身極強({strength_score:.1f}分)，{day_element}氣專旺({day_element_power:.1f}%)")
-                    audit_log.append(f"✅ 判定為特殊專旺格: {pattern_type}")
+                    if audit_log is not None:
+                        audit_log.append(f"✅ 判定為特殊專旺格: {pattern_type}")
                     return pattern_type, details
                 
                 pattern_type = f"{day_element}專旺格"
                 details.append(f"身極強({strength_score:.1f}分)，{day_element}氣專旺({day_element_power:.1f}%)")
-                audit_log.append(f"✅ 判定為專旺格: {pattern_type}")
+                if audit_log is not None:
+                    audit_log.append(f"✅ 判定為專旺格: {pattern_type}")
                 return pattern_type, details
         
         # 3. 普通格局判定
@@ -1001,7 +1075,8 @@ class ProfessionalBaziCalculator:
             pattern_type = "身弱"
             details.append(f"身弱({strength_score:.1f}分)，喜生扶")
         
-        audit_log.append(f"✅ 判定為普通格局: {pattern_type}")
+        if audit_log is not None:
+            audit_log.append(f"✅ 判定為普通格局: {pattern_type}")
         return pattern_type, details
     
     @staticmethod
@@ -1023,7 +1098,7 @@ class ProfessionalBaziCalculator:
         return None
     
     @staticmethod
-    def _calculate_useful_elements_pro(bazi_data: Dict, gender: str, audit_log: List[str]) -> Tuple[List[str], List[str]]:
+    def _calculate_useful_elements_pro(bazi_data: Dict, gender: str, audit_log: Optional[List[str]]) -> Tuple[List[str], List[str]]:
         """1.4.1.7.4 專業喜用神計算"""
         details = []
         pattern_type = bazi_data.get('pattern_type', '')
@@ -1351,6 +1426,91 @@ class ProfessionalBaziCalculator:
             "direction": direction,
             "note": "大運計算為簡化版本，專業計算需詳細節氣"
         }
+    
+    @staticmethod
+    def _analyze_scoring_stages(bazi_data: Dict, gender: str, audit_log: Optional[List[str]],
+                                detail_log: Optional[List[str]]) -> None:
+        """1.4.1.7.10 第3-4階段：格局、喜用神及忌神（配對評分需要，預篩不需要）"""
+        # 3. 專業格局判定
+        pattern_type, pattern_details = ProfessionalBaziCalculator._determine_pattern_enhanced(bazi_data, detail_log)
+        bazi_data["pattern_type"] = pattern_type
+        bazi_data["pattern_details"] = pattern_details
+        if audit_log is not None:
+            audit_log.append(f"✅ 格局判定: {pattern_type}")
+        
+        # 4. 專業喜用神分析
+        useful_elements, useful_details = ProfessionalBaziCalculator._calculate_useful_elements_pro(
+            bazi_data, gender, detail_log
+        )
+        bazi_data["useful_elements"] = useful_elements
+        bazi_data["useful_details"] = useful_details
+        
+        harmful_elements = ProfessionalBaziCalculator._calculate_harmful_elements_pro(bazi_data, useful_elements)
+        bazi_data["harmful_elements"] = harmful_elements
+        if audit_log is not None:
+            audit_log.append(f"✅ 喜用神分析: 喜{useful_elements}, 忌{harmful_elements}")
+    
+    @staticmethod
+    def _analyze_profile_stages(bazi_data: Dict, gender: str, audit_log: Optional[List[str]]) -> None:
+        """1.4.1.7.11 第5-8階段：夫妻星宮、神煞、十神、大運（配對評分不需要）"""
+        # 5. 專業夫妻星分析
+        spouse_status, spouse_details = ProfessionalBaziCalculator._analyze_spouse_star_pro(bazi_data, gender)
+        bazi_data["spouse_star_status"] = spouse_status
+        bazi_data["spouse_star_details"] = spouse_details
+        
+        palace_status, palace_details = ProfessionalBaziCalculator._analyze_spouse_palace_pro(bazi_data)
+        bazi_data["spouse_palace_status"] = palace_status
+        bazi_data["spouse_palace_details"] = palace_details
+        if audit_log is not None:
+            audit_log.append(f"✅ 夫妻分析: 星{spouse_status}, 宮{palace_status}")
+        
+        # 6. 專業神煞分析
+        shen_sha_names, shen_sha_bonus, shen_sha_details = ProfessionalBaziCalculator._calculate_shen_sha_enhanced(bazi_data)
+        bazi_data["shen_sha_names"] = shen_sha_names
+        bazi_data["shen_sha_bonus"] = shen_sha_bonus
+        bazi_data["shen_sha_details"] = shen_sha_details
+        if audit_log is not None:
+            audit_log.append(f"✅ 神煞分析: {shen_sha_names} ({shen_sha_bonus}分)")
+        
+        # 7. 專業十神結構
+        shi_shen_structure, shi_shen_details = ProfessionalBaziCalculator._calculate_shi_shen_pro(bazi_data, gender)
+        bazi_data["shi_shen_structure"] = shi_shen_structure
+        bazi_data["shi_shen_details"] = shi_shen_details
+        if audit_log is not None:
+            audit_log.append(f"✅ 十神結構: {shi_shen_structure}")
+        
+        # 8. 專業大運分析
+        dayun_info = ProfessionalBaziCalculator._calculate_dayun_pro(bazi_data, gender)
+        bazi_data["dayun_info"] = dayun_info
+    
+    @staticmethod
+    def complete_analysis(bazi_data: Dict, analysis: Optional[str] = None) -> Dict:
+        """
+        1.4.1.7.12 補算延後的分析階段至analysis級別（預設完整），已達到則不重算，補到完整時移除標記
+        完整八字及從資料庫讀出的資料（無analysis_level）原樣返回
+        """
+        current = bazi_data.get("analysis_level")
+        target = analysis or PC.ANALYSIS_FULL
+        if current is None or PC.ANALYSIS_ORDER.index(target) <= PC.ANALYSIS_ORDER.index(current):
+            return bazi_data
+        
+        gender = bazi_data.get("gender", "未知")
+        try:
+            if current == PC.ANALYSIS_PILLARS:
+                ProfessionalBaziCalculator._analyze_scoring_stages(bazi_data, gender, None, None)
+                current = PC.ANALYSIS_SCORING
+            if target == PC.ANALYSIS_FULL:
+                ProfessionalBaziCalculator._analyze_profile_stages(bazi_data, gender, None)
+                current = PC.ANALYSIS_FULL
+        except Exception as e:
+            logger.error(f"補算八字分析錯誤: {e}", exc_info=True)
+            raise ElementAnalysisError(f"補算八字分析失敗: {str(e)}")
+        
+        if current == PC.ANALYSIS_FULL:
+            del bazi_data["analysis_level"]
+        else:
+            bazi_data["analysis_level"] = current
+        return bazi_data
 # 🔖 1.4 專業八字核心引擎結束
 
 
@@ -1403,145 +1563,132 @@ class ProfessionalBaziCalculator:
 class ProfessionalScoringEngine:
     """1.5.1 國師級實戰判局引擎 - 完整修正版本"""
     
+    # 結構類型說明文字（完整報告用）
+    STRUCTURE_DETAILS = {
+        "closed_loop": "✅ 閉環互生局：喜用神形成生生不息循環",
+        "strong_complement": "✅ 喜用神強互補局：雙方喜用神形成強力互補",
+        "stable_supply": "✅ 穩定供求局：一方穩定供應另一方需求",
+        "mutual_destruction": "❌ 互毀局：結構嚴重衝突",
+        "normal_balance": "📊 普通平衡局：無明顯衝突也無強烈互補",
+    }
+    
     @staticmethod
     def calculate_match_score_pro(bazi1: Dict, bazi2: Dict, 
                                 gender1: str, gender2: str,
-                                is_testpair: bool = False) -> Dict[str, Any]:
-        """1.5.1.1 國師級配對評分 - 完整修正版"""
-        audit_log = []
+                                is_testpair: bool = False,
+                                audit_level: Optional[str] = None,
+                                detail: Optional[str] = None) -> Dict[str, Any]:
+        """
+        1.5.1.1 國師級配對評分 - 完整修正版（audit_level：off/summary/full，見PC.AUDIT_*）
+        detail=PC.DETAIL_SCORE時只返回score、structure_type、rating，不構建文字細節及審計日誌
+        """
+        if detail == PC.DETAIL_SCORE:
+            audit_level = PC.AUDIT_OFF
+        audit_log, _ = PC.create_audit_logs(audit_level)
         
         try:
-            audit_log.append("🎯 開始完整修正版實戰判局")
+            if audit_log is not None:
+                audit_log.append("🎯 開始完整修正版實戰判局")
             
             # 🚨 先檢查是否是需要特殊處理的案例
             case_id = ProfessionalScoringEngine._identify_all_special_cases(bazi1, bazi2)
             if case_id:
-                audit_log.append(f"🔍 識別到需要特殊處理的案例：{case_id}")
+                if audit_log is not None:
+                    audit_log.append(f"🔍 識別到需要特殊處理的案例：{case_id}")
                 # 直接使用針對性算法
                 return ProfessionalScoringEngine._calculate_all_special_case_score(
-                    bazi1, bazi2, case_id, audit_log
+                    bazi1, bazi2, case_id, audit_log, audit_level, detail
                 )
             
             # 正常算法流程（85%成功版本）
-            return ProfessionalScoringEngine._calculate_normal_score(bazi1, bazi2, audit_log)
+            return ProfessionalScoringEngine._calculate_normal_score(bazi1, bazi2, audit_log, audit_level, detail)
             
         except Exception as e:
             logger.error(f"完整修正版實戰判局錯誤: {e}", exc_info=True)
             raise MatchScoringError(f"實戰判局失敗: {str(e)}")
     
     # ========== 1.5.1.2 完整特殊案例識別 ==========
+    # 特殊案例定義：A方年、月、日柱 + B方年柱 → 固定分數、結構類型、細節
+    SPECIAL_CASE_DEFINITIONS = (
+        # 案例3：己巳丙子丙寅甲午 ↔ 庚午壬午丁卯丙午（子午沖嚴重），應該35-48分
+        ("case3", ("己巳", "丙子", "丙寅"), "庚午", 42.0, "mutual_destruction",
+         ["❌ 特殊案例3：子午沖嚴重，分數應偏低"]),
+        # 案例6：壬申丙午癸丑戊午 ↔ 壬申辛亥丙辰甲午（午午自刑），應該30-45分
+        ("case6", ("壬申", "丙午", "癸丑"), "壬申", 38.0, "mutual_destruction",
+         ["❌ 特殊案例6：午午自刑，分數應偏低"]),
+        # 案例15：庚午戊寅丁卯丙午 ↔ 庚午甲申辛未甲午（午午自刑+寅申沖），應該25-40分
+        ("case15", ("庚午", "戊寅", "丁卯"), "庚午", 35.0, "mutual_destruction",
+         ["❌ 特殊案例15：雙重沖刑，分數應很低"]),
+        # 案例17：乙亥辛巳丙午乙未 ↔ 丙子丙申己丑壬申（亥巳沖），應該50-65分
+        ("case17", ("乙亥", "辛巳", "丙午"), "丙子", 58.0, "normal_balance",
+         ["⚠️ 特殊案例17：亥巳沖，分數中等"]),
+        # 案例5：己巳丁丑庚午壬午 ↔ 戊辰丁巳甲子庚午（已修正成功），保持75分
+        ("case5", ("己巳", "丁丑", "庚午"), "戊辰", 75.0, "stable_supply",
+         ["✅ 特殊案例5：火土相生，結構良好"]),
+        # 案例9：甲子丙子癸未癸丑 ↔ 庚午壬午丙辰甲午（已修正成功），保持68分
+        ("case9", ("甲子", "丙子", "癸未"), "庚午", 68.0, "normal_balance",
+         ["✅ 特殊案例9：水木相生，有合化解"]),
+        # 案例19：庚午戊寅庚戌壬午 ↔ 庚午甲申辛亥甲午（已修正成功），保持48分
+        ("case19", ("庚午", "戊寅", "庚戌"), "庚午", 48.0, "barely_coexistence",
+         ["⚠️ 特殊案例19：有沖刑但天干有合"]),
+    )
+    SPECIAL_CASES: Dict[int, str] = {}                  # 打包鍵 → 案例編號（模組載入時生成）
+    SPECIAL_CASES_BY_ID: Dict[str, Tuple[float, str, List[str]]] = {}  # 案例編號 → (分數, 結構類型, 細節)
+    SPECIAL_CASE_KEYS = np.empty(0, dtype=np.int64)     # 全部打包鍵（批量評分整欄判斷用）
+    
+    @staticmethod
+    def build_special_cases() -> None:
+        """1.5.1.2.1 由特殊案例定義生成打包鍵登記表（模組載入時調用一次，需在1.14干支索引之後）"""
+        E = ProfessionalScoringEngine
+        E.SPECIAL_CASES = {}
+        E.SPECIAL_CASES_BY_ID = {}
+        for case_id, pillars1, year_pillar2, score, structure_type, details in E.SPECIAL_CASE_DEFINITIONS:
+            prefix = ProfessionalRelations.pillars_key(pillars1)
+            key = E.special_case_key(prefix, ProfessionalRelations.pillar_index(year_pillar2))
+            E.SPECIAL_CASES.setdefault(key, case_id)  # 同鍵以先定義者為準（與原判斷次序一致）
+            E.SPECIAL_CASES_BY_ID[case_id] = (score, structure_type, details)
+        E.SPECIAL_CASE_KEYS = np.array(sorted(E.SPECIAL_CASES), dtype=np.int64)
+    
+    @staticmethod
+    def special_case_key(prefix: int, year_index2: int) -> int:
+        """1.5.1.2.2 打包鍵：A方年月日柱鍵 × 120 + B方年柱索引；任一未知時返回-1"""
+        if prefix < 0 or year_index2 < 0:
+            return -1
+        return prefix * ProfessionalRelations.PILLAR_COUNT + year_index2
+    
     @staticmethod
     def _identify_all_special_cases(bazi1: Dict, bazi2: Dict) -> str:
-        """1.5.1.2.1 識別所有需要特殊處理的案例"""
-        # 提取八字特徵
-        pillars1 = [
-            bazi1.get('year_pillar', ''),
-            bazi1.get('month_pillar', ''),
-            bazi1.get('day_pillar', ''),
-            bazi1.get('hour_pillar', '')
-        ]
-        
-        pillars2 = [
-            bazi2.get('year_pillar', ''),
-            bazi2.get('month_pillar', ''),
-            bazi2.get('day_pillar', ''),
-            bazi2.get('hour_pillar', '')
-        ]
-        
-        # 案例3：己巳丙子丙寅甲午 ↔ 庚午壬午丁卯丙午（子午沖嚴重）
-        if (pillars1[0][:2] == "己巳" and pillars1[1][:2] == "丙子" and 
-            pillars1[2][:2] == "丙寅" and pillars2[0][:2] == "庚午"):
-            return "case3"
-        
-        # 案例6：壬申丙午癸丑戊午 ↔ 壬申辛亥丙辰甲午（午午自刑）
-        if (pillars1[0][:2] == "壬申" and pillars1[1][:2] == "丙午" and
-            pillars1[2][:2] == "癸丑" and pillars2[0][:2] == "壬申"):
-            return "case6"
-        
-        # 案例15：庚午戊寅丁卯丙午 ↔ 庚午甲申辛未甲午（午午自刑+寅申沖）
-        if (pillars1[0][:2] == "庚午" and pillars1[1][:2] == "戊寅" and
-            pillars1[2][:2] == "丁卯" and pillars2[0][:2] == "庚午"):
-            return "case15"
-        
-        # 案例17：乙亥辛巳丙午乙未 ↔ 丙子丙申己丑壬申（亥巳沖）
-        if (pillars1[0][:2] == "乙亥" and pillars1[1][:2] == "辛巳" and
-            pillars1[2][:2] == "丙午" and pillars2[0][:2] == "丙子"):
-            return "case17"
-        
-        # 案例5：己巳丁丑庚午壬午 ↔ 戊辰丁巳甲子庚午（已修正成功）
-        if (pillars1[0][:2] == "己巳" and pillars1[1][:2] == "丁丑" and 
-            pillars1[2][:2] == "庚午" and pillars2[0][:2] == "戊辰"):
-            return "case5"
-        
-        # 案例9：甲子丙子癸未癸丑 ↔ 庚午壬午丙辰甲午（已修正成功）
-        if (pillars1[0][:2] == "甲子" and pillars1[1][:2] == "丙子" and
-            pillars1[2][:2] == "癸未" and pillars2[0][:2] == "庚午"):
-            return "case9"
-        
-        # 案例19：庚午戊寅庚戌壬午 ↔ 庚午甲申辛亥甲午（已修正成功）
-        if (pillars1[0][:2] == "庚午" and pillars1[1][:2] == "戊寅" and
-            pillars1[2][:2] == "庚戌" and pillars2[0][:2] == "庚午"):
-            return "case19"
-        
-        return ""
+        """1.5.1.2.3 識別所有需要特殊處理的案例（一次字典查找）"""
+        profile1 = ScoringProfile.of(bazi1)
+        year_index2 = ProfessionalRelations.pillar_index(bazi2.get('year_pillar', ''))
+        return ProfessionalScoringEngine.SPECIAL_CASES.get(
+            ProfessionalScoringEngine.special_case_key(profile1.special_prefix, year_index2), ""
+        )
     
     @staticmethod
-    def _calculate_all_special_case_score(bazi1: Dict, bazi2: Dict, case_id: str, audit_log: List[str]) -> Dict[str, Any]:
-        """1.5.1.2.2 計算所有特殊案例分數"""
-        
-        audit_log.append(f"🎯 開始特殊案例{case_id}計算")
-        
-        if case_id == "case3":
-            # 案例3：子午沖嚴重，應該35-48分
-            score = 42.0
-            details = ["❌ 特殊案例3：子午沖嚴重，分數應偏低"]
-            structure_type = "mutual_destruction"
-        
-        elif case_id == "case6":
-            # 案例6：午午自刑，應該30-45分
-            score = 38.0
-            details = ["❌ 特殊案例6：午午自刑，分數應偏低"]
-            structure_type = "mutual_destruction"
+    def _calculate_all_special_case_score(bazi1: Dict, bazi2: Dict, case_id: str, audit_log: Optional[List[str]],
+                                          audit_level: Optional[str] = None,
+                                          detail: Optional[str] = None) -> Dict[str, Any]:
+        """1.5.1.2.4 計算所有特殊案例分數（分數、結構類型及細節取自登記表）"""
         
-        elif case_id == "case15":
-            # 案例15：午午自刑+寅申沖，應該25-40分
-            score = 35.0
-            details = ["❌ 特殊案例15：雙重沖刑，分數應很低"]
-            structure_type = "mutual_destruction"
-        
-        elif case_id == "case17":
-            # 案例17：亥巳沖，應該50-65分
-            score = 58.0
-            details = ["⚠️ 特殊案例17：亥巳沖，分數中等"]
-            structure_type = "normal_balance"
-        
-        elif case_id == "case5":
-            # 案例5：已修正成功，保持75分
-            score = 75.0
-            details = ["✅ 特殊案例5：火土相生，結構良好"]
-            structure_type = "stable_supply"
-        
-        elif case_id == "case9":
-            # 案例9：已修正成功，保持68分
-            score = 68.0
-            details = ["✅ 特殊案例9：水木相生，有合化解"]
-            structure_type = "normal_balance"
-        
-        elif case_id == "case19":
-            # 案例19：已修正成功，保持48分
-            score = 48.0
-            details = ["⚠️ 特殊案例19：有沖刑但天干有合"]
-            structure_type = "barely_coexistence"
+        if audit_log is not None:
+            audit_log.append(f"🎯 開始特殊案例{case_id}計算")
         
-        else:
+        case = ProfessionalScoringEngine.SPECIAL_CASES_BY_ID.get(case_id)
+        if case is None:
             # 默認使用正常算法
-            return ProfessionalScoringEngine._calculate_normal_score(bazi1, bazi2, audit_log)
+            return ProfessionalScoringEngine._calculate_normal_score(bazi1, bazi2, audit_log, audit_level, detail)
+        score, structure_type, details = case
+        
+        if detail == PC.DETAIL_SCORE:
+            return ProfessionalScoringEngine._score_only_result(score, structure_type)
         
         # 獲取評級
         rating = PC.get_rating(score)
         rating_desc = PC.get_rating_description(score)
         
-        audit_log.append(f"✅ 特殊案例{case_id}計算完成: {score:.1f}分")
+        if audit_log is not None:
+            audit_log.append(f"✅ 特殊案例{case_id}計算完成: {score:.1f}分")
         
         return {
             "score": round(score, 1),
@@ -1549,7 +1696,7 @@ class ProfessionalScoringEngine:
             "rating_description": rating_desc,
             "relationship_model": ProfessionalScoringEngine._determine_relationship_model_final(score, structure_type),
             "structure_type": structure_type,
-            "structure_details": details,
+            "structure_details": list(details),
             "clash_adjustment": 0.0,
             "clash_details": ["特殊案例處理"],
             "fuyin_adjustment": 0.0,
@@ -1559,45 +1706,54 @@ class ProfessionalScoringEngine:
             "shen_sha_adjustment": 0.0,
             "shen_sha_details": [],
             "reality_adjustment": 0.0,
-            "audit_log": audit_log,
+            "breakdown": MatchBreakdown(
+                structure_type, score, 0.0, 0.0, 0.0, 0.0, 0.0, score, MatchBreakdown.FLAG_SPECIAL_CASE
+            ).to_list(),
+            "audit_log": audit_log if audit_log is not None else [],
         }
     
     # ========== 1.5.1.3 正常算法（85%成功版本）==========
     @staticmethod
-    def _calculate_normal_score(bazi1: Dict, bazi2: Dict, audit_log: List[str]) -> Dict[str, Any]:
-        """1.5.1.3.1 正常算法流程"""
-        
-        # 提取基礎特徵
-        features = ProfessionalScoringEngine._extract_basic_features(bazi1, bazi2)
+    def _calculate_normal_score(bazi1: Dict, bazi2: Dict, audit_log: Optional[List[str]],
+                                audit_level: Optional[str] = None,
+                                detail: Optional[str] = None) -> Dict[str, Any]:
+        """1.5.1.3.1 正常算法流程（非full級別時各步驟細節不寫入audit_log；detail=score時各步驟不構建文字細節）"""
+        detail_log = audit_log if (audit_level or PC.AUDIT_LEVEL) == PC.AUDIT_FULL else None
+        with_details = detail != PC.DETAIL_SCORE
+        
+        # 取出（或首次建立）雙方評分特徵檔，合成配對特徵
+        profile1 = ScoringProfile.of(bazi1)
+        profile2 = ScoringProfile.of(bazi2)
+        features = ProfessionalScoringEngine._combine_profiles(profile1, profile2)
         
         # 🎯 第一步：結構類型判斷
         structure_type, structure_details = ProfessionalScoringEngine._judge_structure_type_normal(
-            bazi1, bazi2, features, audit_log
+            profile1, profile2, features, detail_log, with_details
         )
         
         # 🎯 第二步：根據結構類型獲取基礎分
         base_score = ProfessionalScoringEngine._get_base_score_by_structure_normal(
-            structure_type, features, audit_log
+            structure_type, features, detail_log
         )
         
         # 🎯 第三步：處理沖刑
         clash_adjustment, clash_details = ProfessionalScoringEngine._handle_clash_normal(
-            features, structure_type, base_score, audit_log
+            features, structure_type, base_score, detail_log, with_details
         )
         
         # 🎯 第四步：處理伏吟
         fuyin_adjustment, fuyin_details = ProfessionalScoringEngine._handle_fuyin_normal(
-            features, structure_type, base_score, audit_log
+            features, structure_type, base_score, detail_log, with_details
         )
         
         # 🎯 第五步：處理喜用神供養
         supply_adjustment, supply_details = ProfessionalScoringEngine._handle_supply_normal(
-            bazi1, bazi2, structure_type, base_score, audit_log
+            profile1, profile2, structure_type, base_score, detail_log, with_details
         )
         
         # 🎯 第六步：神煞影響
         shen_sha_adjustment, shen_sha_details = ProfessionalScoringEngine._handle_shen_sha_normal(
-            features, structure_type, base_score, audit_log
+            features, structure_type, base_score, detail_log, with_details
         )
         
         # 🎯 第七步：計算初步分數
@@ -1605,20 +1761,25 @@ class ProfessionalScoringEngine:
         
         # 🎯 第八步：現實校準
         reality_adjustment = ProfessionalScoringEngine._calculate_reality_adjustment_normal(
-            features, audit_log
+            features, detail_log
         )
         
         # 🎯 最終分數合成
         calibrated_score = raw_score + reality_adjustment
         
         # 合理範圍限制
+        clamped = not 25.0 <= calibrated_score <= 95.0
         calibrated_score = max(25.0, min(95.0, calibrated_score))
         
+        if not with_details:
+            return ProfessionalScoringEngine._score_only_result(calibrated_score, structure_type)
+        
         # 獲取評級
         rating = PC.get_rating(calibrated_score)
         rating_desc = PC.get_rating_description(calibrated_score)
         
-        audit_log.append(f"✅ 正常算法計算完成: {calibrated_score:.1f}分")
+        if audit_log is not None:
+            audit_log.append(f"✅ 正常算法計算完成: {calibrated_score:.1f}分")
         
         return {
             "score": round(calibrated_score, 1),
@@ -1636,123 +1797,123 @@ class ProfessionalScoringEngine:
             "shen_sha_adjustment": round(shen_sha_adjustment, 1),
             "shen_sha_details": shen_sha_details,
             "reality_adjustment": round(reality_adjustment, 1),
-            "audit_log": audit_log,
+            "breakdown": MatchBreakdown(
+                structure_type, base_score, clash_adjustment, fuyin_adjustment, supply_adjustment,
+                shen_sha_adjustment, reality_adjustment, calibrated_score,
+                MatchBreakdown.feature_flags(features, fuyin_adjustment != 0, clamped)
+            ).to_list(),
+            "audit_log": audit_log if audit_log is not None else [],
+        }
+    
+    @staticmethod
+    def _score_only_result(score: float, structure_type: str) -> Dict[str, Any]:
+        """1.5.1.3.2 只含分數的結果（detail=PC.DETAIL_SCORE）：分數、結構類型、評級"""
+        return {
+            "score": round(score, 1),
+            "structure_type": structure_type,
+            "rating": PC.get_rating(score),
         }
     
     # ========== 1.5.1.4 正常算法具體實現（保持85%成功版本）==========
     @staticmethod
-    def _judge_structure_type_normal(bazi1: Dict, bazi2: Dict, features: Dict, audit_log: List[str]) -> Tuple[str, List[str]]:
-        """保持85%成功版本的結構判斷"""
-        details = []
+    def _judge_structure_type_normal(profile1: "ScoringProfile", profile2: "ScoringProfile", features: Dict,
+                                     audit_log: Optional[List[str]],
+                                     with_details: bool = True) -> Tuple[str, Optional[List[str]]]:
+        """保持85%成功版本的結構判斷（喜用神以五行索引表示，見1.15；with_details=False時細節返回None）"""
+        if ProfessionalScoringEngine._is_closed_loop_mutual_generation_normal(profile1, profile2):
+            # 閉環互生局
+            structure_type = "closed_loop"
+        elif ProfessionalScoringEngine._is_strong_useful_complement_normal(profile1, profile2):
+            # 喜用神強互補局
+            structure_type = "strong_complement"
+        elif ProfessionalScoringEngine._is_stable_supply_normal(profile1, profile2):
+            # 穩定供求局
+            structure_type = "stable_supply"
+        elif ProfessionalScoringEngine._is_mutual_destruction_normal(profile1, profile2):
+            # 互毀局
+            structure_type = "mutual_destruction"
+        else:
+            # 默認：普通平衡局
+            structure_type = "normal_balance"
         
-        useful1 = set(bazi1.get("useful_elements", []))
-        useful2 = set(bazi2.get("useful_elements", []))
-        elements1 = bazi1.get("elements", {})
-        elements2 = bazi2.get("elements", {})
-        
-        # 檢查閉環互生局
-        if ProfessionalScoringEngine._is_closed_loop_mutual_generation_normal(useful1, useful2, elements1, elements2):
-            details.append("✅ 閉環互生局：喜用神形成生生不息循環")
-            audit_log.append("🎯 結構類型：closed_loop")
-            return "closed_loop", details
-        
-        # 檢查喜用神強互補局
-        if ProfessionalScoringEngine._is_strong_useful_complement_normal(useful1, useful2, elements1, elements2):
-            details.append("✅ 喜用神強互補局：雙方喜用神形成強力互補")
-            audit_log.append("🎯 結構類型：strong_complement")
-            return "strong_complement", details
-        
-        # 檢查穩定供求局
-        if ProfessionalScoringEngine._is_stable_supply_normal(bazi1, bazi2):
-            details.append("✅ 穩定供求局：一方穩定供應另一方需求")
-            audit_log.append("🎯 結構類型：stable_supply")
-            return "stable_supply", details
-        
-        # 檢查互毀局
-        if ProfessionalScoringEngine._is_mutual_destruction_normal(bazi1, bazi2):
-            details.append("❌ 互毀局：結構嚴重衝突")
-            audit_log.append("🎯 結構類型：mutual_destruction")
-            return "mutual_destruction", details
-        
-        # 默認：普通平衡局
-        details.append("📊 普通平衡局：無明顯衝突也無強烈互補")
-        audit_log.append("🎯 結構類型：normal_balance")
-        return "normal_balance", details
-    
-    @staticmethod
-    def _is_closed_loop_mutual_generation_normal(useful1: set, useful2: set, elements1: Dict, elements2: Dict) -> bool:
+        if audit_log is not None:
+            audit_log.append(f"🎯 結構類型：{structure_type}")
+        if not with_details:
+            return structure_type, None
+        return structure_type, [ProfessionalScoringEngine.STRUCTURE_DETAILS[structure_type]]
+    
+    @staticmethod
+    def _is_closed_loop_mutual_generation_normal(profile1: "ScoringProfile", profile2: "ScoringProfile") -> bool:
+        useful1, useful2 = profile1.useful, profile2.useful
         if not useful1 or not useful2:
             return False
         
+        generation = ScoringProfile.GENERATION_INDEX
+        elements1, elements2 = profile1.elements, profile2.elements
         for u1 in useful1:
             for u2 in useful2:
-                if PC.ELEMENT_GENERATION.get(u1) == u2:
-                    for u2b in useful2:
-                        if PC.ELEMENT_GENERATION.get(u2b) == u1:
-                            if elements1.get(u1, 0) > 15 and elements2.get(u2, 0) > 15:
-                                return True
+                if generation[u1] == u2:
+                    # 對方喜用神中有生回u1者
+                    if profile2.useful_generates_mask >> u1 & 1:
+                        if elements1[u1] > 15 and elements2[u2] > 15:
+                            return True
         return False
     
     @staticmethod
-    def _is_strong_useful_complement_normal(useful1: set, useful2: set, elements1: Dict, elements2: Dict) -> bool:
+    def _is_strong_useful_complement_normal(profile1: "ScoringProfile", profile2: "ScoringProfile") -> bool:
+        useful1, useful2 = profile1.useful, profile2.useful
         if not useful1 or not useful2:
             return False
         
-        if useful1 & useful2:
-            common_elements = useful1 & useful2
-            for element in common_elements:
-                if elements1.get(element, 0) > 15 and elements2.get(element, 0) > 15:
+        elements1, elements2 = profile1.elements, profile2.elements
+        common_mask = profile1.useful_mask & profile2.useful_mask
+        if common_mask:
+            for element in useful1:
+                if common_mask >> element & 1 and elements1[element] > 15 and elements2[element] > 15:
                     return True
         
+        generation = ScoringProfile.GENERATION_INDEX
         for u1 in useful1:
             for u2 in useful2:
-                if PC.ELEMENT_GENERATION.get(u1) == u2:
-                    if elements1.get(u1, 0) > 20 and elements2.get(u2, 0) > 15:
+                if generation[u1] == u2:
+                    if elements1[u1] > 20 and elements2[u2] > 15:
                         return True
-                elif PC.ELEMENT_GENERATION.get(u2) == u1:
-                    if elements2.get(u2, 0) > 20 and elements1.get(u1, 0) > 15:
+                elif generation[u2] == u1:
+                    if elements2[u2] > 20 and elements1[u1] > 15:
                         return True
         
         return False
     
     @staticmethod
-    def _is_stable_supply_normal(bazi1: Dict, bazi2: Dict) -> bool:
-        useful1 = set(bazi1.get("useful_elements", []))
-        useful2 = set(bazi2.get("useful_elements", []))
-        elements1 = bazi1.get("elements", {})
-        elements2 = bazi2.get("elements", {})
+    def _is_stable_supply_normal(profile1: "ScoringProfile", profile2: "ScoringProfile") -> bool:
+        elements1, elements2 = profile1.elements, profile2.elements
         
-        for u2 in useful2:
-            if elements1.get(u2, 0) > 20:
+        for u2 in profile2.useful:
+            if elements1[u2] > 20:
                 return True
         
-        for u1 in useful1:
-            if elements2.get(u1, 0) > 20:
+        for u1 in profile1.useful:
+            if elements2[u1] > 20:
                 return True
         
         return False
     
     @staticmethod
-    def _is_mutual_destruction_normal(bazi1: Dict, bazi2: Dict) -> bool:
-        useful1 = set(bazi1.get("useful_elements", []))
-        useful2 = set(bazi2.get("useful_elements", []))
-        harmful1 = set(bazi1.get("harmful_elements", []))
-        harmful2 = set(bazi2.get("harmful_elements", []))
-        
-        if useful1:
-            conflict_count = sum(1 for u in useful1 if u in harmful2)
-            if conflict_count >= len(useful1) * 0.8:
+    def _is_mutual_destruction_normal(profile1: "ScoringProfile", profile2: "ScoringProfile") -> bool:
+        if profile1.useful:
+            conflict_count = bin(profile1.useful_mask & profile2.harmful_mask).count("1")
+            if conflict_count >= len(profile1.useful) * 0.8:
                 return True
         
-        if useful2:
-            conflict_count = sum(1 for u in useful2 if u in harmful1)
-            if conflict_count >= len(useful2) * 0.8:
+        if profile2.useful:
+            conflict_count = bin(profile2.useful_mask & profile1.harmful_mask).count("1")
+            if conflict_count >= len(profile2.useful) * 0.8:
                 return True
         
         return False
     
     @staticmethod
-    def _get_base_score_by_structure_normal(structure_type: str, features: Dict, audit_log: List[str]) -> float:
+    def _get_base_score_by_structure_normal(structure_type: str, features: Dict, audit_log: Optional[List[str]]) -> float:
         structure_scores = {
             "closed_loop": 85.0,
             "strong_complement": 72.0,
@@ -1762,12 +1923,14 @@ class ProfessionalScoringEngine:
         }
         
         base_score = structure_scores.get(structure_type, 55.0)
-        audit_log.append(f"🏗️ 結構基礎分：{base_score:.1f}分 ({structure_type})")
+        if audit_log is not None:
+            audit_log.append(f"🏗️ 結構基礎分：{base_score:.1f}分 ({structure_type})")
         return base_score
     
     @staticmethod
-    def _handle_clash_normal(features: Dict, structure_type: str, base_score: float, audit_log: List[str]) -> Tuple[float, List[str]]:
-        details = []
+    def _handle_clash_normal(features: Dict, structure_type: str, base_score: float, audit_log: Optional[List[str]],
+                             with_details: bool = True) -> Tuple[float, Optional[List[str]]]:
+        details = [] if with_details else None
         adjustment = 0.0
         
         has_day_clash = features.get('has_day_clash', False)
@@ -1775,7 +1938,8 @@ class ProfessionalScoringEngine:
         punishment_type = features.get('punishment_type', '')
         
         if not has_day_clash and not has_three_punishment:
-            details.append("✅ 無明顯沖刑")
+            if details is not None:
+                details.append("✅ 無明顯沖刑")
             return 0.0, details
         
         can_resolve = ProfessionalScoringEngine._can_clash_be_resolved_normal(features, structure_type)
@@ -1783,25 +1947,33 @@ class ProfessionalScoringEngine:
         if can_resolve:
             if has_day_clash:
                 adjustment = -8.0
-                details.append("🛡️ 日支六沖但可化解：-8分")
+                if details is not None:
+                    details.append("🛡️ 日支六沖但可化解：-8分")
             elif has_three_punishment:
                 adjustment = -12.0
-                details.append(f"🛡️ {punishment_type}但可化解：-12分")
-            audit_log.append(f"⚡ 可化解沖刑調整：{adjustment:.1f}分")
+                if details is not None:
+                    details.append(f"🛡️ {punishment_type}但可化解：-12分")
+            if audit_log is not None:
+                audit_log.append(f"⚡ 可化解沖刑調整：{adjustment:.1f}分")
         else:
             if punishment_type == "無恩之刑":
                 adjustment = -25.0
-                details.append("❌ 無恩之刑無解：-25分")
+                if details is not None:
+                    details.append("❌ 無恩之刑無解：-25分")
             elif punishment_type == "恃勢之刑":
                 adjustment = -20.0
-                details.append("❌ 恃勢之刑無解：-20分")
+                if details is not None:
+                    details.append("❌ 恃勢之刑無解：-20分")
             elif has_day_clash:
                 adjustment = -15.0
-                details.append("❌ 日支六沖無解：-15分")
+                if details is not None:
+                    details.append("❌ 日支六沖無解：-15分")
             else:
                 adjustment = -10.0
-                details.append("⚠️ 輕微沖刑無解：-10分")
-            audit_log.append(f"⚡ 不可化解沖刑調整：{adjustment:.1f}分")
+                if details is not None:
+                    details.append("⚠️ 輕微沖刑無解：-10分")
+            if audit_log is not None:
+                audit_log.append(f"⚡ 不可化解沖刑調整：{adjustment:.1f}分")
         
         return adjustment, details
     
@@ -1827,126 +1999,77 @@ class ProfessionalScoringEngine:
     # ========== 1.5.1.5 輔助函數（保持不變）==========
     @staticmethod
     def _extract_basic_features(bazi1: Dict, bazi2: Dict) -> Dict:
-        """提取基礎特徵"""
-        features = {}
-        
-        # 日柱信息
-        day_pillar1 = bazi1.get('day_pillar', '')
-        day_pillar2 = bazi2.get('day_pillar', '')
-        features['day_stem1'] = day_pillar1[0] if len(day_pillar1) >= 1 else ''
-        features['day_stem2'] = day_pillar2[0] if len(day_pillar2) >= 1 else ''
-        features['day_branch1'] = day_pillar1[1] if len(day_pillar1) >= 2 else ''
-        features['day_branch2'] = day_pillar2[1] if len(day_pillar2) >= 2 else ''
+        """提取基礎特徵（經雙方評分特徵檔合成）"""
+        return ProfessionalScoringEngine._combine_profiles(ScoringProfile.of(bazi1), ScoringProfile.of(bazi2))
+    
+    @staticmethod
+    def _combine_profiles(profile1: "ScoringProfile", profile2: "ScoringProfile") -> Dict:
+        """合成配對特徵：只做位元運算及查表，不再從八字字典重新推導"""
+        features = {
+            'day_stem1': profile1.day_stem,
+            'day_stem2': profile2.day_stem,
+            'day_branch1': profile1.day_branch,
+            'day_branch2': profile2.day_branch,
+        }
         
         # 日柱關係
         features['day_relation'] = ProfessionalScoringEngine._analyze_day_pillar_relation(
-            features['day_stem1'], features['day_stem2'],
-            features['day_branch1'], features['day_branch2']
+            profile1.day_stem, profile2.day_stem, profile1.day_branch, profile2.day_branch
         )
         
-        # 所有地支
-        all_branches = []
-        for pillar in ['year_pillar', 'month_pillar', 'day_pillar', 'hour_pillar']:
-            p1 = bazi1.get(pillar, '')
-            p2 = bazi2.get(pillar, '')
-            if len(p1) >= 2:
-                all_branches.append(p1[1])
-            if len(p2) >= 2:
-                all_branches.append(p2[1])
-        features['all_branches'] = all_branches
-        
-        # 檢查刑沖
-        features['has_day_clash'] = PC.is_branch_clash(
-            features['day_branch1'], features['day_branch2']
+        # 檢查刑沖：雙方地支合併後的出現及重複遮罩
+        branch1, branch2 = profile1.day_branch_id, profile2.day_branch_id
+        features['has_day_clash'] = (
+            branch1 >= 0 and branch2 >= 0 and
+            (ProfessionalRelations.BRANCH_CLASH_MASKS[branch1] >> branch2) & 1 == 1
         )
-        features['has_three_punishment'] = PC.has_three_punishment(all_branches)
-        
-        # 確定三刑類型
-        if features['has_three_punishment']:
-            if "寅" in all_branches and "巳" in all_branches and "申" in all_branches:
-                features['punishment_type'] = "無恩之刑"
-            elif "丑" in all_branches and "戌" in all_branches and "未" in all_branches:
-                features['punishment_type'] = "恃勢之刑"
-            elif "子" in all_branches and "卯" in all_branches:
-                features['punishment_type'] = "無禮之刑"
-            else:
-                features['punishment_type'] = "其他三刑"
+        present = profile1.branch_mask | profile2.branch_mask
+        duplicated = (profile1.branch_duplicated_mask | profile2.branch_duplicated_mask
+                      | (profile1.branch_mask & profile2.branch_mask))
+        punishment_type = ProfessionalRelations.punishment_type_from_masks(present, duplicated)
+        features['has_three_punishment'] = punishment_type is not None
+        if punishment_type is not None:
+            features['punishment_type'] = punishment_type
         
         # 紅鸞天喜
-        year_branch1 = bazi1.get('year_pillar', '  ')[1]
-        year_branch2 = bazi2.get('year_pillar', '  ')[1]
-        hongluan_map = ProfessionalBaziCalculator.HONG_LUAN_MAP
-        tianxi_map = ProfessionalBaziCalculator.TIAN_XI_MAP
-        
         features['has_hongluan_tianxi'] = (
-            (hongluan_map.get(year_branch1) == year_branch2) or
-            (tianxi_map.get(year_branch1) == year_branch2) or
-            (hongluan_map.get(year_branch2) == year_branch1) or
-            (tianxi_map.get(year_branch2) == year_branch1)
+            (profile1.hongluan_branch == profile2.year_branch) or
+            (profile1.tianxi_branch == profile2.year_branch) or
+            (profile2.hongluan_branch == profile1.year_branch) or
+            (profile2.tianxi_branch == profile1.year_branch)
         )
         
         # 天乙貴人
-        day_stem1 = bazi1.get('day_stem', '')
-        day_stem2 = bazi2.get('day_stem', '')
-        tianyi_branches1 = ProfessionalBaziCalculator.TIANYI_GUI_REN.get(day_stem1, [])
-        tianyi_branches2 = ProfessionalBaziCalculator.TIANYI_GUI_REN.get(day_stem2, [])
-        
-        features['has_tianyi_guiren'] = False
-        for branch in all_branches:
-            if branch in tianyi_branches1 or branch in tianyi_branches2:
-                features['has_tianyi_guiren'] = True
-                break
-        
-        # 喜用神互補
-        useful1 = set(bazi1.get("useful_elements", []))
-        useful2 = set(bazi2.get("useful_elements", []))
-        
-        features['has_useful_complement'] = False
-        if useful1 and useful2:
-            if useful1 & useful2:
-                features['has_useful_complement'] = True
-            else:
-                for u1 in useful1:
-                    for u2 in useful2:
-                        if (PC.ELEMENT_GENERATION.get(u1) == u2 or 
-                            PC.ELEMENT_GENERATION.get(u2) == u1):
-                            features['has_useful_complement'] = True
-                            break
-                    if features['has_useful_complement']:
-                        break
+        features['has_tianyi_guiren'] = bool(present & (profile1.tianyi_mask | profile2.tianyi_mask))
+        
+        # 喜用神互補：有共同喜用神，或一方喜用神生另一方喜用神
+        features['has_useful_complement'] = bool(
+            profile1.useful_mask and profile2.useful_mask and (
+                (profile1.useful_mask & profile2.useful_mask)
+                or (profile1.useful_generates_mask & profile2.useful_mask)
+                or (profile2.useful_generates_mask & profile1.useful_mask)
+            )
+        )
         
         # 其他信息
-        features['confidence1'] = bazi1.get('hour_confidence', '中')
-        features['confidence2'] = bazi2.get('hour_confidence', '中')
-        features['birth_year1'] = bazi1.get('birth_year', 2000)
-        features['birth_year2'] = bazi2.get('birth_year', 2000)
+        features['confidence1'] = profile1.hour_confidence
+        features['confidence2'] = profile2.hour_confidence
+        features['birth_year1'] = profile1.birth_year
+        features['birth_year2'] = profile2.birth_year
         
         return features
     
     @staticmethod
     def _analyze_day_pillar_relation(stem1: str, stem2: str, branch1: str, branch2: str) -> str:
-        """分析日柱關係"""
-        five_harmony_pairs = [
-            ('甲', '己'), ('乙', '庚'), ('丙', '辛'),
-            ('丁', '壬'), ('戊', '癸')
-        ]
-        if (stem1, stem2) in five_harmony_pairs or (stem2, stem1) in five_harmony_pairs:
+        """分析日柱關係（查1.14關係矩陣）"""
+        if ProfessionalRelations.is_stem_combination(stem1, stem2):
             return 'stem_five_harmony'
         
-        six_harmony_pairs = [
-            ('子', '丑'), ('寅', '亥'), ('卯', '戌'),
-            ('辰', '酉'), ('巳', '申'), ('午', '未')
-        ]
-        if (branch1, branch2) in six_harmony_pairs or (branch2, branch1) in six_harmony_pairs:
+        if ProfessionalRelations.is_branch_combination(branch1, branch2):
             return 'branch_six_harmony'
         
-        three_harmony_groups = [
-            ('申', '子', '辰'), ('亥', '卯', '未'),
-            ('寅', '午', '戌'), ('巳', '酉', '丑')
-        ]
-        for group in three_harmony_groups:
-            if branch1 in group and branch2 in group and branch1 != branch2:
-                return 'branch_three_harmony'
+        if ProfessionalRelations.is_branch_three_harmony(branch1, branch2):
+            return 'branch_three_harmony'
         
         if stem1 == stem2:
             return 'same_stem'
@@ -1980,8 +2103,9 @@ class ProfessionalScoringEngine:
     
     # ========== 1.5.1.6 其他處理函數（保持85%成功版本）==========
     @staticmethod
-    def _handle_fuyin_normal(features: Dict, structure_type: str, base_score: float, audit_log: List[str]) -> Tuple[float, List[str]]:
-        details = []
+    def _handle_fuyin_normal(features: Dict, structure_type: str, base_score: float, audit_log: Optional[List[str]],
+                             with_details: bool = True) -> Tuple[float, Optional[List[str]]]:
+        details = [] if with_details else None
         adjustment = 0.0
         
         day_pillar1 = features.get('day_stem1', '') + features.get('day_branch1', '')
@@ -1990,94 +2114,116 @@ class ProfessionalScoringEngine:
         if day_pillar1 == day_pillar2 and day_pillar1:
             if structure_type in ["closed_loop", "strong_complement"]:
                 adjustment = -12.0
-                details.append("⚠️ 日柱伏吟（良好結構）：-12分")
+                if details is not None:
+                    details.append("⚠️ 日柱伏吟（良好結構）：-12分")
             elif structure_type in ["stable_supply", "normal_balance"]:
                 adjustment = -18.0
-                details.append("⚠️ 日柱伏吟（中等結構）：-18分")
+                if details is not None:
+                    details.append("⚠️ 日柱伏吟（中等結構）：-18分")
             else:
                 adjustment = -25.0
-                details.append("💥 日柱伏吟（弱結構）：-25分")
-            audit_log.append(f"🌀 伏吟調整：{adjustment:.1f}分")
+                if details is not None:
+                    details.append("💥 日柱伏吟（弱結構）：-25分")
+            if audit_log is not None:
+                audit_log.append(f"🌀 伏吟調整：{adjustment:.1f}分")
         
         return adjustment, details
     
     @staticmethod
-    def _handle_supply_normal(bazi1: Dict, bazi2: Dict, structure_type: str, base_score: float, audit_log: List[str]) -> Tuple[float, List[str]]:
-        details = []
+    def _handle_supply_normal(profile1: "ScoringProfile", profile2: "ScoringProfile", structure_type: str,
+                              base_score: float, audit_log: Optional[List[str]],
+                              with_details: bool = True) -> Tuple[float, Optional[List[str]]]:
+        details = [] if with_details else None
         adjustment = 0.0
         
-        useful1 = set(bazi1.get("useful_elements", []))
-        useful2 = set(bazi2.get("useful_elements", []))
-        elements1 = bazi1.get("elements", {})
-        elements2 = bazi2.get("elements", {})
+        names = ScoringProfile.ELEMENT_NAMES
+        elements1, elements2 = profile1.elements, profile2.elements
         
         supply_strength = 0
         
-        for u2 in useful2:
-            supply_power = elements1.get(u2, 0)
+        for u2_index in profile2.useful:
+            u2 = names[u2_index]
+            supply_power = elements1[u2_index]
             if supply_power > 35:
                 supply_strength += 3
-                details.append(f"✅ A強力供應B所需{u2}({supply_power:.1f}%)")
+                if details is not None:
+                    details.append(f"✅ A強力供應B所需{u2}({supply_power:.1f}%)")
             elif supply_power > 20:
                 supply_strength += 2
-                details.append(f"✅ A供應B所需{u2}({supply_power:.1f}%)")
+                if details is not None:
+                    details.append(f"✅ A供應B所需{u2}({supply_power:.1f}%)")
             elif supply_power > 10:
                 supply_strength += 1
-                details.append(f"📊 A輕微供應B所需{u2}({supply_power:.1f}%)")
+                if details is not None:
+                    details.append(f"📊 A輕微供應B所需{u2}({supply_power:.1f}%)")
         
-        for u1 in useful1:
-            supply_power = elements2.get(u1, 0)
+        for u1_index in profile1.useful:
+            u1 = names[u1_index]
+            supply_power = elements2[u1_index]
             if supply_power > 35:
                 supply_strength += 3
-                details.append(f"✅ B強力供應A所需{u1}({supply_power:.1f}%)")
+                if details is not None:
+                    details.append(f"✅ B強力供應A所需{u1}({supply_power:.1f}%)")
             elif supply_power > 20:
                 supply_strength += 2
-                details.append(f"✅ B供應A所需{u1}({supply_power:.1f}%)")
+                if details is not None:
+                    details.append(f"✅ B供應A所需{u1}({supply_power:.1f}%)")
             elif supply_power > 10:
                 supply_strength += 1
-                details.append(f"📊 B輕微供應A所需{u1}({supply_power:.1f}%)")
+                if details is not None:
+                    details.append(f"📊 B輕微供應A所需{u1}({supply_power:.1f}%)")
         
         if supply_strength >= 6:
             adjustment = 10.0
-            details.append("💪 強力供養關係：+10分")
+            if details is not None:
+                details.append("💪 強力供養關係：+10分")
         elif supply_strength >= 3:
             adjustment = 6.0
-            details.append("🔄 中等供養關係：+6分")
+            if details is not None:
+                details.append("🔄 中等供養關係：+6分")
         elif supply_strength >= 1:
             adjustment = 3.0
-            details.append("📊 輕微供養關係：+3分")
+            if details is not None:
+                details.append("📊 輕微供養關係：+3分")
         else:
             adjustment = -2.0
-            details.append("⚠️ 無明顯供養關係：-2分")
+            if details is not None:
+                details.append("⚠️ 無明顯供養關係：-2分")
         
-        audit_log.append(f"🔋 供養調整：{adjustment:.1f}分（強度{supply_strength}）")
+        if audit_log is not None:
+            audit_log.append(f"🔋 供養調整：{adjustment:.1f}分（強度{supply_strength}）")
         return adjustment, details
     
     @staticmethod
-    def _handle_shen_sha_normal(features: Dict, structure_type: str, base_score: float, audit_log: List[str]) -> Tuple[float, List[str]]:
-        details = []
+    def _handle_shen_sha_normal(features: Dict, structure_type: str, base_score: float, audit_log: Optional[List[str]],
+                                with_details: bool = True) -> Tuple[float, Optional[List[str]]]:
+        details = [] if with_details else None
         adjustment = 0.0
         
         if base_score >= 50:
             if features.get('has_hongluan_tianxi', False):
                 adjustment += 8.0
-                details.append("✨ 紅鸞天喜：+8分")
+                if details is not None:
+                    details.append("✨ 紅鸞天喜：+8分")
             
             if features.get('has_tianyi_guiren', False):
                 adjustment += 6.0
-                details.append("✨ 天乙貴人：+6分")
+                if details is not None:
+                    details.append("✨ 天乙貴人：+6分")
         elif base_score >= 40:
             if features.get('has_hongluan_tianxi', False):
                 adjustment += 5.0
-                details.append("✨ 紅鸞天喜（中等）：+5分")
+                if details is not None:
+                    details.append("✨ 紅鸞天喜（中等）：+5分")
         
         if adjustment != 0:
-            audit_log.append(f"🌟 神煞調整：{adjustment:.1f}分")
+            if audit_log is not None:
+                audit_log.append(f"🌟 神煞調整：{adjustment:.1f}分")
         
         return adjustment, details
     
     @staticmethod
-    def _calculate_reality_adjustment_normal(features: Dict, audit_log: List[str]) -> float:
+    def _calculate_reality_adjustment_normal(features: Dict, audit_log: Optional[List[str]]) -> float:
         adjustment = 0.0
         
         age1 = features.get('birth_year1', 2000)
@@ -2086,13 +2232,16 @@ class ProfessionalScoringEngine:
         
         if age_gap > 20:
             adjustment -= 10.0
-            audit_log.append(f"👥 年齡差距{age_gap}歲：-10分")
+            if audit_log is not None:
+                audit_log.append(f"👥 年齡差距{age_gap}歲：-10分")
         elif age_gap > 15:
             adjustment -= 6.0
-            audit_log.append(f"👥 年齡差距{age_gap}歲：-6分")
+            if audit_log is not None:
+                audit_log.append(f"👥 年齡差距{age_gap}歲：-6分")
         elif age_gap > 10:
             adjustment -= 3.0
-            audit_log.append(f"👥 年齡差距{age_gap}歲：-3分")
+            if audit_log is not None:
+                audit_log.append(f"👥 年齡差距{age_gap}歲：-3分")
         
         return adjustment
 # 🔖 1.5 國師級實戰判局引擎結束
@@ -2154,20 +2303,99 @@ def calculate_bazi_pro(year: int, month: int, day: int, hour: int,
                       hour_confidence: str = "高",
                       minute: Optional[int] = None,
                       longitude: float = PC.DEFAULT_LONGITUDE,
-                      latitude: float = PC.DEFAULT_LATITUDE) -> Dict[str, Any]:
-    """1.6.1 專業八字計算對外接口"""
-    return ProfessionalBaziCalculator.calculate_pro(
-        year, month, day, hour, gender, hour_confidence, minute, longitude, latitude
+                      latitude: float = PC.DEFAULT_LATITUDE,
+                      audit_level: Optional[str] = None,
+                      analysis: Optional[str] = None) -> Dict[str, Any]:
+    """1.6.1 專業八字計算對外接口（啟用排盤緩存時先查緩存）；analysis=PC.ANALYSIS_SCORING只算評分所需欄位"""
+    if not ProfessionalChartCache.is_enabled():
+        return ProfessionalBaziCalculator.calculate_pro(
+            year, month, day, hour, gender, hour_confidence, minute, longitude, latitude, audit_level, analysis
+        )
+    
+    key = (year, month, day, hour, gender, hour_confidence, minute, longitude, latitude,
+           audit_level or PC.AUDIT_LEVEL, analysis or PC.ANALYSIS_FULL)
+    return ProfessionalChartCache.get_or_calculate(
+        key,
+        lambda: ProfessionalBaziCalculator.calculate_pro(
+            year, month, day, hour, gender, hour_confidence, minute, longitude, latitude, audit_level, analysis
+        )
     )
 
 def calculate_match_pro(bazi1: Dict, bazi2: Dict,
                        gender1: str, gender2: str,
-                       is_testpair: bool = False) -> Dict[str, Any]:
-    """1.6.2 專業八字配對對外接口"""
-    return ProfessionalScoringEngine.calculate_match_score_pro(
-        bazi1, bazi2, gender1, gender2, is_testpair
+                       is_testpair: bool = False,
+                       audit_level: Optional[str] = None,
+                       detail: Optional[str] = None) -> Dict[str, Any]:
+    """
+    1.6.2 專業八字配對對外接口（detail=PC.DETAIL_SCORE只返回分數、結構類型及評級，排序候選用）
+    啟用配對結果緩存時以雙方評分簽名（有序）、審計級別及詳細程度為鍵，/match、/testpair、搜尋及測試共用
+    """
+    if not ProfessionalMatchCache.is_enabled():
+        return ProfessionalScoringEngine.calculate_match_score_pro(
+            bazi1, bazi2, gender1, gender2, is_testpair, audit_level, detail
+        )
+    
+    if detail == PC.DETAIL_SCORE:
+        audit_level = PC.AUDIT_OFF
+    key = (ScoringProfile.of(bazi1).signature, ScoringProfile.of(bazi2).signature,
+           audit_level or PC.AUDIT_LEVEL, detail or PC.DETAIL_FULL)
+    return ProfessionalMatchCache.get_or_calculate(
+        key,
+        lambda: ProfessionalScoringEngine.calculate_match_score_pro(
+            bazi1, bazi2, gender1, gender2, is_testpair, audit_level, detail
+        )
+    )
+
+def calculate_bazi_batch(years: Sequence[int], months: Sequence[int], days: Sequence[int],
+                         hours: Sequence[int],
+                         minutes: Optional[Sequence[Optional[int]]] = None,
+                         longitudes: Union[float, Sequence[float], None] = None,
+                         genders: Union[str, Sequence[str], None] = None,
+                         confidences: Union[str, Sequence[str], None] = None) -> Dict[str, Any]:
+    """1.6.3 批量八字計算對外接口（返回欄式陣列，用ProfessionalBatchCalculator.to_dicts展開）"""
+    return ProfessionalBatchCalculator.calculate_batch(
+        years, months, days, hours, minutes, longitudes, genders, confidences
+    )
+
+def calculate_pillars(year: int, month: int, day: int, hour: int,
+                      gender: str = "未知",
+                      hour_confidence: str = "高",
+                      minute: Optional[int] = None,
+                      longitude: float = PC.DEFAULT_LONGITUDE,
+                      latitude: float = PC.DEFAULT_LATITUDE) -> Dict[str, Any]:
+    """
+    1.6.4 排盤快速路徑：四柱、五行及身強弱，不做格局、喜用神等分析，不生成審計日誌
+    供搜尋預篩先行淘汰候選；通過後以ProfessionalBaziCalculator.complete_analysis()補算
+    """
+    return calculate_bazi_pro(year, month, day, hour, gender, hour_confidence, minute, longitude, latitude,
+                              audit_level=PC.AUDIT_OFF, analysis=PC.ANALYSIS_PILLARS)
+
+def calculate_match_many(user_bazi: Dict, candidate_charts: Sequence[Dict],
+                         user_gender: str = "未知",
+                         candidate_genders: Union[str, Sequence[str], None] = None,
+                         details: bool = False) -> Dict[str, Any]:
+    """
+    1.6.5 一對多配對評分對外接口：user_bazi對每個候選評分，分數與calculate_match逐位一致
+    返回{"scores": np.ndarray, "details": None或每個候選的數值明細（鍵同calculate_match，不含文字細節）}
+    """
+    return ProfessionalBatchScoringEngine.score_many(
+        user_bazi, candidate_charts, user_gender, candidate_genders, details
     )
 
+def upper_bound_score(user_bazi: Dict, partial_candidate: Dict) -> float:
+    """
+    1.6.6 配對分數上界對外接口：候選只有部分資料（如只有年柱、年月柱、四柱+五行）時的最高可達分數
+    保證不低於calculate_match真實分數，供搜尋剪枝淘汰不可能入選的候選；資料齊全時返回真實分數
+    """
+    return ProfessionalScoreBound.upper_bound_score(user_bazi, partial_candidate)
+
+def scoring_signature(bazi: Dict) -> Tuple:
+    """
+    1.6.7 配對評分簽名對外接口：配對評分讀取的全部欄位（見1.15 ScoringProfile.signature）
+    簽名不變則與任何對象的配對分數都不變，用於判斷個人資料更新後是否需要重新評分
+    """
+    return ScoringProfile.of(bazi).signature
+
 # 保持向後兼容的別名
 calculate_bazi = calculate_bazi_pro
 calculate_match = calculate_match_pro
@@ -2185,6 +2413,7 @@ class ProfessionalFormatters:
     @staticmethod
     def format_personal_data(bazi_data: Dict, username: str = "用戶") -> str:
         """1.7.1.1 專業個人資料格式化 - 詳細版，跟要求21"""
+        ProfessionalBaziCalculator.complete_analysis(bazi_data)
         lines = []
         
         # 標題
@@ -2407,10 +2636,30 @@ class ProfessionalFormatters:
         
         return "\n".join(lines)
     
+    @staticmethod
+    def format_score_breakdown(breakdown: "MatchBreakdown") -> str:
+        """1.7.1.1.1 分數構成一行文字（由MatchBreakdown按需生成）"""
+        if breakdown.has(MatchBreakdown.FLAG_SPECIAL_CASE):
+            return f"📐 分數構成：特殊案例固定分 {breakdown.score:.1f}分"
+        parts = [
+            f"結構基礎 {breakdown.base:.1f}",
+            f"沖刑 {breakdown.clash:+.1f}",
+            f"伏吟 {breakdown.fuyin:+.1f}",
+            f"供養 {breakdown.supply:+.1f}",
+            f"神煞 {breakdown.shen_sha:+.1f}",
+            f"現實 {breakdown.reality:+.1f}",
+        ]
+        text = f"📐 分數構成：{' ｜ '.join(parts)} → {breakdown.score:.1f}分"
+        if breakdown.has(MatchBreakdown.FLAG_CLAMPED):
+            text += "（已限制於25-95分）"
+        return text
+    
     @staticmethod
     def format_match_result(match_result: Dict, bazi1: Dict, bazi2: Dict,
                           user_a_name: str = "用戶A", user_b_name: str = "用戶B") -> str:
         """1.7.1.2 專業配對結果格式化 - 實戰判局詳細版本，跟要求22"""
+        ProfessionalBaziCalculator.complete_analysis(bazi1)
+        ProfessionalBaziCalculator.complete_analysis(bazi2)
         lines = []
         
         # 標題
@@ -2614,21 +2863,26 @@ class ProfessionalFormatters:
             lines.append(f"   現實因素調整：{reality_adjustment:+.1f}分")
             lines.append("")
         
+        # 📐 分數構成（由數值明細生成）
+        breakdown = MatchBreakdown.from_result(match_result)
+        lines.append(ProfessionalFormatters.format_score_breakdown(breakdown))
+        lines.append("")
+        
         # 💡 關鍵特徵摘要
         lines.append("💡 關鍵特徵")
         lines.append("")
         
-        # 從match_result提取特徵
-        if match_result.get('has_hongluan_tianxi', False):
+        # 從數值明細旗標提取特徵
+        if breakdown.has(MatchBreakdown.FLAG_HONGLUAN_TIANXI):
             lines.append("• 紅鸞天喜：有特殊緣分，容易一見鍾情")
         
-        if match_result.get('has_useful_complement', False):
+        if breakdown.has(MatchBreakdown.FLAG_USEFUL_COMPLEMENT):
             lines.append("• 喜用互補：五行互相補足，關係穩定")
         
-        if match_result.get('has_day_clash', False):
+        if breakdown.has(MatchBreakdown.FLAG_DAY_CLASH):
             lines.append("• 日支六沖：夫妻宮相沖，需要更多磨合")
         
-        if match_result.get('has_three_punishment', False):
+        if breakdown.has(MatchBreakdown.FLAG_THREE_PUNISHMENT):
             lines.append("• 三刑：地支構成三刑，關係複雜")
         
         if structure_type in ["closed_loop", "strong_complement"]:
@@ -2732,6 +2986,2256 @@ class ProfessionalFormatters:
 BaziFormatters = ProfessionalFormatters
 # 🔖 1.7 統一格式化工具類結束
 
+# 🔖 1.8 批量八字計算引擎開始
+class ProfessionalBatchCalculator:
+    """
+    1.8.1 批量八字計算引擎 - 以NumPy陣列一次計算大量出生時間
+    功能：向量化真太陽時、日界、四柱干支索引、五行分佈，結果與calculate_pro逐欄一致
+    用途：真命天子搜尋、管理員測試等需要大量排盤的場景
+    """
+    
+    # ========== 1.8.1.1 索引對照表（由1.4基礎常量推導，固定不變）==========
+    ELEMENT_ORDER = ['木', '火', '土', '金', '水']
+    PILLAR_WEIGHTS = (1.0, 1.8, 1.5, 1.2)   # 與_calculate_elements_pro相同：年、月、日、時
+    
+    STEM_ELEMENT_IDX = np.zeros(10, dtype=np.int64)
+    BRANCH_ELEMENT_IDX = np.zeros(12, dtype=np.int64)
+    HOUR_BRANCH_IDX = np.zeros(24, dtype=np.int64)
+    # 地支藏干：每支最多3個，不足以權重0補位（加0.0不影響浮點結果）
+    HIDDEN_ELEMENT_IDX = np.zeros((12, 3), dtype=np.int64)
+    HIDDEN_WEIGHTS = np.zeros((12, 3), dtype=np.float64)
+    
+    for _i, _stem in enumerate(ProfessionalBaziCalculator.STEMS):
+        STEM_ELEMENT_IDX[_i] = ELEMENT_ORDER.index(ProfessionalBaziCalculator.STEM_ELEMENTS[_stem])
+    for _i, _branch in enumerate(ProfessionalBaziCalculator.BRANCHES):
+        BRANCH_ELEMENT_IDX[_i] = ELEMENT_ORDER.index(ProfessionalBaziCalculator.BRANCH_ELEMENTS[_branch])
+        for _k, (_stem, _weight, _) in enumerate(PC.BRANCH_HIDDEN_STEMS_PRO.get(_branch, [])):
+            HIDDEN_ELEMENT_IDX[_i, _k] = ELEMENT_ORDER.index(ProfessionalBaziCalculator.STEM_ELEMENTS[_stem])
+            HIDDEN_WEIGHTS[_i, _k] = _weight
+    for _i in range(24):
+        HOUR_BRANCH_IDX[_i] = ProfessionalBaziCalculator._hour_to_branch_pro(_i)
+    del _i, _stem, _branch, _k, _weight, _
+    
+    # 信心度調整分檔的代表分鐘數（對應_adjust_confidence_level的四個區間）
+    _CONFIDENCE_BUCKET_MINUTES = (0.0, 20.0, 45.0, 90.0)
+    _DEG_TO_RAD = math.pi / 180.0
+    
+    @staticmethod
+    def calculate_batch(years: Sequence[int], months: Sequence[int], days: Sequence[int],
+                        hours: Sequence[int],
+                        minutes: Optional[Sequence[Optional[int]]] = None,
+                        longitudes: Union[float, Sequence[float], None] = None,
+                        genders: Union[str, Sequence[str], None] = None,
+                        confidences: Union[str, Sequence[str], None] = None) -> Dict[str, np.ndarray]:
+        """
+        1.8.1.2 批量排盤主函數
+        參數與calculate_pro相同但為等長陣列；longitudes/genders/confidences可傳單一值廣播
+        minutes為None或個別元素為None時視為分鐘缺失（與單筆計算相同，信心度高→估算）
+        返回欄式字典：stems/branches為N×4干支索引，elements為N×5五行分佈（木火土金水）
+        """
+        try:
+            years_arr = np.asarray(years, dtype=np.int64).ravel()
+            months_arr = np.asarray(months, dtype=np.int64).ravel()
+            days_arr = np.asarray(days, dtype=np.int64).ravel()
+            hours_arr = np.asarray(hours, dtype=np.int64).ravel()
+            count = len(years_arr)
+            if not (len(months_arr) == len(days_arr) == len(hours_arr) == count):
+                raise ValueError("年、月、日、時陣列長度不一致")
+            
+            # 1. 分鐘缺失處理
+            if minutes is None:
+                minute_missing = np.ones(count, dtype=bool)
+                minutes_arr = np.zeros(count, dtype=np.int64)
+            else:
+                minute_list = list(minutes)
+                if len(minute_list) != count:
+                    raise ValueError("分鐘陣列長度不一致")
+                minute_missing = np.array([m is None for m in minute_list], dtype=bool)
+                minutes_arr = np.array([0 if m is None else m for m in minute_list], dtype=np.int64)
+            
+            longitudes_arr = ProfessionalBatchCalculator._broadcast(
+                PC.DEFAULT_LONGITUDE if longitudes is None else longitudes, count, np.float64
+            )
+            genders_arr = ProfessionalBatchCalculator._broadcast(
+                "未知" if genders is None else genders, count, object
+            )
+            confidences_arr = ProfessionalBatchCalculator._broadcast(
+                "高" if confidences is None else confidences, count, object
+            )
+            confidences_arr = np.where(
+                minute_missing & (confidences_arr == "高"), "估算", confidences_arr
+            ).astype(object)
+            
+            # 2. 日期有效性檢查（單筆計算以datetime拒絕無效日期）
+            ordinals = ProfessionalBatchCalculator._to_day_number(years_arr, months_arr, days_arr)
+            check_y, check_m, check_d = ProfessionalBatchCalculator._from_day_number(ordinals)
+            invalid = (check_y != years_arr) | (check_m != months_arr) | (check_d != days_arr)
+            if invalid.any():
+                bad = int(np.flatnonzero(invalid)[0])
+                raise ValueError(
+                    f"無效日期: {years_arr[bad]}-{months_arr[bad]:02d}-{days_arr[bad]:02d}"
+                )
+            
+            # 3. 向量化真太陽時
+            solar = ProfessionalBatchCalculator._true_solar_time_batch(
+                years_arr, months_arr, days_arr, hours_arr, minutes_arr,
+                longitudes_arr, ordinals, confidences_arr
+            )
+            
+            # 4. 日界處理（子正換日）
+            adjusted_ordinals = ordinals
+            final_confidences = solar['confidence']
+            if PC.DAY_BOUNDARY_MODE == "zizheng":
+                next_day = (solar['hour'] >= PC.DAY_BOUNDARY_HOUR) & (solar['minute'] >= PC.DAY_BOUNDARY_MINUTE)
+                adjusted_ordinals = ordinals + next_day
+                final_confidences = np.where(
+                    next_day & (final_confidences == "高"), "中", final_confidences
+                ).astype(object)
+            adj_y, adj_m, adj_d = ProfessionalBatchCalculator._from_day_number(adjusted_ordinals)
+            
+            # 5. 四柱干支索引
+            stems, branches = ProfessionalBatchCalculator._pillars_batch(
+                adj_y, adj_m, adj_d, adjusted_ordinals, solar['hour']
+            )
+            
+            # 6. 五行分佈
+            elements = ProfessionalBatchCalculator._elements_batch(stems, branches)
+            
+            return {
+                'count': count,
+                'birth_year': years_arr, 'birth_month': months_arr,
+                'birth_day': days_arr, 'birth_hour': hours_arr, 'birth_minute': minutes_arr,
+                'gender': genders_arr,
+                'true_solar_hour': solar['hour'], 'true_solar_minute': solar['minute'],
+                'total_adjust_minutes': solar['total_adjust_minutes'],
+                'time_adjusted': solar['adjusted'], 'day_adjusted': solar['day_adjusted'],
+                'adjusted_year': adj_y, 'adjusted_month': adj_m, 'adjusted_day': adj_d,
+                'hour_confidence': final_confidences,
+                'stems': stems, 'branches': branches,
+                'elements': elements,
+            }
+            
+        except Exception as e:
+            logger.error(f"批量八字計算錯誤: {e}", exc_info=True)
+            raise ElementAnalysisError(f"批量八字分析失敗: {str(e)}")
+    
+    @staticmethod
+    def _broadcast(value: Any, count: int, dtype: Any) -> np.ndarray:
+        """1.8.1.2.1 單值或陣列統一展開為長度count的陣列"""
+        if isinstance(value, (str, int, float)):
+            arr = np.empty(count, dtype=dtype)
+            arr[:] = value
+            return arr
+        arr = np.asarray(list(value) if dtype is object else value, dtype=dtype).ravel()
+        if len(arr) != count:
+            raise ValueError("參數陣列長度不一致")
+        return arr
+    
+    @staticmethod
+    def _to_day_number(years: np.ndarray, months: np.ndarray, days: np.ndarray) -> np.ndarray:
+        """1.8.1.2.2 公曆日期 → 連續日數（與date.toordinal相同，支援陣列）"""
+        y = years - (months <= 2)
+        era = y // 400
+        yoe = y - era * 400
+        mp = (months + 9) % 12
+        doy = (153 * mp + 2) // 5 + days - 1
+        doe = yoe * 365 + yoe // 4 - yoe // 100 + doy
+        return era * 146097 + doe - 305
+    
+    @staticmethod
+    def _from_day_number(ordinals: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """1.8.1.2.3 連續日數 → 公曆年月日（_to_day_number的逆運算）"""
+        z = ordinals + 305
+        era = z // 146097
+        doe = z - era * 146097
+        yoe = (doe - doe // 1460 + doe // 36524 - doe // 146096) // 365
+        doy = doe - (365 * yoe + yoe // 4 - yoe // 100)
+        mp = (5 * doy + 2) // 153
+        day = doy - (153 * mp + 2) // 5 + 1
+        month = np.where(mp < 10, mp + 3, mp - 9)
+        year = yoe + era * 400 + (month <= 2)
+        return year, month, day
+    
+    @staticmethod
+    def _dst_mask(ordinals: np.ndarray) -> np.ndarray:
+        """1.8.1.3.1 批量判斷是否處於夏令時（委託1.11區間索引的向量化查找）"""
+        return ProfessionalDSTRegistry.mask(ordinals)
+    
+    @staticmethod
+    def _equation_of_time_batch(years: np.ndarray, months: np.ndarray, days: np.ndarray,
+                                hours: np.ndarray, minutes: np.ndarray) -> np.ndarray:
+        """1.8.1.3.2 批量均時差公式（運算次序與1.3.1.1.3.1完全相同，確保浮點結果一致）"""
+        y = np.where(months <= 2, years - 1, years)
+        m = np.where(months <= 2, months + 12, months)
+        A = y // 100
+        B = 2 - A + (A // 4)
+        jd_int = (np.trunc(365.25 * (y + 4716)).astype(np.int64)
+                  + np.trunc(30.6001 * (m + 1)).astype(np.int64) + days + B)
+        jd = (jd_int - 1524.5) + (hours + minutes / 60.0) / 24.0
+        t = (jd - 2451545.0) / 36525.0
+        
+        rad = ProfessionalBatchCalculator._DEG_TO_RAD
+        L0 = 280.46646 + 36000.76983 * t + 0.0003032 * t * t
+        M = 357.52911 + 35999.05029 * t - 0.0001537 * t * t
+        C = (
+            (1.914602 - 0.004817 * t - 0.000014 * t * t) * np.sin(M * rad)
+            + (0.019993 - 0.000101 * t) * np.sin((2 * M) * rad)
+            + 0.000289 * np.sin((3 * M) * rad)
+        )
+        L = L0 + C
+        eot = (
+            9.87 * np.sin((2 * L) * rad)
+            - 7.53 * np.cos(L * rad)
+            - 1.5 * np.sin(L * rad)
+        )
+        return np.maximum(-20.0, np.minimum(20.0, eot))
+    
+    @staticmethod
+    def _true_solar_time_batch(years: np.ndarray, months: np.ndarray, days: np.ndarray,
+                               hours: np.ndarray, minutes: np.ndarray, longitudes: np.ndarray,
+                               ordinals: np.ndarray, confidences: np.ndarray) -> Dict[str, np.ndarray]:
+        """1.8.1.3 批量真太陽時計算（對應1.3.1.1）"""
+        # 1. 夏令時、經度、均時差
+        dst_adjust = np.where(ProfessionalBatchCalculator._dst_mask(ordinals), -60.0, 0.0)
+        lon_adjust = (longitudes - PC.TIME_ZONE_MERIDIAN) * PC.LONGITUDE_CORRECTION
+        eot_adjust = ProfessionalEquationOfTimeTable.lookup_ordinals(ordinals, years, months, days, hours, minutes)
+        
+        # 2. 累計調整與日界跨天（取整邊界附近的行逐個改用公式，與1.3.1.1相同）
+        total_adjust_minutes = dst_adjust + lon_adjust + eot_adjust
+        total_minutes = (hours * 60 + minutes) + total_adjust_minutes
+        edge_rows = np.flatnonzero(ProfessionalEquationOfTimeTable.near_rounding_edge(total_minutes, total_adjust_minutes))
+        if len(edge_rows):
+            formula = ProfessionalTimeProcessor._equation_of_time_formula
+            for i in edge_rows:
+                eot_adjust[i] = formula(int(years[i]), int(months[i]), int(days[i]), int(hours[i]), int(minutes[i]))
+            total_adjust_minutes = dst_adjust + lon_adjust + eot_adjust
+            total_minutes = (hours * 60 + minutes) + total_adjust_minutes
+        day_delta = np.where(total_minutes < 0, -1, np.where(total_minutes >= 24 * 60, 1, 0))
+        adjusted = total_minutes - day_delta * (24 * 60)
+        
+        # 3. 時分換算（np.rint與Python round同為銀行家捨入）
+        true_hour = (adjusted // 60).astype(np.int64)
+        true_minute = np.rint(adjusted % 60).astype(np.int64)
+        rollover = true_minute == 60
+        true_minute = np.where(rollover, 0, true_minute)
+        true_hour = np.where(rollover, (true_hour + 1) % 24, true_hour)
+        
+        # 4. 信心度：按調整幅度分檔，沿用單筆規則查表
+        abs_adjust = np.abs(total_adjust_minutes)
+        bucket = (abs_adjust > 10).astype(np.int64) + (abs_adjust > 30) + (abs_adjust > 60)
+        labels, codes = np.unique(confidences.astype(str), return_inverse=True)
+        table = np.array([
+            [ProfessionalTimeProcessor._adjust_confidence_level(label, minutes_sample, None)
+             for minutes_sample in ProfessionalBatchCalculator._CONFIDENCE_BUCKET_MINUTES]
+            for label in labels
+        ], dtype=object).reshape(len(labels), 4)
+        new_confidence = table[codes.ravel(), bucket] if len(labels) else confidences
+        
+        return {
+            'hour': true_hour,
+            'minute': true_minute,
+            'confidence': new_confidence,
+            'adjusted': abs_adjust > 5,
+            'day_adjusted': day_delta,
+            'total_adjust_minutes': total_adjust_minutes,
+        }
+    
+    @staticmethod
+    def _pillars_batch(adj_y: np.ndarray, adj_m: np.ndarray, adj_d: np.ndarray,
+                       adjusted_ordinals: np.ndarray,
+                       true_hours: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """1.8.1.4 批量四柱干支索引（年月日柱向量化查干支日曆表）"""
+        count = len(adj_y)
+        stems = np.empty((count, 4), dtype=np.int8)
+        branches = np.empty((count, 4), dtype=np.int8)
+        
+        gz = ProfessionalGanzhiCalendar.lookup_ordinals(adjusted_ordinals, adj_y, adj_m, adj_d)
+        
+        stems[:, 0], branches[:, 0] = gz[:, 0], gz[:, 1]
+        stems[:, 1], branches[:, 1] = gz[:, 2], gz[:, 3]
+        stems[:, 2], branches[:, 2] = gz[:, 4], gz[:, 5]
+        
+        # 時柱：五鼠遁訣（甲己日甲子時起，依次類推）
+        hour_branch = ProfessionalBatchCalculator.HOUR_BRANCH_IDX[true_hours % 24]
+        start_stem = (stems[:, 2].astype(np.int64) % 5) * 2
+        stems[:, 3] = (start_stem + hour_branch) % 10
+        branches[:, 3] = hour_branch
+        return stems, branches
+    
+    @staticmethod
+    def _elements_batch(stems: np.ndarray, branches: np.ndarray) -> np.ndarray:
+        """1.8.1.5 批量五行累加（加法次序與_calculate_elements_pro相同，未正規化）"""
+        count = len(stems)
+        rows = np.arange(count)
+        acc = np.zeros((count, 5), dtype=np.float64)
+        cls = ProfessionalBatchCalculator
+        for p, weight in enumerate(cls.PILLAR_WEIGHTS):
+            stem_idx = stems[:, p].astype(np.int64)
+            branch_idx = branches[:, p].astype(np.int64)
+            acc[rows, cls.STEM_ELEMENT_IDX[stem_idx]] += weight * 1.0
+            acc[rows, cls.BRANCH_ELEMENT_IDX[branch_idx]] += weight * 0.6
+            for k in range(3):
+                acc[rows, cls.HIDDEN_ELEMENT_IDX[branch_idx, k]] += (weight * cls.HIDDEN_WEIGHTS[branch_idx, k]) * 0.4
+        return acc
+    
+    @staticmethod
+    def _normalize_elements(raw: List[float]) -> Dict[str, float]:
+        """1.8.1.5.1 五行正規化到100%（用Python round，與單筆計算捨入一致）"""
+        elements = dict(zip(ProfessionalBatchCalculator.ELEMENT_ORDER, raw))
+        total = sum(elements.values())
+        if total > 0:
+            for element in elements:
+                elements[element] = round(elements[element] * 100 / total, 2)
+        return elements
+    
+    @staticmethod
+    def to_dicts(columns: Dict[str, Any], analyze: bool = True,
+                 analysis: Optional[str] = None, dedupe: bool = False) -> List[Dict[str, Any]]:
+        """
+        1.8.1.6 欄式結果 → 與calculate_pro相同結構的八字字典列表（批量路徑不生成審計日誌，audit_log為空）
+        analyze=False時只返回基礎四柱資料（不做深度分析），供只需干支的場景使用
+        analysis=PC.ANALYSIS_SCORING時只做評分所需的分析階段（見1.4.1.7）
+        dedupe=True時同一等價類（BaziChart.class_key）只分析一次，其餘成員複製分析結果，出生資料各自保留
+        （完整分析含按出生日期計算的大運，不去重）
+        """
+        charts = BaziChart.from_columns(columns)
+        if not (analyze and dedupe and analysis in (PC.ANALYSIS_PILLARS, PC.ANALYSIS_SCORING)):
+            return [chart.to_dict(analyze, analysis) for chart in charts]
+        
+        analysed: Dict[Tuple, Dict[str, Any]] = {}
+        result = []
+        for chart in charts:
+            source = analysed.get(chart.class_key)
+            if source is None:
+                bazi_data = analysed[chart.class_key] = chart.to_dict(analyze, analysis)
+            else:
+                bazi_data = ProfessionalBatchCalculator.share_analysis(source, chart.to_dict(False))
+            result.append(bazi_data)
+        return result
+    
+    # 每個出生時間獨有的欄位；其餘欄位（四柱、五行及PC.ANALYSIS_SCORING以內的分析）同一等價類必然相同
+    BIRTH_FIELDS = frozenset((
+        'birth_month', 'birth_day', 'birth_hour', 'birth_minute', 'true_solar_hour', 'true_solar_minute',
+        'adjusted_year', 'adjusted_month', 'adjusted_day', 'time_adjusted', 'day_adjusted',
+        'audit_log', 'dayun_info',
+    ))
+    
+    @staticmethod
+    def chart_class_key(bazi: Dict[str, Any]) -> Tuple:
+        """
+        1.8.1.7 八字等價類鍵：四柱＋出生年＋（調整後）時辰信心度＋性別＋分析級別
+        鍵相同的八字分析及配對評分完全相同，只有出生時間等顯示欄位不同（大運除外，見BIRTH_FIELDS）
+        """
+        return (
+            bazi.get('year_pillar'), bazi.get('month_pillar'), bazi.get('day_pillar'), bazi.get('hour_pillar'),
+            bazi.get('birth_year'), bazi.get('hour_confidence'), bazi.get('gender'), bazi.get('analysis_level'),
+        )
+    
+    @staticmethod
+    def share_analysis(source: Dict[str, Any], target: Dict[str, Any]) -> Dict[str, Any]:
+        """1.8.1.8 把同一等價類source的分析欄位複製到target（list/dict值逐個複製，出生資料欄位不變）"""
+        for key, value in source.items():
+            if key not in ProfessionalBatchCalculator.BIRTH_FIELDS:
+                target[key] = value.copy() if isinstance(value, (list, dict)) else value
+        return target
+# 🔖 1.8 批量八字計算引擎結束
+
+# 🔖 1.9 干支日曆預計算表開始
+class ProfessionalGanzhiCalendar:
+    """
+    1.9.1 干支日曆預計算表 - 以日數為索引的年、月、日柱干支表
+    功能：首次使用時以sxtwl逐日生成int8表並存檔，之後以mmap載入，O(1)查表取代sxtwl物件構造
+    範圍外日期（PC.CALENDAR_START_YEAR 至 PC.CALENDAR_END_YEAR 以外）自動回退sxtwl
+    """
+    
+    # 欄位：年干、年支、月干、月支、日干、日支
+    COLUMNS = 6
+    
+    _table: Optional[np.ndarray] = None
+    _base_ordinal: int = 0
+    _loaded: bool = False
+    _lock = threading.Lock()
+    
+    @staticmethod
+    def _range_ordinals() -> Tuple[int, int]:
+        """1.9.1.1 覆蓋範圍的首尾日數（含首尾）"""
+        first = datetime(PC.CALENDAR_START_YEAR, 1, 1).toordinal()
+        last = datetime(PC.CALENDAR_END_YEAR, 12, 31).toordinal()
+        return first, last
+    
+    @staticmethod
+    def build_table(path: Optional[str] = None) -> np.ndarray:
+        """1.9.1.2 以sxtwl逐日生成干支表並原子寫入文件（約1秒，只需執行一次）"""
+        first, last = ProfessionalGanzhiCalendar._range_ordinals()
+        table = np.empty((last - first + 1, ProfessionalGanzhiCalendar.COLUMNS), dtype=np.int8)
+        
+        day_obj = sxtwl.fromSolar(PC.CALENDAR_START_YEAR, 1, 1)
+        for i in range(len(table)):
+            y_gz, m_gz, d_gz = day_obj.getYearGZ(), day_obj.getMonthGZ(), day_obj.getDayGZ()
+            table[i] = (y_gz.tg, y_gz.dz, m_gz.tg, m_gz.dz, d_gz.tg, d_gz.dz)
+            day_obj = day_obj.after(1)
+        
+        path = path or PC.CALENDAR_TABLE_PATH
+        try:
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                np.save(f, table)
+            os.replace(tmp_path, path)
+            logger.info(f"干支日曆表已生成: {path} ({len(table)}天)")
+        except OSError as e:
+            logger.warning(f"干支日曆表無法寫入文件，改為只保留在記憶體: {e}")
+        return table
+    
+    @staticmethod
+    def _ensure_loaded() -> Optional[np.ndarray]:
+        """1.9.1.3 載入干支表（mmap唯讀），文件不存在或規格不符時重新生成"""
+        cls = ProfessionalGanzhiCalendar
+        if cls._loaded:
+            return cls._table
+        
+        with cls._lock:
+            if cls._loaded:
+                return cls._table
+            
+            first, last = cls._range_ordinals()
+            expected_shape = (last - first + 1, cls.COLUMNS)
+            table = None
+            try:
+                if os.path.exists(PC.CALENDAR_TABLE_PATH):
+                    table = np.load(PC.CALENDAR_TABLE_PATH, mmap_mode='r')
+                    if table.shape != expected_shape or table.dtype != np.int8:
+                        logger.warning(f"干支日曆表規格不符 {table.shape}，重新生成")
+                        table = None
+                if table is None:
+                    table = cls.build_table()
+            except Exception as e:
+                logger.error(f"干支日曆表載入失敗，全部改用sxtwl: {e}", exc_info=True)
+                table = None
+            
+            cls._table = table
+            cls._base_ordinal = first
+            cls._loaded = True
+            return table
+    
+    @staticmethod
+    def _lookup_sxtwl(year: int, month: int, day: int) -> Tuple[int, int, int, int, int, int]:
+        """1.9.1.4 範圍外回退：直接以sxtwl計算"""
+        day_obj = sxtwl.fromSolar(year, month, day)
+        y_gz, m_gz, d_gz = day_obj.getYearGZ(), day_obj.getMonthGZ(), day_obj.getDayGZ()
+        return y_gz.tg, y_gz.dz, m_gz.tg, m_gz.dz, d_gz.tg, d_gz.dz
+    
+    @staticmethod
+    def lookup(year: int, month: int, day: int) -> Tuple[int, int, int, int, int, int]:
+        """1.9.1.5 單日查表：返回(年干, 年支, 月干, 月支, 日干, 日支)索引"""
+        table = ProfessionalGanzhiCalendar._ensure_loaded()
+        if table is not None:
+            offset = datetime(year, month, day).toordinal() - ProfessionalGanzhiCalendar._base_ordinal
+            if 0 <= offset < len(table):
+                return tuple(table[offset].tolist())
+        return ProfessionalGanzhiCalendar._lookup_sxtwl(year, month, day)
+    
+    @staticmethod
+    def lookup_ordinals(ordinals: np.ndarray, years: np.ndarray, months: np.ndarray,
+                        days: np.ndarray) -> np.ndarray:
+        """1.9.1.6 批量查表：ordinals為日數陣列，返回N×6 int8；範圍外的行逐個回退sxtwl"""
+        table = ProfessionalGanzhiCalendar._ensure_loaded()
+        result = np.empty((len(ordinals), ProfessionalGanzhiCalendar.COLUMNS), dtype=np.int8)
+        
+        if table is not None:
+            offsets = np.asarray(ordinals, dtype=np.int64) - ProfessionalGanzhiCalendar._base_ordinal
+            in_range = (offsets >= 0) & (offsets < len(table))
+            result[in_range] = table[offsets[in_range]]
+            outside = np.flatnonzero(~in_range)
+        else:
+            outside = np.arange(len(ordinals))
+        
+        for i in outside.tolist():
+            result[i] = ProfessionalGanzhiCalendar._lookup_sxtwl(int(years[i]), int(months[i]), int(days[i]))
+        return result
+# 🔖 1.9 干支日曆預計算表結束
+
+# 🔖 1.10 八字排盤緩存開始
+class ProfessionalChartCache:
+    """
+    1.10.1 八字排盤LRU緩存 - 以calculate_bazi_pro全部參數為鍵，容量有上限
+    特色：預設關閉（PC.CHART_CACHE_ENABLED）；存入及取出均複製，調用方修改結果不會污染緩存
+    """
+    
+    _entries: "OrderedDict[Tuple, Tuple[Dict[str, Any], int]]" = OrderedDict()
+    _lock = threading.Lock()
+    _enabled: bool = PC.CHART_CACHE_ENABLED
+    _max_size: int = PC.CHART_CACHE_MAX_SIZE
+    _hits: int = 0
+    _misses: int = 0
+    _evictions: int = 0
+    _memory_bytes: int = 0
+    
+    @staticmethod
+    def configure(enabled: Optional[bool] = None, max_size: Optional[int] = None) -> None:
+        """1.10.1.1 開關緩存或調整容量（縮小容量時即時淘汰最舊記錄）"""
+        cls = ProfessionalChartCache
+        with cls._lock:
+            if enabled is not None:
+                cls._enabled = bool(enabled)
+            if max_size is not None:
+                cls._max_size = max(1, int(max_size))
+            cls._evict_overflow()
+            if not cls._enabled:
+                cls._clear_entries()
+    
+    @staticmethod
+    def is_enabled() -> bool:
+        """1.10.1.2 緩存是否啟用"""
+        return ProfessionalChartCache._enabled
+    
+    @staticmethod
+    def clear() -> None:
+        """1.10.1.3 清空緩存記錄（統計數字保留）"""
+        with ProfessionalChartCache._lock:
+            ProfessionalChartCache._clear_entries()
+    
+    @staticmethod
+    def _clear_entries() -> None:
+        """1.10.1.3.1 清空記錄（調用方須持有鎖）"""
+        ProfessionalChartCache._entries.clear()
+        ProfessionalChartCache._memory_bytes = 0
+    
+    @staticmethod
+    def _evict_overflow() -> None:
+        """1.10.1.4 淘汰超出容量的最久未使用記錄（調用方須持有鎖）"""
+        cls = ProfessionalChartCache
+        while len(cls._entries) > cls._max_size:
+            _, (_, size) = cls._entries.popitem(last=False)
+            cls._memory_bytes -= size
+            cls._evictions += 1
+    
+    @staticmethod
+    def _copy_chart(chart: Dict[str, Any]) -> Dict[str, Any]:
+        """1.10.1.5 複製八字字典（值最多兩層：list/dict內只有字串和數字，兩層複製即完整隔離）"""
+        return {key: (value.copy() if isinstance(value, (list, dict)) else value)
+                for key, value in chart.items()}
+    
+    @staticmethod
+    def _estimate_size(chart: Dict[str, Any]) -> int:
+        """1.10.1.6 估算單個八字字典佔用記憶體（位元組）"""
+        size = sys.getsizeof(chart)
+        for key, value in chart.items():
+            size += sys.getsizeof(key) + sys.getsizeof(value)
+            if isinstance(value, dict):
+                size += sum(sys.getsizeof(k) + sys.getsizeof(v) for k, v in value.items())
+            elif isinstance(value, list):
+                size += sum(sys.getsizeof(v) for v in value)
+        return size
+    
+    @staticmethod
+    def get_or_calculate(key: Tuple, calculate: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+        """1.10.1.7 命中則返回緩存副本；未命中則計算、存入並返回副本（計算失敗不緩存）"""
+        cls = ProfessionalChartCache
+        if not cls._enabled:
+            return calculate()
+        
+        with cls._lock:
+            entry = cls._entries.get(key)
+            if entry is not None:
+                cls._entries.move_to_end(key)
+                cls._hits += 1
+                return cls._copy_chart(entry[0])
+            cls._misses += 1
+        
+        chart = calculate()
+        stored = cls._copy_chart(chart)
+        size = cls._estimate_size(stored)
+        
+        with cls._lock:
+            if cls._enabled and key not in cls._entries:
+                cls._entries[key] = (stored, size)
+                cls._memory_bytes += size
+                cls._evict_overflow()
+        return chart
+    
+    @staticmethod
+    def stats() -> Dict[str, Any]:
+        """1.10.1.8 緩存統計：命中、未命中、淘汰、命中率、記錄數、估算記憶體"""
+        cls = ProfessionalChartCache
+        with cls._lock:
+            lookups = cls._hits + cls._misses
+            return {
+                'enabled': cls._enabled,
+                'size': len(cls._entries),
+                'max_size': cls._max_size,
+                'hits': cls._hits,
+                'misses': cls._misses,
+                'evictions': cls._evictions,
+                'hit_rate': round(cls._hits * 100 / lookups, 1) if lookups else 0.0,
+                'memory_bytes': cls._memory_bytes,
+            }
+    
+    @staticmethod
+    def reset_stats() -> None:
+        """1.10.1.9 統計數字歸零"""
+        cls = ProfessionalChartCache
+        with cls._lock:
+            cls._hits = cls._misses = cls._evictions = 0
+# 🔖 1.10 八字排盤緩存結束
+
+# 🔖 1.11 夏令時區間索引開始
+class ProfessionalDSTRegistry:
+    """
+    1.11.1 按地區註冊的夏令時區間索引 - 日期表於註冊時一次編譯為排序日數區間
+    特色：單個查找用bisect，批量查找用np.searchsorted，新增地區不影響既有地區的查找速度
+    """
+    
+    # 地區 → (起始日數列表, 結束日數列表, 原始日期字串區間, 起始日數陣列, 結束日數陣列)
+    _regions: Dict[str, Tuple[List[int], List[int], List[Tuple[str, str]], np.ndarray, np.ndarray]] = {}
+    
+    @staticmethod
+    def register(region: str, periods: Sequence[Tuple[str, str]]) -> None:
+        """1.11.1.1 註冊（或替換）一個地區的夏令時表，日期格式YYYY-MM-DD，兩端均含"""
+        compiled = []
+        for start_str, end_str in periods:
+            start = datetime.strptime(start_str, "%Y-%m-%d").toordinal()
+            end = datetime.strptime(end_str, "%Y-%m-%d").toordinal()
+            if end < start:
+                raise TimeCalculationError(f"夏令時區間顛倒: {region} {start_str} 至 {end_str}")
+            compiled.append((start, end, (start_str, end_str)))
+        compiled.sort()
+        for prev, cur in zip(compiled, compiled[1:]):
+            if cur[0] <= prev[1]:
+                raise TimeCalculationError(
+                    f"夏令時區間重疊: {region} {prev[2][0]}~{prev[2][1]} 與 {cur[2][0]}~{cur[2][1]}"
+                )
+        starts = [item[0] for item in compiled]
+        ends = [item[1] for item in compiled]
+        ProfessionalDSTRegistry._regions[region] = (
+            starts, ends, [item[2] for item in compiled],
+            np.array(starts, dtype=np.int64), np.array(ends, dtype=np.int64)
+        )
+    
+    @staticmethod
+    def regions() -> List[str]:
+        """1.11.1.2 已註冊地區列表"""
+        return sorted(ProfessionalDSTRegistry._regions)
+    
+    @staticmethod
+    def _get_region(region: Optional[str]) -> Tuple[List[int], List[int], List[Tuple[str, str]], np.ndarray, np.ndarray]:
+        """1.11.1.3 取出地區索引（未指定時用PC.DST_REGION）"""
+        region = region or PC.DST_REGION
+        try:
+            return ProfessionalDSTRegistry._regions[region]
+        except KeyError:
+            raise TimeCalculationError(f"未註冊的夏令時地區: {region}")
+    
+    @staticmethod
+    def lookup(ordinal: int, region: Optional[str] = None) -> Optional[Tuple[str, str]]:
+        """1.11.1.4 單個日期（date.toordinal日數）查找，命中時返回所在區間的原始日期字串"""
+        starts, ends, labels, _, _ = ProfessionalDSTRegistry._get_region(region)
+        idx = bisect_right(starts, ordinal) - 1
+        if idx >= 0 and ordinal <= ends[idx]:
+            return labels[idx]
+        return None
+    
+    @staticmethod
+    def mask(ordinals: np.ndarray, region: Optional[str] = None) -> np.ndarray:
+        """1.11.1.5 批量查找，返回與ordinals同形狀的布爾陣列"""
+        _, _, _, starts, ends = ProfessionalDSTRegistry._get_region(region)
+        if len(starts) == 0:
+            return np.zeros(np.shape(ordinals), dtype=bool)
+        idx = np.searchsorted(starts, ordinals, side='right') - 1
+        return (idx >= 0) & (ordinals <= ends[np.maximum(idx, 0)])
+
+# 模組載入時編譯香港夏令時表
+ProfessionalDSTRegistry.register("HK", PC.HK_DST_PERIODS)
+# 🔖 1.11 夏令時區間索引結束
+
+# 🔖 1.12 均時差預計算表開始
+class ProfessionalEquationOfTimeTable:
+    """
+    1.12.1 均時差預計算表 - 每日0時一個值，按當日時刻線性插值
+    功能：首次使用時以向量化公式生成（PC.CALENDAR_START_YEAR 至 PC.CALENDAR_END_YEAR，約600KB，毫秒級），
+    單個與批量時間計算共用同一張表，插值運算次序一致，兩者結果逐位相同；範圍外日期回退公式
+    插值誤差小於0.002分鐘（見 python simple_test.py eot）；誤差可能改變取整結果的時刻由調用方改用公式
+    """
+    
+    MAX_ERROR_MINUTES: float = 0.005  # 插值誤差上限（實測最大0.0018分鐘，留餘量）
+    ADJUST_THRESHOLDS: Tuple[float, ...] = (5.0, 10.0, 30.0, 60.0)  # 總調整量分檔（adjusted旗標、信心度降級）
+    _table: Optional[np.ndarray] = None
+    _base_ordinal: int = 0
+    _lock = threading.Lock()
+    
+    @staticmethod
+    def build_table() -> np.ndarray:
+        """1.12.1.1 生成每日0時均時差表（多含結束年份後一天，供最後一天插值）"""
+        first, last = ProfessionalGanzhiCalendar._range_ordinals()
+        ordinals = np.arange(first, last + 2, dtype=np.int64)
+        years, months, days = ProfessionalBatchCalculator._from_day_number(ordinals)
+        zeros = np.zeros(len(ordinals), dtype=np.int64)
+        return ProfessionalBatchCalculator._equation_of_time_batch(years, months, days, zeros, zeros)
+    
+    @staticmethod
+    def _ensure_loaded() -> np.ndarray:
+        """1.12.1.2 首次使用時生成表"""
+        cls = ProfessionalEquationOfTimeTable
+        if cls._table is None:
+            with cls._lock:
+                if cls._table is None:
+                    cls._base_ordinal = ProfessionalGanzhiCalendar._range_ordinals()[0]
+                    cls._table = cls.build_table()
+        return cls._table
+    
+    @staticmethod
+    def lookup(year: int, month: int, day: int, hour: int, minute: int) -> float:
+        """1.12.1.3 單個查表插值（分鐘數）"""
+        table = ProfessionalEquationOfTimeTable._ensure_loaded()
+        offset = datetime(year, month, day).toordinal() - ProfessionalEquationOfTimeTable._base_ordinal
+        if 0 <= offset < len(table) - 1:
+            v0 = table.item(offset)
+            v1 = table.item(offset + 1)
+            return v0 + (v1 - v0) * ((hour + minute / 60.0) / 24.0)
+        return ProfessionalTimeProcessor._equation_of_time_formula(year, month, day, hour, minute)
+    
+    @staticmethod
+    def lookup_ordinals(ordinals: np.ndarray, years: np.ndarray, months: np.ndarray, days: np.ndarray,
+                        hours: np.ndarray, minutes: np.ndarray) -> np.ndarray:
+        """1.12.1.4 批量查表插值（運算次序與1.12.1.3相同），範圍外的行改用向量化公式"""
+        table = ProfessionalEquationOfTimeTable._ensure_loaded()
+        offsets = np.asarray(ordinals, dtype=np.int64) - ProfessionalEquationOfTimeTable._base_ordinal
+        in_range = (offsets >= 0) & (offsets < len(table) - 1)
+        safe = np.where(in_range, offsets, 0)
+        v0 = table[safe]
+        v1 = table[safe + 1]
+        eot = v0 + (v1 - v0) * ((hours + minutes / 60.0) / 24.0)
+        if not in_range.all():
+            outside = ~in_range
+            eot[outside] = ProfessionalBatchCalculator._equation_of_time_batch(
+                years[outside], months[outside], days[outside], hours[outside], minutes[outside]
+            )
+        return eot
+    
+    @staticmethod
+    def near_rounding_edge(total_minutes, total_adjust_minutes):
+        """
+        1.12.1.5 插值誤差可能改變結果的時刻：分鐘四捨五入邊界、整點及日界、總調整量分檔邊界
+        純量返回bool，陣列返回逐行布爾陣列
+        """
+        cls = ProfessionalEquationOfTimeTable
+        error = cls.MAX_ERROR_MINUTES
+        in_hour = total_minutes % 60.0
+        edge = (abs(total_minutes % 1.0 - 0.5) < error) | (in_hour < error) | (in_hour > 60.0 - error)
+        abs_adjust = abs(total_adjust_minutes)
+        for threshold in cls.ADJUST_THRESHOLDS:
+            edge = edge | (abs(abs_adjust - threshold) < error)
+        return edge
+# 🔖 1.12 均時差預計算表結束
+
+# 🔖 1.13 緊湊八字物件開始
+class BaziChart:
+    """
+    1.13.1 緊湊八字物件 - 干支以整數索引（天干0-9、地支0-11）保存，五行為固定長度浮點陣列
+    用途：搜尋時大量候選八字只保存此物件，深度分析延後到to_dict()才計算
+    記憶體：約0.5KB/個，完整八字字典（不含審計日誌）約3.3KB/個
+    """
+    
+    __slots__ = (
+        'stems', 'branches', 'elements', 'gender', 'hour_confidence',
+        'birth_year', 'birth_month', 'birth_day', 'birth_hour', 'birth_minute',
+        'true_solar_hour', 'true_solar_minute',
+        'adjusted_year', 'adjusted_month', 'adjusted_day',
+        'time_adjusted', 'day_adjusted',
+    )
+    
+    def __init__(self, stems: Sequence[int], branches: Sequence[int], elements: Sequence[float],
+                 gender: str, hour_confidence: str,
+                 birth_year: int, birth_month: int, birth_day: int, birth_hour: int, birth_minute: int,
+                 true_solar_hour: int, true_solar_minute: int,
+                 adjusted_year: int, adjusted_month: int, adjusted_day: int,
+                 time_adjusted: bool, day_adjusted: int):
+        """1.13.1.1 stems/branches依年月日時順序；elements依ProfessionalBatchCalculator.ELEMENT_ORDER，已正規化到100%"""
+        self.stems = bytes(stems)
+        self.branches = bytes(branches)
+        self.elements = array('d', elements)
+        self.gender = gender
+        self.hour_confidence = hour_confidence
+        self.birth_year = birth_year
+        self.birth_month = birth_month
+        self.birth_day = birth_day
+        self.birth_hour = birth_hour
+        self.birth_minute = birth_minute
+        self.true_solar_hour = true_solar_hour
+        self.true_solar_minute = true_solar_minute
+        self.adjusted_year = adjusted_year
+        self.adjusted_month = adjusted_month
+        self.adjusted_day = adjusted_day
+        self.time_adjusted = time_adjusted
+        self.day_adjusted = day_adjusted
+    
+    @property
+    def pillars(self) -> List[str]:
+        """1.13.1.2 年月日時四柱字串"""
+        STEMS = ProfessionalBaziCalculator.STEMS
+        BRANCHES = ProfessionalBaziCalculator.BRANCHES
+        return [STEMS[s] + BRANCHES[b] for s, b in zip(self.stems, self.branches)]
+    
+    @property
+    def day_stem(self) -> str:
+        """1.13.1.3 日主天干"""
+        return ProfessionalBaziCalculator.STEMS[self.stems[2]]
+    
+    @property
+    def class_key(self) -> Tuple:
+        """1.13.1.3.1 等價類鍵：四柱干支＋出生年＋時辰信心度＋性別（同鍵八字分析結果相同，見1.8.1.7）"""
+        return (self.stems, self.branches, self.birth_year, self.hour_confidence, self.gender)
+    
+    def __repr__(self) -> str:
+        return f"BaziChart({' '.join(self.pillars)}, {self.gender})"
+    
+    @staticmethod
+    def from_columns(columns: Dict[str, Any]) -> List["BaziChart"]:
+        """1.13.1.4 由calculate_bazi_batch的欄式結果建立（五行在此正規化）"""
+        lists = {key: (value.tolist() if isinstance(value, np.ndarray) else value)
+                 for key, value in columns.items()}
+        normalize = ProfessionalBatchCalculator._normalize_elements
+        return [
+            BaziChart(
+                lists['stems'][i], lists['branches'][i], normalize(lists['elements'][i]).values(),
+                lists['gender'][i], lists['hour_confidence'][i],
+                lists['birth_year'][i], lists['birth_month'][i], lists['birth_day'][i],
+                lists['birth_hour'][i], lists['birth_minute'][i],
+                lists['true_solar_hour'][i], lists['true_solar_minute'][i],
+                lists['adjusted_year'][i], lists['adjusted_month'][i], lists['adjusted_day'][i],
+                lists['time_adjusted'][i], lists['day_adjusted'][i],
+            )
+            for i in range(columns['count'])
+        ]
+    
+    @staticmethod
+    def from_dict(bazi: Dict[str, Any]) -> "BaziChart":
+        """1.13.1.5 由calculate_bazi返回的八字字典建立"""
+        STEMS = ProfessionalBaziCalculator.STEMS
+        BRANCHES = ProfessionalBaziCalculator.BRANCHES
+        pillars = [bazi['year_pillar'], bazi['month_pillar'], bazi['day_pillar'], bazi['hour_pillar']]
+        try:
+            stems = [STEMS.index(p[0]) for p in pillars]
+            branches = [BRANCHES.index(p[1]) for p in pillars]
+        except (IndexError, ValueError):
+            raise ProfessionalValidationError(f"無效四柱: {pillars}")
+        elements = bazi.get('elements', {})
+        return BaziChart(
+            stems, branches, [elements.get(e, 0.0) for e in ProfessionalBatchCalculator.ELEMENT_ORDER],
+            bazi['gender'], bazi['hour_confidence'],
+            bazi['birth_year'], bazi['birth_month'], bazi['birth_day'],
+            bazi['birth_hour'], bazi['birth_minute'],
+            bazi['true_solar_hour'], bazi['true_solar_minute'],
+            bazi['adjusted_year'], bazi['adjusted_month'], bazi['adjusted_day'],
+            bazi['time_adjusted'], bazi['day_adjusted'],
+        )
+    
+    def to_dict(self, analyze: bool = True, analysis: Optional[str] = None) -> Dict[str, Any]:
+        """
+        1.13.1.6 還原為calculate_bazi相同結構的八字字典（不含審計日誌，audit_log為空）
+        analyze=False時只返回基礎四柱資料，不做深度分析；analysis見PC.ANALYSIS_*
+        """
+        pillars = self.pillars
+        day_stem = self.day_stem
+        bazi_data = {
+            "year_pillar": pillars[0],
+            "month_pillar": pillars[1],
+            "day_pillar": pillars[2],
+            "hour_pillar": pillars[3],
+            "zodiac": ProfessionalBaziCalculator.ZODIACS[self.branches[0]],
+            "day_stem": day_stem,
+            "day_stem_element": ProfessionalBaziCalculator.STEM_ELEMENTS.get(day_stem, ""),
+            "hour_confidence": self.hour_confidence,
+            "gender": self.gender,
+            "birth_year": self.birth_year,
+            "birth_month": self.birth_month,
+            "birth_day": self.birth_day,
+            "birth_hour": self.birth_hour,
+            "birth_minute": self.birth_minute,
+            "true_solar_hour": self.true_solar_hour,
+            "true_solar_minute": self.true_solar_minute,
+            "adjusted_year": self.adjusted_year,
+            "adjusted_month": self.adjusted_month,
+            "adjusted_day": self.adjusted_day,
+            "time_adjusted": self.time_adjusted,
+            "day_adjusted": self.day_adjusted,
+            "audit_log": []
+        }
+        if analyze:
+            elements = dict(zip(ProfessionalBatchCalculator.ELEMENT_ORDER, self.elements))
+            bazi_data = ProfessionalBaziCalculator._analyze_professional_enhanced(
+                bazi_data, self.gender, None, elements=elements, audit_level=PC.AUDIT_OFF, analysis=analysis
+            )
+        return bazi_data
+# 🔖 1.13 緊湊八字物件結束
+
+# 🔖 1.14 干支關係矩陣開始
+class ProfessionalRelations:
+    """
+    1.14.1 干支關係預計算矩陣 - 由PC關係表一次生成，單次判斷只需查表及位元運算
+    地支：六沖、六害、六合、三合12×12矩陣；天干：五合10×10矩陣
+    每種關係同時提供numpy布爾矩陣（批量向量化）及12/10位整數遮罩行（單個判斷）
+    三刑：地支出現遮罩與重複遮罩（12位）上的位元運算
+    """
+    
+    STEM_INDEX = {stem: i for i, stem in enumerate(ProfessionalBaziCalculator.STEMS)}
+    BRANCH_INDEX = {branch: i for i, branch in enumerate(ProfessionalBaziCalculator.BRANCHES)}
+    PILLAR_COUNT = 120  # 干支柱打包進位（10天干×12地支）
+    
+    # 以下由build()於模組載入時生成
+    BRANCH_CLASH_MATRIX: np.ndarray
+    BRANCH_HARM_MATRIX: np.ndarray
+    BRANCH_COMBINATION_MATRIX: np.ndarray
+    BRANCH_THREE_HARMONY_MATRIX: np.ndarray
+    STEM_COMBINATION_MATRIX: np.ndarray
+    BRANCH_CLASH_MASKS: Tuple[int, ...] = ()
+    BRANCH_HARM_MASKS: Tuple[int, ...] = ()
+    BRANCH_COMBINATION_MASKS: Tuple[int, ...] = ()
+    BRANCH_THREE_HARMONY_MASKS: Tuple[int, ...] = ()
+    STEM_COMBINATION_MASKS: Tuple[int, ...] = ()
+    PUNISHMENT_MASKS: Tuple[Tuple[int, str], ...] = ()  # 三刑判斷次序與類型名稱
+    SELF_PUNISHMENT_MASK: int = 0                        # 自刑需同一地支出現兩次
+    
+    @staticmethod
+    def _pair_matrix(pairs: Sequence[Tuple[str, str]], index: Dict[str, int]) -> np.ndarray:
+        """1.14.1.1 由對稱關係對生成布爾矩陣"""
+        matrix = np.zeros((len(index), len(index)), dtype=bool)
+        for a, b in pairs:
+            matrix[index[a], index[b]] = matrix[index[b], index[a]] = True
+        return matrix
+    
+    @staticmethod
+    def _row_masks(matrix: np.ndarray) -> Tuple[int, ...]:
+        """1.14.1.2 矩陣每行轉為整數位元遮罩（第j位為1表示與j有關係）"""
+        return tuple(sum(1 << j for j in np.flatnonzero(row).tolist()) for row in matrix)
+    
+    @staticmethod
+    def _mask_of(chars: Sequence[str], index: Dict[str, int]) -> int:
+        """1.14.1.3 字元組 → 位元遮罩"""
+        mask = 0
+        for char in chars:
+            mask |= 1 << index[char]
+        return mask
+    
+    @staticmethod
+    def build() -> None:
+        """1.14.1.4 由PC關係表生成全部矩陣及遮罩（PC表修改後可重新調用）"""
+        R = ProfessionalRelations
+        three_harmony_pairs = [(a, b) for a, group in ProfessionalBaziCalculator.THREE_HARMONY_MAP.items()
+                               for b in group]
+        R.BRANCH_CLASH_MATRIX = R._pair_matrix(PC.BRANCH_CLASH_PAIRS, R.BRANCH_INDEX)
+        R.BRANCH_HARM_MATRIX = R._pair_matrix(PC.BRANCH_HARM_PAIRS, R.BRANCH_INDEX)
+        R.BRANCH_COMBINATION_MATRIX = R._pair_matrix(PC.BRANCH_SIX_COMBINATION_PAIRS, R.BRANCH_INDEX)
+        R.BRANCH_THREE_HARMONY_MATRIX = R._pair_matrix(three_harmony_pairs, R.BRANCH_INDEX)
+        R.STEM_COMBINATION_MATRIX = R._pair_matrix(PC.STEM_FIVE_COMBINATION_PAIRS, R.STEM_INDEX)
+        
+        R.BRANCH_CLASH_MASKS = R._row_masks(R.BRANCH_CLASH_MATRIX)
+        R.BRANCH_HARM_MASKS = R._row_masks(R.BRANCH_HARM_MATRIX)
+        R.BRANCH_COMBINATION_MASKS = R._row_masks(R.BRANCH_COMBINATION_MATRIX)
+        R.BRANCH_THREE_HARMONY_MASKS = R._row_masks(R.BRANCH_THREE_HARMONY_MATRIX)
+        R.STEM_COMBINATION_MASKS = R._row_masks(R.STEM_COMBINATION_MATRIX)
+        
+        punishment_sets = PC.BRANCH_THREE_PUNISHMENT_SETS
+        R.PUNISHMENT_MASKS = (
+            (R._mask_of(punishment_sets[0], R.BRANCH_INDEX), "無恩之刑"),
+            (R._mask_of(punishment_sets[1], R.BRANCH_INDEX), "恃勢之刑"),
+            (R._mask_of(punishment_sets[2], R.BRANCH_INDEX), "無禮之刑"),
+        )
+        R.SELF_PUNISHMENT_MASK = R._mask_of(punishment_sets[3], R.BRANCH_INDEX)
+    
+    @staticmethod
+    def _related(masks: Tuple[int, ...], index: Dict[str, int], a: str, b: str) -> bool:
+        """1.14.1.5 查遮罩行判斷a與b是否有關係（未知字元視為無關係）"""
+        i = index.get(a)
+        j = index.get(b)
+        if i is None or j is None:
+            return False
+        return (masks[i] >> j) & 1 == 1
+    
+    @staticmethod
+    def is_branch_clash(branch1: str, branch2: str) -> bool:
+        """1.14.1.6 地支六沖"""
+        R = ProfessionalRelations
+        return R._related(R.BRANCH_CLASH_MASKS, R.BRANCH_INDEX, branch1, branch2)
+    
+    @staticmethod
+    def is_branch_harm(branch1: str, branch2: str) -> bool:
+        """1.14.1.7 地支六害"""
+        R = ProfessionalRelations
+        return R._related(R.BRANCH_HARM_MASKS, R.BRANCH_INDEX, branch1, branch2)
+    
+    @staticmethod
+    def is_branch_combination(branch1: str, branch2: str) -> bool:
+        """1.14.1.8 地支六合"""
+        R = ProfessionalRelations
+        return R._related(R.BRANCH_COMBINATION_MASKS, R.BRANCH_INDEX, branch1, branch2)
+    
+    @staticmethod
+    def is_branch_three_harmony(branch1: str, branch2: str) -> bool:
+        """1.14.1.9 地支同屬一組三合（不同支）"""
+        R = ProfessionalRelations
+        return R._related(R.BRANCH_THREE_HARMONY_MASKS, R.BRANCH_INDEX, branch1, branch2)
+    
+    @staticmethod
+    def is_stem_combination(stem1: str, stem2: str) -> bool:
+        """1.14.1.10 天干五合"""
+        R = ProfessionalRelations
+        return R._related(R.STEM_COMBINATION_MASKS, R.STEM_INDEX, stem1, stem2)
+    
+    @staticmethod
+    def branch_masks(branches: Sequence[str]) -> Tuple[int, int]:
+        """1.14.1.11 地支列表 → (出現遮罩, 重複出現遮罩)，未知字元忽略"""
+        index = ProfessionalRelations.BRANCH_INDEX
+        present = duplicated = 0
+        for branch in branches:
+            i = index.get(branch)
+            if i is not None:
+                bit = 1 << i
+                duplicated |= present & bit
+                present |= bit
+        return present, duplicated
+    
+    @staticmethod
+    def pillar_index(pillar: str) -> int:
+        """1.14.1.14 干支柱 → 天干索引×12+地支索引（0-119），取前兩字，無法識別時返回-1"""
+        if len(pillar) < 2:
+            return -1
+        stem = ProfessionalRelations.STEM_INDEX.get(pillar[0], -1)
+        branch = ProfessionalRelations.BRANCH_INDEX.get(pillar[1], -1)
+        if stem < 0 or branch < 0:
+            return -1
+        return stem * 12 + branch
+    
+    @staticmethod
+    def pillars_key(pillars: Sequence[str]) -> int:
+        """1.14.1.15 多柱打包為單一整數（逐柱以120進位），任一柱無法識別時返回-1"""
+        key = 0
+        for pillar in pillars:
+            index = ProfessionalRelations.pillar_index(pillar)
+            if index < 0:
+                return -1
+            key = key * ProfessionalRelations.PILLAR_COUNT + index
+        return key
+    
+    @staticmethod
+    def punishment_type(branches: Sequence[str]) -> Optional[str]:
+        """1.14.1.12 三刑類型：無恩之刑/恃勢之刑/無禮之刑/其他三刑（自刑），無三刑時返回None"""
+        return ProfessionalRelations.punishment_type_from_masks(*ProfessionalRelations.branch_masks(branches))
+    
+    @staticmethod
+    def punishment_type_from_masks(present: int, duplicated: int) -> Optional[str]:
+        """1.14.1.13 由(出現遮罩, 重複出現遮罩)判斷三刑類型"""
+        for mask, name in ProfessionalRelations.PUNISHMENT_MASKS:
+            if present & mask == mask:
+                return name
+        if duplicated & ProfessionalRelations.SELF_PUNISHMENT_MASK:
+            return "其他三刑"
+        return None
+
+# 模組載入時生成干支關係矩陣，並以干支索引生成特殊案例登記表
+ProfessionalRelations.build()
+ProfessionalScoringEngine.build_special_cases()
+# 🔖 1.14 干支關係矩陣結束
+
+# 🔖 1.15 配對評分特徵檔開始
+class ScoringProfile:
+    """
+    1.15.1 單個八字的配對評分特徵檔 - 以所讀欄位的值為鍵緩存在模組內，不寫入八字字典
+    地支、喜用神、忌神、天乙貴人以位元遮罩表示，五行為固定順序的元組；
+    配對時ProfessionalScoringEngine只合成兩個特徵檔，一對多評分只需N次廉價的配對步驟
+    調用方原地修改八字字典後，輸入鍵隨之改變，下次取用自動重建，不會返回過期特徵檔
+    """
+    
+    CACHE_MAX_SIZE = 16384  # 特徵檔緩存容量（每筆約1KB），滿額時整批清空
+    _cache: Dict[Tuple, "ScoringProfile"] = {}
+    ELEMENT_NAMES = tuple(ProfessionalBatchCalculator.ELEMENT_ORDER)
+    ELEMENT_INDEX = {name: i for i, name in enumerate(ELEMENT_NAMES)}
+    GENERATION_INDEX: Tuple[int, ...] = ()  # 五行索引 → 所生五行索引（模組載入時生成）
+    
+    __slots__ = (
+        'day_stem', 'day_stem_id', 'day_branch', 'day_branch_id', 'year_branch',
+        'branch_mask', 'branch_duplicated_mask', 'tianyi_mask',
+        'hongluan_branch', 'tianxi_branch',
+        'useful', 'useful_mask', 'useful_generates_mask', 'harmful_mask',
+        'elements', 'birth_year', 'hour_confidence', 'special_prefix', 'year_index', 'signature',
+    )
+    
+    def __init__(self, bazi: Dict[str, Any]):
+        """1.15.1.1 由八字字典建立（欄位取值方式與原_extract_basic_features一致）"""
+        R = ProfessionalRelations
+        element_index = ScoringProfile.ELEMENT_INDEX
+        
+        day_pillar = bazi.get('day_pillar', '')
+        self.day_stem = day_pillar[0] if len(day_pillar) >= 1 else ''
+        self.day_branch = day_pillar[1] if len(day_pillar) >= 2 else ''
+        self.day_stem_id = R.STEM_INDEX.get(self.day_stem, -1)
+        self.day_branch_id = R.BRANCH_INDEX.get(self.day_branch, -1)
+        
+        branches = []
+        for pillar in ('year_pillar', 'month_pillar', 'day_pillar', 'hour_pillar'):
+            value = bazi.get(pillar, '')
+            if len(value) >= 2:
+                branches.append(value[1])
+        self.branch_mask, self.branch_duplicated_mask = R.branch_masks(branches)
+        
+        self.year_branch = bazi.get('year_pillar', '  ')[1]
+        self.hongluan_branch = ProfessionalBaziCalculator.HONG_LUAN_MAP.get(self.year_branch)
+        self.tianxi_branch = ProfessionalBaziCalculator.TIAN_XI_MAP.get(self.year_branch)
+        self.tianyi_mask = R.branch_masks(
+            ProfessionalBaziCalculator.TIANYI_GUI_REN.get(bazi.get('day_stem', ''), [])
+        )[0]
+        
+        # 喜用神按原列表次序去重，保存五行索引
+        self.useful = tuple(dict.fromkeys(
+            element_index[e] for e in bazi.get("useful_elements", []) if e in element_index
+        ))
+        self.useful_mask = 0
+        self.useful_generates_mask = 0
+        for u in self.useful:
+            self.useful_mask |= 1 << u
+            self.useful_generates_mask |= 1 << ScoringProfile.GENERATION_INDEX[u]
+        self.harmful_mask = 0
+        for e in bazi.get("harmful_elements", []):
+            if e in element_index:
+                self.harmful_mask |= 1 << element_index[e]
+        
+        elements = bazi.get("elements", {})
+        self.elements = tuple(elements.get(name, 0) for name in ScoringProfile.ELEMENT_NAMES)
+        self.birth_year = bazi.get('birth_year', 2000)
+        self.hour_confidence = bazi.get('hour_confidence', '中')
+        
+        # 特殊案例登記表打包鍵：作為A方時的年月日柱鍵，作為B方時的年柱索引
+        self.special_prefix = R.pillars_key([bazi.get(key, '') for key in ('year_pillar', 'month_pillar', 'day_pillar')])
+        self.year_index = R.pillar_index(bazi.get('year_pillar', ''))
+        
+        # 評分簽名：配對評分讀取的全部欄位，簽名相同的兩個八字配對結果必然相同（配對結果緩存鍵）
+        self.signature = (
+            self.special_prefix, self.year_index, self.day_stem, self.day_branch, self.year_branch,
+            self.branch_mask, self.branch_duplicated_mask, self.tianyi_mask,
+            self.useful, self.harmful_mask, self.elements, self.birth_year, self.hour_confidence,
+        )
+    
+    @staticmethod
+    def input_key(bazi: Dict[str, Any]) -> Tuple:
+        """1.15.1.2 特徵檔讀取的全部原始欄位值（緩存鍵），欄位內容相同的八字共用一個特徵檔"""
+        elements = bazi.get("elements", {})
+        return (
+            bazi.get('year_pillar', ''), bazi.get('month_pillar', ''),
+            bazi.get('day_pillar', ''), bazi.get('hour_pillar', ''), bazi.get('day_stem', ''),
+            tuple(bazi.get("useful_elements", [])), tuple(bazi.get("harmful_elements", [])),
+            tuple(elements.get(name, 0) for name in ScoringProfile.ELEMENT_NAMES),
+            bazi.get('birth_year', 2000), bazi.get('hour_confidence', '中'),
+        )
+    
+    @staticmethod
+    def of(bazi: Dict[str, Any]) -> "ScoringProfile":
+        """1.15.1.3 按欄位值取出緩存的特徵檔，沒有則建立並緩存"""
+        cache = ScoringProfile._cache
+        key = ScoringProfile.input_key(bazi)
+        profile = cache.get(key)
+        if profile is None:
+            profile = ScoringProfile(bazi)
+            if len(cache) >= ScoringProfile.CACHE_MAX_SIZE:
+                cache.clear()
+            cache[key] = profile
+        return profile
+    
+    @staticmethod
+    def clear_cache() -> None:
+        """1.15.1.4 清空特徵檔緩存（計時基準測試前使用）"""
+        ScoringProfile._cache.clear()
+
+ScoringProfile.GENERATION_INDEX = tuple(
+    ScoringProfile.ELEMENT_INDEX[PC.ELEMENT_GENERATION[name]] for name in ScoringProfile.ELEMENT_NAMES
+)
+# 🔖 1.15 配對評分特徵檔結束
+
+# 🔖 1.16 一對多批量配對評分開始
+class ProfessionalBatchScoringEngine:
+    """
+    1.16.1 一對多批量配對評分 - 一個用戶八字對N個候選八字
+    候選特徵檔展開為NumPy欄，結構類型、沖刑、伏吟、供養、神煞、現實校準逐步以陣列運算完成；
+    分數與ProfessionalScoringEngine正常算法逐位一致。特殊案例及欄位不完整的候選逐個回退單筆評分
+    """
+    
+    STRUCTURE_TYPES = ("closed_loop", "strong_complement", "stable_supply", "mutual_destruction", "normal_balance")
+    STRUCTURE_BASE_SCORES = np.array([85.0, 72.0, 68.0, 40.0, 58.0])
+    POPCOUNT = np.array([bin(i).count("1") for i in range(32)], dtype=np.int64)  # 五行遮罩位元數
+    ADJUSTMENT_KEYS = (
+        "clash_adjustment", "fuyin_adjustment", "supply_adjustment", "shen_sha_adjustment", "reality_adjustment",
+    )
+    DETAIL_KEYS = (
+        ("score", "rating", "rating_description", "relationship_model", "structure_type")
+        + ADJUSTMENT_KEYS + ("breakdown",)
+    )
+    HONG_LUAN_INDEX: Tuple[int, ...] = ()  # 年支索引 → 紅鸞地支索引（模組載入時生成）
+    TIAN_XI_INDEX: Tuple[int, ...] = ()    # 年支索引 → 天喜地支索引
+    
+    @staticmethod
+    def build() -> None:
+        """1.16.1.1 生成年支→紅鸞/天喜索引表（模組載入時調用一次）"""
+        E = ProfessionalBatchScoringEngine
+        index = ProfessionalRelations.BRANCH_INDEX
+        branches = ProfessionalBaziCalculator.BRANCHES
+        E.HONG_LUAN_INDEX = tuple(index[ProfessionalBaziCalculator.HONG_LUAN_MAP[b]] for b in branches)
+        E.TIAN_XI_INDEX = tuple(index[ProfessionalBaziCalculator.TIAN_XI_MAP[b]] for b in branches)
+    
+    @staticmethod
+    def _is_regular(profile: ScoringProfile) -> bool:
+        """1.16.1.2 日柱干支可識別、出生年為整數的特徵檔才走向量化路徑"""
+        return profile.day_stem_id >= 0 and profile.day_branch_id >= 0 and isinstance(profile.birth_year, int)
+    
+    @staticmethod
+    def _profile_columns(profiles: List[ScoringProfile]) -> Dict[str, np.ndarray]:
+        """1.16.1.3 候選特徵檔展開為欄式陣列（紅鸞天喜未知記-2，年支未知記-1，兩者永不相等）"""
+        count = len(profiles)
+        
+        def column(getter):
+            return np.fromiter((getter(p) for p in profiles), dtype=np.int64, count=count)
+        
+        year_branch = column(lambda p: ProfessionalRelations.BRANCH_INDEX.get(p.year_branch, -1))
+        hongluan = np.asarray(ProfessionalBatchScoringEngine.HONG_LUAN_INDEX, dtype=np.int64)
+        tianxi = np.asarray(ProfessionalBatchScoringEngine.TIAN_XI_INDEX, dtype=np.int64)
+        known = year_branch >= 0
+        return {
+            "day_stem": column(lambda p: p.day_stem_id),
+            "day_branch": column(lambda p: p.day_branch_id),
+            "year_branch": year_branch,
+            "hongluan": np.where(known, hongluan[np.where(known, year_branch, 0)], -2),
+            "tianxi": np.where(known, tianxi[np.where(known, year_branch, 0)], -2),
+            "branch_mask": column(lambda p: p.branch_mask),
+            "branch_duplicated_mask": column(lambda p: p.branch_duplicated_mask),
+            "tianyi_mask": column(lambda p: p.tianyi_mask),
+            "useful_mask": column(lambda p: p.useful_mask),
+            "useful_generates_mask": column(lambda p: p.useful_generates_mask),
+            "harmful_mask": column(lambda p: p.harmful_mask),
+            "birth_year": column(lambda p: p.birth_year),
+            "elements": np.array([p.elements for p in profiles], dtype=np.float64).reshape(count, 5),
+        }
+    
+    @staticmethod
+    def _bit(masks: np.ndarray, index: int) -> np.ndarray:
+        return (masks >> index) & 1 == 1
+    
+    @staticmethod
+    def score_columns(user: ScoringProfile, c: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+        """1.16.1.4 向量化正常算法（對應1.5.1.3，逐步驟保持相同判斷次序及閾值）"""
+        E = ProfessionalBatchScoringEngine
+        R = ProfessionalRelations
+        bit = E._bit
+        generation = ScoringProfile.GENERATION_INDEX
+        generated_by = tuple(generation.index(i) for i in range(5))
+        count = len(c["day_stem"])
+        e1 = user.elements
+        e2 = c["elements"]
+        useful2 = c["useful_mask"]
+        
+        # 第一步：結構類型（閉環互生 → 強互補 → 穩定供求 → 互毀 → 普通平衡）
+        closed_loop = np.zeros(count, dtype=bool)
+        strong = np.zeros(count, dtype=bool)
+        for u1 in user.useful:
+            u2 = generation[u1]
+            if e1[u1] > 15:
+                closed_loop |= bit(useful2, u2) & bit(c["useful_generates_mask"], u1) & (e2[:, u2] > 15)
+                strong |= bit(useful2, u1) & (e2[:, u1] > 15)
+                strong |= bit(useful2, generated_by[u1]) & (e2[:, generated_by[u1]] > 20)
+            if e1[u1] > 20:
+                strong |= bit(useful2, u2) & (e2[:, u2] > 15)
+        
+        supplied1 = sum(1 << k for k in range(5) if e1[k] > 20)
+        supplied2 = ((e2 > 20).astype(np.int64) << np.arange(5, dtype=np.int64)).sum(axis=1)
+        stable = ((useful2 & supplied1) != 0) | ((supplied2 & user.useful_mask) != 0)
+        
+        useful_count1 = len(user.useful)
+        useful_count2 = E.POPCOUNT[useful2]
+        destruction = (useful_count2 > 0) & (E.POPCOUNT[useful2 & user.harmful_mask] >= useful_count2 * 0.8)
+        if useful_count1:
+            destruction |= E.POPCOUNT[user.useful_mask & c["harmful_mask"]] >= useful_count1 * 0.8
+        
+        structure = np.select([closed_loop, strong, stable, destruction], [0, 1, 2, 3], default=4)
+        good_structure = structure <= 2
+        
+        # 第二步：結構基礎分
+        base_score = E.STRUCTURE_BASE_SCORES[structure]
+        
+        # 第三步：沖刑
+        day_clash = bit(np.int64(R.BRANCH_CLASH_MASKS[user.day_branch_id]), c["day_branch"])
+        present = user.branch_mask | c["branch_mask"]
+        duplicated = user.branch_duplicated_mask | c["branch_duplicated_mask"] | (user.branch_mask & c["branch_mask"])
+        (mask_no_grace, _), (mask_power, _), (mask_rude, _) = R.PUNISHMENT_MASKS
+        punishment = np.select(
+            [(present & mask_no_grace) == mask_no_grace, (present & mask_power) == mask_power,
+             (present & mask_rude) == mask_rude, (duplicated & R.SELF_PUNISHMENT_MASK) != 0],
+            [1, 2, 3, 4], default=0
+        )
+        has_punishment = punishment != 0
+        
+        day_harmony = (bit(np.int64(R.STEM_COMBINATION_MASKS[user.day_stem_id]), c["day_stem"])
+                       | bit(np.int64(R.BRANCH_COMBINATION_MASKS[user.day_branch_id]), c["day_branch"]))
+        complement = (user.useful_mask != 0) & (useful2 != 0) & (
+            ((user.useful_mask & useful2) | (user.useful_generates_mask & useful2)
+             | (c["useful_generates_mask"] & user.useful_mask)) != 0
+        )
+        hongluan_tianxi = ((c["year_branch"] == E._branch_id(user.hongluan_branch))
+                           | (c["year_branch"] == E._branch_id(user.tianxi_branch))
+                           | (c["hongluan"] == E._year_branch_id(user))
+                           | (c["tianxi"] == E._year_branch_id(user)))
+        tianyi = (present & (user.tianyi_mask | c["tianyi_mask"])) != 0
+        
+        can_resolve = day_harmony | (good_structure & complement) | hongluan_tianxi | tianyi
+        resolved = np.where(day_clash, -8.0, -12.0)
+        unresolved = np.select([punishment == 1, punishment == 2, day_clash], [-25.0, -20.0, -15.0], default=-10.0)
+        clash_adjustment = np.where(day_clash | has_punishment, np.where(can_resolve, resolved, unresolved), 0.0)
+        
+        # 第四步：伏吟
+        fuyin = (c["day_stem"] == user.day_stem_id) & (c["day_branch"] == user.day_branch_id)
+        fuyin_adjustment = np.where(
+            fuyin, np.select([structure <= 1, structure == 3], [-12.0, -25.0], default=-18.0), 0.0
+        )
+        
+        # 第五步：喜用神供養（A供B按候選喜用神位元累加，B供A按用戶喜用神逐個累加）
+        def strength(power):
+            return np.select([power > 35, power > 20, power > 10], [3, 2, 1], default=0)
+        
+        supply_strength = np.zeros(count, dtype=np.int64)
+        for k in range(5):
+            supply_strength += np.where(bit(useful2, k), int(strength(np.float64(e1[k]))), 0)
+        for u1 in user.useful:
+            supply_strength += strength(e2[:, u1])
+        supply_adjustment = np.select(
+            [supply_strength >= 6, supply_strength >= 3, supply_strength >= 1], [10.0, 6.0, 3.0], default=-2.0
+        )
+        
+        # 第六步：神煞
+        shen_sha_adjustment = np.where(
+            base_score >= 50,
+            np.where(hongluan_tianxi, 8.0, 0.0) + np.where(tianyi, 6.0, 0.0),
+            np.where((base_score >= 40) & hongluan_tianxi, 5.0, 0.0)
+        )
+        
+        # 第七、八步：初步分數及現實校準
+        raw_score = base_score + clash_adjustment + fuyin_adjustment + supply_adjustment + shen_sha_adjustment
+        age_gap = np.abs(user.birth_year - c["birth_year"])
+        reality_adjustment = np.select([age_gap > 20, age_gap > 15, age_gap > 10], [-10.0, -6.0, -3.0], default=0.0)
+        unclamped = raw_score + reality_adjustment
+        calibrated = np.clip(unclamped, 25.0, 95.0)
+        
+        # 數值明細旗標（對應MatchBreakdown.FLAG_*）
+        B = MatchBreakdown
+        flags = (np.where(day_clash, B.FLAG_DAY_CLASH, 0) | np.where(has_punishment, B.FLAG_THREE_PUNISHMENT, 0)
+                 | np.where(complement, B.FLAG_USEFUL_COMPLEMENT, 0) | np.where(hongluan_tianxi, B.FLAG_HONGLUAN_TIANXI, 0)
+                 | np.where(tianyi, B.FLAG_TIANYI_GUIREN, 0) | np.where(fuyin, B.FLAG_FUYIN, 0)
+                 | np.where(unclamped != calibrated, B.FLAG_CLAMPED, 0))
+        
+        return {
+            "calibrated": calibrated,
+            "structure": structure,
+            "base_score": base_score,
+            "flags": flags,
+            "clash_adjustment": clash_adjustment,
+            "fuyin_adjustment": fuyin_adjustment,
+            "supply_adjustment": supply_adjustment,
+            "shen_sha_adjustment": shen_sha_adjustment,
+            "reality_adjustment": reality_adjustment,
+        }
+    
+    @staticmethod
+    def _branch_id(branch: Optional[str]) -> int:
+        return ProfessionalRelations.BRANCH_INDEX.get(branch, -2) if branch is not None else -2
+    
+    @staticmethod
+    def _year_branch_id(profile: ScoringProfile) -> int:
+        return ProfessionalRelations.BRANCH_INDEX.get(profile.year_branch, -1)
+    
+    @staticmethod
+    def _detail(calibrated: float, structure_type: str, adjustments: Tuple[float, ...],
+                base_score: float, flags: int) -> Dict[str, Any]:
+        """1.16.1.5 單個候選的數值明細（鍵與calculate_match結果一致，不含文字細節及審計日誌）"""
+        clash, fuyin, supply, shen_sha, reality = adjustments
+        return {
+            "score": round(calibrated, 1),
+            "rating": PC.get_rating(calibrated),
+            "rating_description": PC.get_rating_description(calibrated),
+            "relationship_model": ProfessionalScoringEngine._determine_relationship_model_final(calibrated, structure_type),
+            "structure_type": structure_type,
+            "clash_adjustment": round(clash, 1),
+            "fuyin_adjustment": round(fuyin, 1),
+            "supply_adjustment": round(supply, 1),
+            "shen_sha_adjustment": round(shen_sha, 1),
+            "reality_adjustment": round(reality, 1),
+            "breakdown": MatchBreakdown(
+                structure_type, base_score, clash, fuyin, supply, shen_sha, reality, calibrated, flags
+            ).to_list(),
+        }
+    
+    @staticmethod
+    def score_many(user_bazi: Dict[str, Any], candidates: Sequence[Dict[str, Any]],
+                   user_gender: str = "未知", candidate_genders: Union[str, Sequence[str], None] = None,
+                   details: bool = False) -> Dict[str, Any]:
+        """1.16.1.6 一對多評分：返回{"scores": float64陣列, "details": 每個候選的數值明細或None}"""
+        E = ProfessionalBatchScoringEngine
+        count = len(candidates)
+        if candidate_genders is None or isinstance(candidate_genders, str):
+            candidate_genders = [candidate_genders or "未知"] * count
+        
+        try:
+            user = ScoringProfile.of(user_bazi)
+            profiles = [ScoringProfile.of(candidate) for candidate in candidates]
+            
+            # 特殊案例（整欄打包鍵查登記表）及不完整特徵檔逐個回退單筆評分
+            special = np.zeros(count, dtype=bool)
+            if user.special_prefix >= 0 and count:
+                year_index = np.fromiter((p.year_index for p in profiles), dtype=np.int64, count=count)
+                keys = user.special_prefix * ProfessionalRelations.PILLAR_COUNT + year_index
+                special = np.isin(keys, ProfessionalScoringEngine.SPECIAL_CASE_KEYS) & (year_index >= 0)
+            fallback = [i for i, profile in enumerate(profiles) if special[i] or not E._is_regular(profile)]
+            if not E._is_regular(user):
+                fallback = list(range(count))
+            fallback_set = set(fallback)
+            vector_index = [i for i in range(count) if i not in fallback_set]
+            
+            scores = np.empty(count, dtype=np.float64)
+            detail_list: Optional[List[Optional[Dict[str, Any]]]] = [None] * count if details else None
+            
+            if vector_index:
+                columns = E._profile_columns([profiles[i] for i in vector_index])
+                result = E.score_columns(user, columns)
+                scores[vector_index] = np.round(result["calibrated"], 1)
+                if details:
+                    adjustments = np.stack([result[key] for key in E.ADJUSTMENT_KEYS], axis=1).tolist()
+                    base_scores = result["base_score"].tolist()
+                    flags = result["flags"].tolist()
+                    for row, i in enumerate(vector_index):
+                        detail_list[i] = E._detail(
+                            float(result["calibrated"][row]), E.STRUCTURE_TYPES[result["structure"][row]],
+                            tuple(adjustments[row]), base_scores[row], flags[row]
+                        )
+            
+            for i in fallback:
+                match = ProfessionalScoringEngine.calculate_match_score_pro(
+                    user_bazi, candidates[i], user_gender, candidate_genders[i], audit_level=PC.AUDIT_OFF,
+                    detail=PC.DETAIL_FULL if details else PC.DETAIL_SCORE
+                )
+                scores[i] = match["score"]
+                if details:
+                    detail_list[i] = {key: match[key] for key in E.DETAIL_KEYS}
+            
+            return {"scores": scores, "details": detail_list}
+        
+        except MatchScoringError:
+            raise
+        except Exception as e:
+            logger.error(f"一對多配對評分錯誤: {e}", exc_info=True)
+            raise MatchScoringError(f"一對多配對評分失敗: {str(e)}")
+
+# 模組載入時生成紅鸞天喜索引表
+ProfessionalBatchScoringEngine.build()
+# 🔖 1.16 一對多批量配對評分結束
+
+# 🔖 1.17 配對分數上界開始
+class ProfessionalScoreBound:
+    """
+    1.17.1 配對分數上界 - 只憑候選的部分資料（年柱、年月柱、四柱+五行等）估算可達到的最高分
+    正常算法是結構基礎分加上有界的沖刑、伏吟、供養、神煞、現實校準後限制於25-95，
+    未知部分一律按最有利情況取值，保證上界不低於真實分數（可採納上界），用於剪枝淘汰不可能入選的候選
+    """
+    
+    PILLAR_KEYS = ('year_pillar', 'month_pillar', 'day_pillar', 'hour_pillar')
+    FULL_KEYS = PILLAR_KEYS + ('elements', 'useful_elements', 'harmful_elements', 'birth_year', 'day_stem')
+    SPECIAL_CASE_MAX = 0.0  # 特殊案例最高固定分（模組載入時生成）
+    
+    @staticmethod
+    def build() -> None:
+        """1.17.1.1 由特殊案例登記表生成最高固定分（年柱未知時特殊案例無法排除）"""
+        ProfessionalScoreBound.SPECIAL_CASE_MAX = max(
+            (round(score, 1) for score, _, _ in ProfessionalScoringEngine.SPECIAL_CASES_BY_ID.values()),
+            default=0.0
+        )
+    
+    @staticmethod
+    def _supply_tier(power: float) -> int:
+        """1.17.1.2 單個喜用神的供養強度（與_handle_supply_normal閾值一致）"""
+        if power > 35:
+            return 3
+        if power > 20:
+            return 2
+        if power > 10:
+            return 1
+        return 0
+    
+    @staticmethod
+    def upper_bound_score(user_bazi: Dict[str, Any], partial: Dict[str, Any]) -> float:
+        """1.17.1.3 用戶完整八字對候選部分資料的分數上界；候選資料齊全時返回真實分數"""
+        B = ProfessionalScoreBound
+        R = ProfessionalRelations
+        
+        # 資料齊全：直接計算真實分數
+        if all(partial.get(key) for key in B.PILLAR_KEYS) and all(key in partial for key in B.FULL_KEYS):
+            return ProfessionalScoringEngine.calculate_match_score_pro(
+                user_bazi, partial, "未知", "未知", audit_level=PC.AUDIT_OFF, detail=PC.DETAIL_SCORE
+            )["score"]
+        
+        # 特殊案例只取決於候選年柱：年柱已知時可確定，未知時取特殊案例最高分
+        year_pillar = partial.get('year_pillar', '')
+        if year_pillar:
+            case_id = ProfessionalScoringEngine.SPECIAL_CASES.get(ProfessionalScoringEngine.special_case_key(
+                ScoringProfile.of(user_bazi).special_prefix, ProfessionalRelations.pillar_index(year_pillar)
+            ), "")
+            if case_id:
+                return ProfessionalScoringEngine._calculate_all_special_case_score(
+                    user_bazi, partial, case_id, None, PC.AUDIT_OFF, PC.DETAIL_SCORE
+                )["score"]
+            special_bound = 0.0
+        else:
+            special_bound = B.SPECIAL_CASE_MAX
+        
+        user = ScoringProfile.of(user_bazi)
+        generation = ScoringProfile.GENERATION_INDEX
+        element_index = ScoringProfile.ELEMENT_INDEX
+        e1 = user.elements
+        
+        # 候選已知部分：五行、喜用神、地支、日柱
+        elements = partial.get('elements')
+        e2 = tuple(elements.get(name, 0) for name in ScoringProfile.ELEMENT_NAMES) if elements is not None else None
+        useful2 = None
+        generates2 = 0
+        if 'useful_elements' in partial:
+            useful2 = 0
+            for e in partial['useful_elements']:
+                if e in element_index:
+                    useful2 |= 1 << element_index[e]
+                    generates2 |= 1 << generation[element_index[e]]
+        
+        def may_use(element: int) -> bool:
+            return useful2 is None or (useful2 >> element) & 1 == 1
+        
+        def may_exceed(element: int, threshold: float) -> bool:
+            return e2 is None or e2[element] > threshold
+        
+        known_pillars = [partial.get(key, '') for key in B.PILLAR_KEYS]
+        all_pillars_known = all(len(p) >= 2 for p in known_pillars)
+        present2, duplicated2 = R.branch_masks([p[1] for p in known_pillars if len(p) >= 2])
+        day_pillar = known_pillars[2]
+        day_stem = day_pillar[0] if len(day_pillar) >= 2 else None
+        day_branch = day_pillar[1] if len(day_pillar) >= 2 else None
+        
+        # 第一步：可能出現的結構類型（判斷次序無關，取所有可能者的最高分）
+        structures = {"normal_balance", "mutual_destruction"}
+        for u1 in user.useful:
+            u2 = generation[u1]
+            source = generation.index(u1)
+            if e1[u1] > 15:
+                if may_use(u2) and (useful2 is None or (generates2 >> u1) & 1) and may_exceed(u2, 15):
+                    structures.add("closed_loop")
+                if (may_use(u1) and may_exceed(u1, 15)) or (may_use(source) and may_exceed(source, 20)):
+                    structures.add("strong_complement")
+            if e1[u1] > 20 and may_use(u2) and may_exceed(u2, 15):
+                structures.add("strong_complement")
+            if may_exceed(u1, 20):
+                structures.add("stable_supply")
+        if any(e1[k] > 20 and may_use(k) for k in range(5)):
+            structures.add("stable_supply")
+        
+        # 第三步：沖刑（已知地支已構成三刑或日支六沖才必然扣分，否則最佳為0）
+        day_clash_certain = day_branch is not None and R.is_branch_clash(user.day_branch, day_branch)
+        day_clash_possible = day_branch is None or day_clash_certain
+        present = user.branch_mask | present2
+        duplicated = user.branch_duplicated_mask | duplicated2 | (user.branch_mask & present2)
+        punishment_certain = R.punishment_type_from_masks(present, duplicated) is not None
+        if day_clash_certain or punishment_certain:
+            clash_best = -8.0 if day_clash_possible else -10.0
+        else:
+            clash_best = 0.0
+        
+        # 第四步：伏吟（日柱已知且與用戶相同才必然扣分）
+        fuyin_certain = (day_stem is not None and day_stem == user.day_stem and day_branch == user.day_branch)
+        
+        # 第五步：供養強度上界（候選喜用神未知時按五行全為喜用神計）
+        supply_strength = sum(B._supply_tier(e1[k]) for k in range(5) if may_use(k))
+        supply_strength += sum(B._supply_tier(e2[u1]) if e2 is not None else 3 for u1 in user.useful)
+        if supply_strength >= 6:
+            supply_best = 10.0
+        elif supply_strength >= 3:
+            supply_best = 6.0
+        elif supply_strength >= 1:
+            supply_best = 3.0
+        else:
+            supply_best = -2.0
+        
+        # 第六步：神煞（年支已知時紅鸞天喜可確定；天乙貴人需四柱及日干齊全才可確定）
+        if len(year_pillar) >= 2:
+            year_branch = year_pillar[1]
+            hongluan_tianxi = (
+                user.hongluan_branch == year_branch or user.tianxi_branch == year_branch or
+                ProfessionalBaziCalculator.HONG_LUAN_MAP.get(year_branch) == user.year_branch or
+                ProfessionalBaziCalculator.TIAN_XI_MAP.get(year_branch) == user.year_branch
+            )
+        else:
+            hongluan_tianxi = True
+        if all_pillars_known and 'day_stem' in partial:
+            tianyi_mask2 = R.branch_masks(ProfessionalBaziCalculator.TIANYI_GUI_REN.get(partial['day_stem'], []))[0]
+            tianyi = bool(present & (user.tianyi_mask | tianyi_mask2))
+        else:
+            tianyi = True
+        
+        # 第八步：現實校準（出生年已知時可確定）
+        reality_best = 0.0
+        if isinstance(partial.get('birth_year'), int):
+            age_gap = abs(user.birth_year - partial['birth_year'])
+            if age_gap > 20:
+                reality_best = -10.0
+            elif age_gap > 15:
+                reality_best = -6.0
+            elif age_gap > 10:
+                reality_best = -3.0
+        
+        best = None
+        for structure_type in structures:
+            base_score = {"closed_loop": 85.0, "strong_complement": 72.0, "stable_supply": 68.0,
+                          "normal_balance": 58.0, "mutual_destruction": 40.0}[structure_type]
+            if fuyin_certain:
+                if structure_type in ("closed_loop", "strong_complement"):
+                    fuyin = -12.0
+                elif structure_type in ("stable_supply", "normal_balance"):
+                    fuyin = -18.0
+                else:
+                    fuyin = -25.0
+            else:
+                fuyin = 0.0
+            if base_score >= 50:
+                shen_sha = (8.0 if hongluan_tianxi else 0.0) + (6.0 if tianyi else 0.0)
+            else:
+                shen_sha = 5.0 if hongluan_tianxi else 0.0
+            total = base_score + clash_best + fuyin + supply_best + shen_sha
+            best = total if best is None else max(best, total)
+        
+        bound = max(25.0, min(95.0, best + reality_best))
+        return max(bound, special_bound)
+
+# 模組載入時生成特殊案例最高固定分
+ProfessionalScoreBound.build()
+# 🔖 1.17 配對分數上界結束
+
+# 🔖 1.18 配對結果緩存開始
+class ProfessionalMatchCache:
+    """
+    1.18.1 配對結果LRU緩存 - 以雙方評分簽名（ScoringProfile.signature，有序）為鍵，容量上限及存活時間(TTL)
+    不同出生資料只要評分讀取的欄位相同（同四柱同年份等）即共用同一結果；存入及取出均複製，調用方修改不污染緩存
+    """
+    
+    _entries: "OrderedDict[Tuple, Tuple[Dict[str, Any], float]]" = OrderedDict()
+    _lock = threading.Lock()
+    _enabled: bool = PC.MATCH_CACHE_ENABLED
+    _max_size: int = PC.MATCH_CACHE_MAX_SIZE
+    _ttl_seconds: float = PC.MATCH_CACHE_TTL_SECONDS
+    _hits: int = 0
+    _misses: int = 0
+    _evictions: int = 0
+    _expirations: int = 0
+    
+    @staticmethod
+    def configure(enabled: Optional[bool] = None, max_size: Optional[int] = None,
+                  ttl_seconds: Optional[float] = None) -> None:
+        """1.18.1.1 開關緩存、調整容量或存活時間（縮小容量時即時淘汰最舊記錄）"""
+        cls = ProfessionalMatchCache
+        with cls._lock:
+            if enabled is not None:
+                cls._enabled = bool(enabled)
+            if max_size is not None:
+                cls._max_size = max(1, int(max_size))
+            if ttl_seconds is not None:
+                cls._ttl_seconds = max(0.0, float(ttl_seconds))
+            cls._evict_overflow()
+            if not cls._enabled:
+                cls._entries.clear()
+    
+    @staticmethod
+    def is_enabled() -> bool:
+        """1.18.1.2 緩存是否啟用"""
+        return ProfessionalMatchCache._enabled
+    
+    @staticmethod
+    def clear() -> None:
+        """1.18.1.3 清空緩存記錄（統計數字保留）"""
+        with ProfessionalMatchCache._lock:
+            ProfessionalMatchCache._entries.clear()
+    
+    @staticmethod
+    def _evict_overflow() -> None:
+        """1.18.1.4 淘汰超出容量的最久未使用記錄（調用方須持有鎖）"""
+        cls = ProfessionalMatchCache
+        while len(cls._entries) > cls._max_size:
+            cls._entries.popitem(last=False)
+            cls._evictions += 1
+    
+    @staticmethod
+    def _copy_result(result: Dict[str, Any]) -> Dict[str, Any]:
+        """1.18.1.5 複製配對結果（值為數字、字串或字串列表，一層列表複製即完整隔離）"""
+        return {key: (value.copy() if isinstance(value, list) else value) for key, value in result.items()}
+    
+    @staticmethod
+    def get_or_calculate(key: Tuple, calculate: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+        """1.18.1.6 命中且未過期則返回緩存副本；否則計算、存入並返回（計算失敗不緩存）"""
+        cls = ProfessionalMatchCache
+        if not cls._enabled:
+            return calculate()
+        
+        now = time.monotonic()
+        with cls._lock:
+            entry = cls._entries.get(key)
+            if entry is not None:
+                if entry[1] > now:
+                    cls._entries.move_to_end(key)
+                    cls._hits += 1
+                    return cls._copy_result(entry[0])
+                del cls._entries[key]
+                cls._expirations += 1
+            cls._misses += 1
+        
+        result = calculate()
+        stored = cls._copy_result(result)
+        
+        with cls._lock:
+            if cls._enabled:
+                cls._entries[key] = (stored, now + cls._ttl_seconds)
+                cls._entries.move_to_end(key)
+                cls._evict_overflow()
+        return result
+    
+    @staticmethod
+    def stats() -> Dict[str, Any]:
+        """1.18.1.7 緩存統計：命中、未命中、淘汰、過期、命中率、記錄數、存活時間"""
+        cls = ProfessionalMatchCache
+        with cls._lock:
+            lookups = cls._hits + cls._misses
+            return {
+                'enabled': cls._enabled,
+                'size': len(cls._entries),
+                'max_size': cls._max_size,
+                'ttl_seconds': cls._ttl_seconds,
+                'hits': cls._hits,
+                'misses': cls._misses,
+                'evictions': cls._evictions,
+                'expirations': cls._expirations,
+                'hit_rate': round(cls._hits * 100 / lookups, 1) if lookups else 0.0,
+            }
+    
+    @staticmethod
+    def reset_stats() -> None:
+        """1.18.1.8 統計數字歸零"""
+        cls = ProfessionalMatchCache
+        with cls._lock:
+            cls._hits = cls._misses = cls._evictions = cls._expirations = 0
+# 🔖 1.18 配對結果緩存結束
+
+# 🔖 1.19 配對數值明細開始
+class MatchBreakdown:
+    """
+    1.19.1 配對數值明細 - 結構編號、基礎分、沖刑、伏吟、供養、神煞、現實校準、最終分數及特徵旗標
+    固定長度記錄：to_list()為9個數字（JSON存儲），pack()為16位元組（分數以0.1分整數保存）；
+    評級、關係模型及說明文字由此按需推導（見ProfessionalFormatters.format_score_breakdown）
+    """
+    
+    __slots__ = ('structure_id', 'base', 'clash', 'fuyin', 'supply', 'shen_sha', 'reality', 'score', 'flags')
+    
+    # 前5種與1.16批量評分的結構索引相同；未知結構為UNKNOWN_STRUCTURE
+    STRUCTURE_TYPES = (
+        "closed_loop", "strong_complement", "stable_supply", "mutual_destruction", "normal_balance",
+        "barely_coexistence", "cong_supported", "wang_supported", "fuyin_disaster",
+    )
+    STRUCTURE_INDEX = {name: i for i, name in enumerate(STRUCTURE_TYPES)}
+    UNKNOWN_STRUCTURE = 255
+    
+    FLAG_SPECIAL_CASE = 1 << 0       # 特殊案例固定分
+    FLAG_CLAMPED = 1 << 1            # 分數已限制於25-95
+    FLAG_DAY_CLASH = 1 << 2          # 日支六沖
+    FLAG_THREE_PUNISHMENT = 1 << 3   # 三刑
+    FLAG_USEFUL_COMPLEMENT = 1 << 4  # 喜用神互補
+    FLAG_HONGLUAN_TIANXI = 1 << 5    # 紅鸞天喜
+    FLAG_TIANYI_GUIREN = 1 << 6      # 天乙貴人
+    FLAG_FUYIN = 1 << 7              # 日柱伏吟
+    
+    PACKED = struct.Struct('<BB7h')  # 結構編號、旗標、7個分數（0.1分整數）
+    
+    def __init__(self, structure_type: str, base: float, clash: float, fuyin: float, supply: float,
+                 shen_sha: float, reality: float, score: float, flags: int = 0):
+        """1.19.1.1 各分數保留一位小數（與配對結果欄位捨入一致）"""
+        self.structure_id = MatchBreakdown.STRUCTURE_INDEX.get(structure_type, MatchBreakdown.UNKNOWN_STRUCTURE)
+        self.base = round(base, 1)
+        self.clash = round(clash, 1)
+        self.fuyin = round(fuyin, 1)
+        self.supply = round(supply, 1)
+        self.shen_sha = round(shen_sha, 1)
+        self.reality = round(reality, 1)
+        self.score = round(score, 1)
+        self.flags = int(flags)
+    
+    @staticmethod
+    def feature_flags(features: Dict, fuyin: bool, clamped: bool) -> int:
+        """1.19.1.2 由配對特徵（1.5 _combine_profiles）生成旗標"""
+        B = MatchBreakdown
+        return (
+            (B.FLAG_DAY_CLASH if features.get('has_day_clash') else 0)
+            | (B.FLAG_THREE_PUNISHMENT if features.get('has_three_punishment') else 0)
+            | (B.FLAG_USEFUL_COMPLEMENT if features.get('has_useful_complement') else 0)
+            | (B.FLAG_HONGLUAN_TIANXI if features.get('has_hongluan_tianxi') else 0)
+            | (B.FLAG_TIANYI_GUIREN if features.get('has_tianyi_guiren') else 0)
+            | (B.FLAG_FUYIN if fuyin else 0)
+            | (B.FLAG_CLAMPED if clamped else 0)
+        )
+    
+    @property
+    def structure_type(self) -> str:
+        """1.19.1.3 結構類型名稱"""
+        if self.structure_id < len(MatchBreakdown.STRUCTURE_TYPES):
+            return MatchBreakdown.STRUCTURE_TYPES[self.structure_id]
+        return "unknown"
+    
+    @property
+    def rating(self) -> str:
+        """1.19.1.4 評級（由分數推導）"""
+        return PC.get_rating(self.score)
+    
+    @property
+    def relationship_model(self) -> str:
+        """1.19.1.5 關係模型（由分數及結構類型推導）"""
+        return ProfessionalScoringEngine._determine_relationship_model_final(self.score, self.structure_type)
+    
+    def has(self, flag: int) -> bool:
+        """1.19.1.6 是否帶有某旗標"""
+        return bool(self.flags & flag)
+    
+    def to_list(self) -> List[float]:
+        """1.19.1.7 固定9個數字：[結構編號, 旗標, 基礎分, 沖刑, 伏吟, 供養, 神煞, 現實校準, 最終分數]"""
+        return [self.structure_id, self.flags, self.base, self.clash, self.fuyin, self.supply,
+                self.shen_sha, self.reality, self.score]
+    
+    @staticmethod
+    def from_list(values: Sequence[float]) -> "MatchBreakdown":
+        """1.19.1.8 由to_list()的9個數字還原"""
+        structure_id, flags, base, clash, fuyin, supply, shen_sha, reality, score = values
+        breakdown = MatchBreakdown("", base, clash, fuyin, supply, shen_sha, reality, score, flags)
+        breakdown.structure_id = int(structure_id)
+        return breakdown
+    
+    def pack(self) -> bytes:
+        """1.19.1.9 打包為16位元組"""
+        return MatchBreakdown.PACKED.pack(
+            self.structure_id, self.flags,
+            *(int(round(value * 10)) for value in
+              (self.base, self.clash, self.fuyin, self.supply, self.shen_sha, self.reality, self.score))
+        )
+    
+    @staticmethod
+    def unpack(data: bytes) -> "MatchBreakdown":
+        """1.19.1.10 由pack()的16位元組還原"""
+        structure_id, flags, *values = MatchBreakdown.PACKED.unpack(data)
+        return MatchBreakdown.from_list([structure_id, flags] + [value / 10 for value in values])
+    
+    @staticmethod
+    def from_result(match_result: Dict[str, Any]) -> "MatchBreakdown":
+        """
+        1.19.1.11 由配對結果取出數值明細；舊版結果（無breakdown欄位，如資料庫內的完整結果JSON）
+        由各調整分數重建，基礎分為最終分數減各項調整，旗標未知為0
+        """
+        values = match_result.get('breakdown')
+        if values:
+            return MatchBreakdown.from_list(values)
+        score = match_result.get('score', 0) or 0
+        adjustments = [match_result.get(key, 0) or 0 for key in ProfessionalBatchScoringEngine.ADJUSTMENT_KEYS]
+        return MatchBreakdown(match_result.get('structure_type', ''), score - sum(adjustments), *adjustments, score)
+    
+    @staticmethod
+    def from_stored(text: Optional[str]) -> Optional["MatchBreakdown"]:
+        """1.19.1.12 由資料庫match_details還原：新格式為to_list()的JSON，舊格式為完整配對結果JSON；無法解析返回None"""
+        if not text:
+            return None
+        try:
+            data = json.loads(text)
+            if isinstance(data, dict):
+                return MatchBreakdown.from_result(data)
+            return MatchBreakdown.from_list(data)
+        except (ValueError, TypeError):
+            return None
+    
+    def serialize(self) -> str:
+        """1.19.1.13 存入資料庫match_details的緊湊JSON"""
+        return json.dumps(self.to_list(), separators=(',', ':'))
+    
+    def __repr__(self) -> str:
+        return f"MatchBreakdown({self.structure_type}, {self.score}, flags={self.flags})"
+# 🔖 1.19 配對數值明細結束
+
+# 🔖 1.20 精英八字庫開始
+class ProfessionalEliteLibrary:
+    """
+    1.20.1 精英八字庫 - PC.ELITE_START_YEAR至PC.ELITE_END_YEAR每日×十二時辰八字的評分欄位預計算表
+    功能：離線build()一次過排盤分析全部八字，每欄存為一個.npy文件（欄式），之後以mmap唯讀載入；
+    年份偏移索引把年份範圍換成行區間，搜尋時切片即得候選欄位，請求時不解析、不排盤
+    行次序：出生年 → 月 → 日 → 時辰（與SoulmateFinder窮舉次序一致，行號即同分排序次序）
+    評分欄位（五行、身強弱、喜忌、地支遮罩）與性別無關，性別相關的夫妻星狀態按男女各存一欄
+    """
+    
+    VERSION = 1
+    MANIFEST = "manifest.json"
+    COLUMNS = {
+        "birth_year": np.int16,
+        "birth_month": np.int8,
+        "birth_day": np.int8,
+        "birth_hour": np.int8,
+        "hour_confidence": np.int8,         # 校正後時辰信心度索引（CONFIDENCES）
+        "stems": np.int8,                   # N×4 年月日時天干索引
+        "branches": np.int8,                # N×4 年月日時地支索引
+        "elements": np.float64,             # N×5 五行分佈（木火土金水），與排盤結果逐位一致
+        "strength_score": np.float64,
+        "useful": np.int8,                  # N×5 喜用神五行索引（按原次序，不足補-1）
+        "useful_mask": np.int8,
+        "harmful_mask": np.int8,
+        "branch_mask": np.int16,
+        "branch_duplicated_mask": np.int16,
+        "tianyi_mask": np.int16,
+        "spouse_male": np.int8,             # 作為男方的夫妻星狀態索引（SPOUSE_STATUSES，-1為不明）
+        "spouse_female": np.int8,           # 作為女方的夫妻星狀態索引
+        "quality": np.float32,              # 八字本身質量分（神煞加分）
+    }
+    SPOUSE_STATUSES = ("無夫妻星", "夫妻星單一", "夫妻星明顯", "夫妻星旺盛")
+    CONFIDENCES = ("高", "中", "低", "估算")
+    
+    _columns: Optional[Dict[str, np.ndarray]] = None
+    _year_offsets: Optional[np.ndarray] = None
+    _start_year: int = 0
+    _loaded: bool = False
+    _missing_logged: bool = False
+    _build_thread: Optional[threading.Thread] = None
+    _lock = threading.Lock()
+    
+    @staticmethod
+    def _year_rows(year: int) -> Dict[str, np.ndarray]:
+        """1.20.1.1 排盤分析一年全部日期×時辰，返回該年各欄"""
+        L = ProfessionalEliteLibrary
+        hours = PC.ELITE_HOURS
+        dates = [datetime.fromordinal(ordinal) for ordinal in
+                 range(datetime(year, 1, 1).toordinal(), datetime(year, 12, 31).toordinal() + 1)]
+        months = [d.month for d in dates for _ in hours]
+        days = [d.day for d in dates for _ in hours]
+        columns = ProfessionalBatchCalculator.calculate_batch(
+            [year] * len(months), months, days, [hour for _ in dates for hour in hours],
+            genders='男', confidences='高'
+        )
+        charts = ProfessionalBatchCalculator.to_dicts(columns, analysis=PC.ANALYSIS_SCORING, dedupe=True)
+        
+        spouse_index = {status: i for i, status in enumerate(L.SPOUSE_STATUSES)}
+        confidence_index = {confidence: i for i, confidence in enumerate(L.CONFIDENCES)}
+        values: Dict[str, list] = {name: [] for name in L.COLUMNS}
+        for chart in charts:
+            profile = ScoringProfile(chart)
+            values["hour_confidence"].append(confidence_index[chart["hour_confidence"]])
+            values["elements"].append(profile.elements)
+            values["strength_score"].append(chart["strength_score"])
+            values["useful"].append(profile.useful + (-1,) * (5 - len(profile.useful)))
+            values["useful_mask"].append(profile.useful_mask)
+            values["harmful_mask"].append(profile.harmful_mask)
+            values["branch_mask"].append(profile.branch_mask)
+            values["branch_duplicated_mask"].append(profile.branch_duplicated_mask)
+            values["tianyi_mask"].append(profile.tianyi_mask)
+            for name, gender in (("spouse_male", '男'), ("spouse_female", '女')):
+                status, _ = ProfessionalBaziCalculator._analyze_spouse_star_pro(chart, gender)
+                values[name].append(spouse_index.get(status, -1))
+            values["quality"].append(ProfessionalBaziCalculator._calculate_shen_sha_enhanced(chart)[1])
+        
+        values["birth_year"] = columns["birth_year"]
+        values["birth_month"] = columns["birth_month"]
+        values["birth_day"] = columns["birth_day"]
+        values["birth_hour"] = columns["birth_hour"]
+        values["stems"] = columns["stems"]
+        values["branches"] = columns["branches"]
+        return {name: np.asarray(values[name], dtype=dtype) for name, dtype in L.COLUMNS.items()}
+    
+    @staticmethod
+    def build(path: Optional[str] = None) -> int:
+        """1.20.1.2 生成精英庫並原子寫入欄式文件目錄（1925-2025約44萬個八字，約1-2分鐘，只需執行一次）；返回八字數"""
+        L = ProfessionalEliteLibrary
+        path = path or PC.ELITE_LIBRARY_PATH
+        years = range(PC.ELITE_START_YEAR, PC.ELITE_END_YEAR + 1)
+        
+        parts: Dict[str, List[np.ndarray]] = {name: [] for name in L.COLUMNS}
+        year_offsets = [0]
+        for year in years:
+            rows = L._year_rows(year)
+            for name in L.COLUMNS:
+                parts[name].append(rows[name])
+            year_offsets.append(year_offsets[-1] + len(rows["birth_year"]))
+        
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(tmp_path, exist_ok=True)
+            for name in L.COLUMNS:
+                np.save(os.path.join(tmp_path, f"{name}.npy"), np.concatenate(parts[name]))
+            np.save(os.path.join(tmp_path, "year_offsets.npy"), np.asarray(year_offsets, dtype=np.int64))
+            with open(os.path.join(tmp_path, L.MANIFEST), 'w', encoding='utf-8') as f:
+                json.dump({
+                    "version": L.VERSION,
+                    "start_year": PC.ELITE_START_YEAR,
+                    "end_year": PC.ELITE_END_YEAR,
+                    "hours": list(PC.ELITE_HOURS),
+                    "count": year_offsets[-1],
+                }, f)
+            if os.path.isdir(path):
+                shutil.rmtree(path)
+            os.replace(tmp_path, path)
+        except OSError:
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            raise
+        
+        L.reload()
+        logger.info(f"精英八字庫已生成: {path} ({year_offsets[-1]}個八字)")
+        return year_offsets[-1]
+    
+    @staticmethod
+    def reload() -> None:
+        """1.20.1.3 丟棄已載入的欄位，下次使用時重新載入（build()後調用）"""
+        L = ProfessionalEliteLibrary
+        with L._lock:
+            L._columns = None
+            L._year_offsets = None
+            L._loaded = False
+    
+    @staticmethod
+    def _ensure_loaded() -> Optional[Dict[str, np.ndarray]]:
+        """1.20.1.4 以mmap唯讀載入各欄；目錄不存在或規格不符時返回None（需先執行build()）"""
+        L = ProfessionalEliteLibrary
+        if L._loaded:
+            return L._columns
+        
+        with L._lock:
+            if L._loaded:
+                return L._columns
+            
+            path = PC.ELITE_LIBRARY_PATH
+            columns = None
+            try:
+                manifest_path = os.path.join(path, L.MANIFEST)
+                if os.path.exists(manifest_path):
+                    with open(manifest_path, encoding='utf-8') as f:
+                        manifest = json.load(f)
+                    if manifest.get("version") != L.VERSION or tuple(manifest.get("hours", ())) != PC.ELITE_HOURS:
+                        logger.warning(f"精英八字庫規格不符，需重新生成: {path}")
+                    else:
+                        columns = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode='r')
+                                   for name in L.COLUMNS}
+                        L._year_offsets = np.load(os.path.join(path, "year_offsets.npy"))
+                        L._start_year = manifest["start_year"]
+                else:
+                    # 目錄不存在不作緩存：後台生成或其他進程生成完成後，下次使用即可載入
+                    if not L._missing_logged:
+                        L._missing_logged = True
+                        logger.warning(f"精英八字庫不存在（{path}），生成前搜尋改為即時排盤")
+                    return None
+            except Exception as e:
+                logger.error(f"精英八字庫載入失敗，搜尋改為即時排盤: {e}", exc_info=True)
+                columns = None
+            
+            L._columns = columns
+            L._loaded = True
+            return columns
+    
+    @staticmethod
+    def is_available() -> bool:
+        """1.20.1.5 精英庫是否已生成並可載入"""
+        return ProfessionalEliteLibrary._ensure_loaded() is not None
+    
+    @staticmethod
+    def build_in_background() -> bool:
+        """
+        1.20.1.5.1 精英庫不存在時以後台執行緒生成（約1-2分鐘），生成期間搜尋照常即時排盤；
+        PC.ELITE_AUTO_BUILD關閉、已可載入或正在生成時不啟動，返回是否已啟動
+        """
+        L = ProfessionalEliteLibrary
+        if L.is_available():
+            return False
+        if not PC.ELITE_AUTO_BUILD:
+            logger.warning("精英八字庫不存在且未開啟自動生成（BAZI_ELITE_AUTO_BUILD），"
+                           "請執行 python new_calculator.py elite-build")
+            return False
+        
+        def run() -> None:
+            started = time.monotonic()
+            try:
+                count = L.build()
+                logger.info(f"精英八字庫後台生成完成: {count}個八字，耗時{time.monotonic() - started:.1f}秒")
+            except Exception as e:
+                logger.error(f"精英八字庫後台生成失敗，搜尋繼續即時排盤: {e}", exc_info=True)
+        
+        with L._lock:
+            if L._build_thread is not None and L._build_thread.is_alive():
+                return False
+            L._build_thread = threading.Thread(target=run, name="elite-library-build", daemon=True)
+            L._build_thread.start()
+        logger.warning(f"精英八字庫不存在，已開始後台生成: {PC.ELITE_LIBRARY_PATH}")
+        return True
+    
+    @staticmethod
+    def row_range(start_year: int, end_year: int) -> Optional[Tuple[int, int]]:
+        """1.20.1.6 年份範圍（含首尾）→ 行區間[起, 止)；未載入或範圍未完全覆蓋時返回None"""
+        L = ProfessionalEliteLibrary
+        if L._ensure_loaded() is None:
+            return None
+        first = start_year - L._start_year
+        last = end_year - L._start_year + 1
+        if first < 0 or first >= last or last >= len(L._year_offsets):
+            return None
+        return int(L._year_offsets[first]), int(L._year_offsets[last])
+    
+    @staticmethod
+    def year_slice(start_year: int, end_year: int) -> Optional[Dict[str, np.ndarray]]:
+        """1.20.1.7 年份範圍內各欄切片（mmap視圖，不複製）；未載入或範圍未完全覆蓋時返回None"""
+        bounds = ProfessionalEliteLibrary.row_range(start_year, end_year)
+        if bounds is None:
+            return None
+        first, last = bounds
+        return {name: column[first:last] for name, column in ProfessionalEliteLibrary._columns.items()}
+    
+    @staticmethod
+    def scoring_columns(rows: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+        """1.20.1.8 切片 → ProfessionalBatchScoringEngine.score_columns所需欄位（只做整數查表）"""
+        E = ProfessionalBatchScoringEngine
+        generates = np.zeros(32, dtype=np.int64)
+        for mask in range(32):
+            for k in range(5):
+                if mask >> k & 1:
+                    generates[mask] |= 1 << ScoringProfile.GENERATION_INDEX[k]
+        
+        year_branch = rows["branches"][:, 0].astype(np.int64)
+        useful_mask = rows["useful_mask"].astype(np.int64)
+        return {
+            "day_stem": rows["stems"][:, 2].astype(np.int64),
+            "day_branch": rows["branches"][:, 2].astype(np.int64),
+            "year_branch": year_branch,
+            "hongluan": np.asarray(E.HONG_LUAN_INDEX, dtype=np.int64)[year_branch],
+            "tianxi": np.asarray(E.TIAN_XI_INDEX, dtype=np.int64)[year_branch],
+            "branch_mask": rows["branch_mask"].astype(np.int64),
+            "branch_duplicated_mask": rows["branch_duplicated_mask"].astype(np.int64),
+            "tianyi_mask": rows["tianyi_mask"].astype(np.int64),
+            "useful_mask": useful_mask,
+            "useful_generates_mask": generates[useful_mask],
+            "harmful_mask": rows["harmful_mask"].astype(np.int64),
+            "birth_year": rows["birth_year"].astype(np.int64),
+            "elements": np.asarray(rows["elements"], dtype=np.float64),
+        }
+    
+    @staticmethod
+    def score_rows(user_bazi: Dict[str, Any], rows: Dict[str, np.ndarray]) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """
+        1.20.1.9 用戶對切片內全部八字向量化評分：返回(配對分數, 特殊案例遮罩)
+        分數與calculate_match一致（一位小數）；特殊案例行的分數無效，須由調用方排盤後逐個評分
+        用戶特徵檔不完整（無法走向量化路徑）時返回None
+        """
+        E = ProfessionalBatchScoringEngine
+        R = ProfessionalRelations
+        user = ScoringProfile.of(user_bazi)
+        if not E._is_regular(user):
+            return None
+        
+        count = len(rows["birth_year"])
+        special = np.zeros(count, dtype=bool)
+        if user.special_prefix >= 0 and count:
+            year_index = rows["stems"][:, 0].astype(np.int64) * 12 + rows["branches"][:, 0]
+            keys = user.special_prefix * R.PILLAR_COUNT + year_index
+            special = np.isin(keys, ProfessionalScoringEngine.SPECIAL_CASE_KEYS)
+        
+        calibrated = E.score_columns(user, ProfessionalEliteLibrary.scoring_columns(rows))["calibrated"]
+        return np.array([round(value, 1) for value in calibrated.tolist()], dtype=np.float64), special
+    
+    @staticmethod
+    def row_dict(rows: Dict[str, np.ndarray], index: int, gender: str = "未知") -> Dict[str, Any]:
+        """1.20.1.10 單行還原為八字字典（評分所需欄位、夫妻星狀態及神煞加分；忌神按五行次序）"""
+        L = ProfessionalEliteLibrary
+        STEMS = ProfessionalBaziCalculator.STEMS
+        BRANCHES = ProfessionalBaziCalculator.BRANCHES
+        ELEMENT_ORDER = ProfessionalBatchCalculator.ELEMENT_ORDER
+        
+        stems = rows["stems"][index].tolist()
+        branches = rows["branches"][index].tolist()
+        pillars = [STEMS[s] + BRANCHES[b] for s, b in zip(stems, branches)]
+        strength_score = float(rows["strength_score"][index])
+        harmful_mask = int(rows["harmful_mask"][index])
+        spouse = int(rows["spouse_male" if gender == '男' else "spouse_female"][index]) if gender in ('男', '女') else -1
+        return {
+            "year_pillar": pillars[0],
+            "month_pillar": pillars[1],
+            "day_pillar": pillars[2],
+            "hour_pillar": pillars[3],
+            "zodiac": ProfessionalBaziCalculator.ZODIACS[branches[0]],
+            "day_stem": pillars[2][0],
+            "day_stem_element": ProfessionalBaziCalculator.STEM_ELEMENTS.get(pillars[2][0], ""),
+            "hour_confidence": L.CONFIDENCES[int(rows["hour_confidence"][index])],
+            "gender": gender,
+            "birth_year": int(rows["birth_year"][index]),
+            "birth_month": int(rows["birth_month"][index]),
+            "birth_day": int(rows["birth_day"][index]),
+            "birth_hour": int(rows["birth_hour"][index]),
+            "elements": dict(zip(ELEMENT_ORDER, rows["elements"][index].tolist())),
+            "strength_score": strength_score,
+            "day_stem_strength": ProfessionalBaziCalculator._determine_strength_pro(strength_score),
+            "useful_elements": [ELEMENT_ORDER[u] for u in rows["useful"][index].tolist() if u >= 0],
+            "harmful_elements": [e for k, e in enumerate(ELEMENT_ORDER) if harmful_mask >> k & 1],
+            "spouse_star_status": L.SPOUSE_STATUSES[spouse] if spouse >= 0 else "未知",
+            "shen_sha_bonus": float(rows["quality"][index]),
+        }
+    
+    @staticmethod
+    def seeds(start_year: int, end_year: int, gender: str = "通用", limit: int = 500) -> List[Dict[str, Any]]:
+        """
+        1.20.1.11 年份範圍內質量分最高的limit個八字（同分按出生先後），返回精英種子字典
+        鍵：seed_bazi_id（庫內行號）、birth_timestamp、bazi_data、bazi_score_base、primary_element、gender_suitability
+        """
+        L = ProfessionalEliteLibrary
+        bounds = L.row_range(start_year, end_year)
+        if bounds is None:
+            return []
+        first, last = bounds
+        rows = {name: column[first:last] for name, column in L._columns.items()}
+        quality = np.asarray(rows["quality"], dtype=np.float64)
+        order = np.lexsort((np.arange(len(quality)), -quality))[:limit]
+        
+        result = []
+        for index in order.tolist():
+            bazi_data = L.row_dict(rows, index, gender)
+            elements = bazi_data["elements"]
+            result.append({
+                "seed_bazi_id": first + index,
+                "birth_timestamp": datetime(bazi_data["birth_year"], bazi_data["birth_month"],
+                                            bazi_data["birth_day"], bazi_data["birth_hour"]),
+                "bazi_data": bazi_data,
+                "bazi_score_base": bazi_data["shen_sha_bonus"],
+                "primary_element": max(elements, key=elements.get),
+                "gender_suitability": gender,
+            })
+        return result
+# 🔖 1.20 精英八字庫結束
+
+# 🔖 1.21 命令行入口開始
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """
+    1.21.1 命令行入口 - python new_calculator.py elite-build [目錄]
+    部署構建階段（railway.json buildCommand）生成精英八字庫，目錄預設PC.ELITE_LIBRARY_PATH；返回退出碼
+    """
+    args = list(sys.argv[1:] if argv is None else argv)
+    if not args or args[0] != "elite-build" or len(args) > 2:
+        print("用法: python new_calculator.py elite-build [目錄]", file=sys.stderr)
+        return 2
+    
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    path = args[1] if len(args) > 1 else PC.ELITE_LIBRARY_PATH
+    started = time.monotonic()
+    count = ProfessionalEliteLibrary.build(path)
+    print(f"精英八字庫已生成: {path}（{PC.ELITE_START_YEAR}-{PC.ELITE_END_YEAR}年，{count}個八字，"
+          f"耗時{time.monotonic() - started:.1f}秒）")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
+# 🔖 1.21 命令行入口結束
+
 # 🔖 文件信息
 # 引用文件：texts.py
 # 被引用文件：bot.py, bazi_soulmate.py, admin_service.py
@@ -2744,6 +5248,20 @@ BaziFormatters = ProfessionalFormatters
 # 1.5 國師級實戰判局引擎（核心重構）
 # 1.6 主入口函數
 # 1.7 統一格式化工具類
+# 1.8 批量八字計算引擎
+# 1.9 干支日曆預計算表
+# 1.10 八字排盤緩存
+# 1.11 夏令時區間索引
+# 1.12 均時差預計算表
+# 1.13 緊湊八字物件
+# 1.14 干支關係矩陣
+# 1.15 配對評分特徵檔
+# 1.16 一對多批量配對評分
+# 1.17 配對分數上界
+# 1.18 配對結果緩存
+# 1.19 配對數值明細
+# 1.20 精英八字庫
+# 1.21 命令行入口
 
 # 🔖 修正紀錄
 # 2026-02-08: 全面重構為國師級實戰判局引擎
@@ -2754,4 +5272,27 @@ BaziFormatters = ProfessionalFormatters
 # 2026-02-08: 針對20組測試案例逐個優化，確保100%命中預期分數範圍
 # 2026-02-10: 修正缺失的AI_ANALYSIS_PROMPTS引用，改為從texts.py導入
 # 2026-02-10: 修正編號emoji為純文字編號（1. 2. 3. 等）
-# 2026-02-10: 保持所有功能完整，修正文本格式錯誤
\ No newline at end of file
+# 2026-10-16: 新增1.8批量八字計算引擎及calculate_bazi_batch接口，向量化時間校正與五行累加
+# 2026-10-16: 新增1.9干支日曆預計算表（1900-2100，int8 mmap），取代每次排盤兩次sxtwl.fromSolar
+# 2026-10-16: 新增1.10八字排盤LRU緩存（預設關閉，容量上限，複製隔離），calculate_bazi_pro可選用
+# 2026-10-16: 新增審計日誌級別off/summary/full（PC.AUDIT_*），關閉時不構建任何審計字串，批量路徑固定關閉
+# 2026-10-16: 新增1.11夏令時區間索引（按地區註冊，bisect/向量化查找），取代每次排盤最多68次strptime
+# 2026-10-16: 新增1.12均時差預計算表（每日一值，按時刻線性插值），單個與批量時間計算共用，範圍外回退公式
+# 2026-10-16: 新增1.13緊湊八字物件BaziChart（__slots__，干支整數索引，五行浮點陣列，to_dict延後分析）
+# 2026-10-16: 新增1.14干支關係矩陣（沖害合三合矩陣、三刑位元遮罩），PC關係判斷、評分引擎及搜尋改為查表
+# 2026-10-16: 深度分析拆分為評分階段與延後階段（analysis=scoring），complete_analysis()首次需要時補算，格式化前自動補齊
+# 2026-10-16: 新增calculate_pillars排盤快速路徑（analysis=pillars，只算四柱、五行、身強弱），complete_analysis可逐級補算
+# 2026-10-16: 新增1.15配對評分特徵檔ScoringProfile（每個八字建立一次並緩存），配對評分改為合成兩個特徵檔
+# 2026-10-16: 配對評分新增detail=score模式（PC.DETAIL_*），只返回分數、結構類型及評級，各步驟不構建文字細節
+# 2026-10-16: 新增1.17配對分數上界及upper_bound_score接口（部分資料按最有利情況估算，可採納上界供剪枝）
+# 2026-10-16: 特殊案例改為資料登記表（A方年月日柱+B方年柱打包整數鍵，一次字典查找），批量評分整欄判斷
+# 2026-10-16: 新增1.20精英八字庫（1925-2025每日×十二時辰評分欄位，欄式.npy mmap載入，年份偏移索引切片，支援向量化評分及精英種子）
+# 2026-10-16: 新增scoring_signature對外接口，個人資料更新時判斷配對分數是否可能改變
+# 2026-10-16: 新增1.19 MatchBreakdown固定長度數值明細（結構編號、各項分數、特徵旗標），完整及批量配對結果附breakdown欄位
+# 2026-10-16: 新增八字等價類（四柱＋出生年＋信心度）：to_dicts(dedupe=True)每類只分析一次，share_analysis複製結果
+# 2026-10-16: 新增1.18配對結果LRU+TTL緩存（雙方評分簽名有序為鍵，預設開啟），calculate_match_pro經緩存計算
+# 2026-10-16: 新增1.16一對多批量配對評分及calculate_match_many接口（NumPy逐步向量化，分數與calculate_match逐位一致）
+# 2026-10-16: ScoringProfile改為模組內緩存（以所讀欄位值為鍵），不再寫入八字字典；原地修改八字後自動重建
+# 2026-10-16: 均時差插值結果落在取整邊界附近時（單個及批量）改用公式，真太陽時與逐個公式計算完全一致
+# 2026-02-10: 保持所有功能完整，修正文本格式錯誤
+# 2026-10-16: 精英八字庫自動生成（BAZI_ELITE_AUTO_BUILD）預設關閉；新增命令行入口 python new_calculator.py elite-build，於部署構建階段生成
@@ -438,6 +438,575 @@ def run_single_test(test_number):
         import traceback
         traceback.print_exc()
 
+def run_batch_check(sample_size=500):
+    """批量排盤一致性檢查 - 隨機生日逐個比對calculate_bazi_batch與calculate_bazi"""
+    import random
+    
+    try:
+        from new_calculator import calculate_bazi, calculate_bazi_batch, ProfessionalBatchCalculator
+    except ImportError as e:
+        print(f"❌ 導入失敗: {e}")
+        return False
+    
+    print(f"🔍 批量排盤一致性檢查: {sample_size} 組隨機生日")
+    
+    # 覆蓋子時換日、分鐘缺失、夏令時年份、不同經度和信心度
+    rng = random.Random(20261016)
+    rows = []
+    for _ in range(sample_size):
+        rows.append({
+            'year': rng.randint(1925, 2030),
+            'month': rng.randint(1, 12),
+            'day': rng.randint(1, 28),
+            'hour': rng.choice([0, 22, 23, rng.randint(0, 23)]),
+            'minute': rng.choice([None, 0, 59, rng.randint(0, 59)]),
+            'longitude': rng.choice([114.17, 120.0, 87.6, 121.5, 135.0]),
+            'gender': rng.choice(['男', '女']),
+            'hour_confidence': rng.choice(['高', '中', '低', '估算'])
+        })
+    
+    start_time = time.time()
+    columns = calculate_bazi_batch(
+        [r['year'] for r in rows], [r['month'] for r in rows],
+        [r['day'] for r in rows], [r['hour'] for r in rows],
+        minutes=[r['minute'] for r in rows],
+        longitudes=[r['longitude'] for r in rows],
+        genders=[r['gender'] for r in rows],
+        confidences=[r['hour_confidence'] for r in rows]
+    )
+    batch_charts = ProfessionalBatchCalculator.to_dicts(columns)
+    batch_time = time.time() - start_time
+    
+    start_time = time.time()
+    mismatches = 0
+    for row, batch_chart in zip(rows, batch_charts):
+        single_chart = calculate_bazi(**row)
+        single_chart.pop('audit_log', None)
+        batch_chart = {k: v for k, v in batch_chart.items() if k != 'audit_log'}
+        if single_chart != batch_chart:
+            mismatches += 1
+            if mismatches <= 3:
+                diff_keys = [k for k in single_chart if single_chart[k] != batch_chart.get(k)]
+                print(f"  ❌ 不一致: {row} 欄位: {diff_keys}")
+    single_time = time.time() - start_time
+    
+    print(f"   批量: {batch_time:.2f}秒  逐個: {single_time:.2f}秒  加速: {single_time / max(batch_time, 1e-9):.1f}倍")
+    if mismatches:
+        print(f"❌ {mismatches}/{sample_size} 組結果不一致")
+        return False
+    print(f"✅ {sample_size} 組結果完全一致")
+    return True
+
+def run_eot_check(sample_size=20000, tolerance=0.01):
+    """均時差預計算表檢查 - 隨機時刻比對插值結果與天文公式，並比較兩者速度"""
+    import random
+    
+    try:
+        from new_calculator import PC, ProfessionalTimeProcessor, ProfessionalEquationOfTimeTable
+    except ImportError as e:
+        print(f"❌ 導入失敗: {e}")
+        return False
+    
+    print(f"🔍 均時差預計算表檢查: {sample_size} 個隨機時刻（容差 {tolerance} 分鐘）")
+    
+    rng = random.Random(20261016)
+    rows = [
+        (rng.randint(PC.CALENDAR_START_YEAR, PC.CALENDAR_END_YEAR), rng.randint(1, 12),
+         rng.randint(1, 28), rng.randint(0, 23), rng.randint(0, 59))
+        for _ in range(sample_size)
+    ]
+    ProfessionalEquationOfTimeTable.lookup(*rows[0])  # 先生成表，不計入計時
+    
+    start_time = time.time()
+    formula_values = [ProfessionalTimeProcessor._equation_of_time_formula(*row) for row in rows]
+    formula_time = time.time() - start_time
+    
+    start_time = time.time()
+    table_values = [ProfessionalEquationOfTimeTable.lookup(*row) for row in rows]
+    table_time = time.time() - start_time
+    
+    errors = [abs(a - b) for a, b in zip(formula_values, table_values)]
+    max_error = max(errors)
+    worst = rows[errors.index(max_error)]
+    
+    print(f"   公式: {formula_time * 1e6 / sample_size:.2f}微秒/次  查表: {table_time * 1e6 / sample_size:.2f}微秒/次  "
+          f"加速: {formula_time / max(table_time, 1e-9):.1f}倍")
+    print(f"   最大誤差: {max_error:.5f}分鐘 {worst}  平均誤差: {sum(errors) / sample_size:.5f}分鐘")
+    if max_error > tolerance:
+        print(f"❌ 最大誤差超出容差 {tolerance} 分鐘")
+        return False
+    print("✅ 均時差預計算表誤差在容差之內")
+    return True
+
+def run_many_check(sizes=(1000, 10000, 100000)):
+    """一對多批量配對檢查 - calculate_match_many與逐個calculate_match分數逐位比對，並比較速度"""
+    import random
+    
+    try:
+        from new_calculator import calculate_bazi, calculate_match, calculate_match_many, ProfessionalMatchCache
+        from new_calculator import calculate_bazi_batch, ProfessionalBatchCalculator, ScoringProfile, PC
+        from admin_service import ADMIN_TEST_CASES
+    except ImportError as e:
+        print(f"❌ 導入失敗: {e}")
+        return False
+    
+    mismatches = 0
+    
+    # 20組測試案例（含特殊案例回退路徑）
+    for test_case in ADMIN_TEST_CASES:
+        charts = []
+        for data in (test_case['bazi_data1'], test_case['bazi_data2']):
+            charts.append(calculate_bazi(
+                data['year'], data['month'], data['day'], data['hour'], data['gender'],
+                hour_confidence=data.get('hour_confidence', '高'), minute=data.get('birth_minute', 0),
+                longitude=data.get('longitude', 114.17)
+            ))
+        single = calculate_match(charts[0], charts[1], charts[0]['gender'], charts[1]['gender'])
+        batch = calculate_match_many(charts[0], [charts[1]], charts[0]['gender'], charts[1]['gender'], details=True)
+        if batch['scores'][0] != single['score'] or any(single[k] != v for k, v in batch['details'][0].items()):
+            mismatches += 1
+            print(f"  ❌ 測試案例不一致: {test_case['description'][:30]} {single['score']} vs {batch['scores'][0]}")
+    print(f"🔍 {len(ADMIN_TEST_CASES)} 組測試案例: {'✅ 一致' if not mismatches else '❌ 不一致'}")
+    
+    # 每個候選都是獨立生成的八字字典（不循環重用），避免特徵檔及配對結果緩存令計時失真
+    rng = random.Random(20261016)
+    count = max(sizes) + 1
+    columns = calculate_bazi_batch(
+        [rng.randint(1940, 2010) for _ in range(count)], [rng.randint(1, 12) for _ in range(count)],
+        [rng.randint(1, 28) for _ in range(count)], [rng.randint(0, 23) for _ in range(count)],
+        minutes=[rng.randint(0, 59) for _ in range(count)],
+        genders=[rng.choice(['男', '女']) for _ in range(count)]
+    )
+    pool = ProfessionalBatchCalculator.to_dicts(columns, analysis=PC.ANALYSIS_SCORING)
+    user = pool[0]
+    
+    for size in sizes:
+        candidates = pool[1:size + 1]
+        
+        ScoringProfile.clear_cache()
+        start_time = time.time()
+        scores = calculate_match_many(user, candidates, user['gender'], '女')['scores']
+        many_time = time.time() - start_time
+        
+        # 逐個計算不經配對結果緩存，並清空批量評分留下的特徵檔
+        match_cache_enabled = ProfessionalMatchCache.is_enabled()
+        ProfessionalMatchCache.configure(enabled=False)
+        ScoringProfile.clear_cache()
+        start_time = time.time()
+        single_scores = [calculate_match(user, c, user['gender'], '女')['score'] for c in candidates]
+        single_time = time.time() - start_time
+        ProfessionalMatchCache.configure(enabled=match_cache_enabled)
+        
+        size_mismatches = sum(1 for a, b in zip(single_scores, scores.tolist()) if a != b)
+        mismatches += size_mismatches
+        print(f"   {size:>6d} 個候選  批量: {many_time:.3f}秒  逐個: {single_time:.3f}秒  "
+              f"加速: {single_time / max(many_time, 1e-9):.1f}倍  不一致: {size_mismatches}")
+    
+    if mismatches:
+        print(f"❌ {mismatches} 組分數不一致")
+        return False
+    print("✅ 一對多批量配對分數完全一致")
+    return True
+
+def run_bound_check(user_count=20, candidate_count=300):
+    """配對分數上界檢查 - 各種部分資料下upper_bound_score不得低於calculate_match真實分數"""
+    import random
+    
+    try:
+        from new_calculator import calculate_bazi, calculate_pillars, calculate_match, upper_bound_score
+        from bazi_soulmate import SoulmateFinder
+    except ImportError as e:
+        print(f"❌ 導入失敗: {e}")
+        return False
+    
+    print(f"🔍 配對分數上界檢查: {user_count} 個用戶 × {candidate_count} 個候選")
+    
+    rng = random.Random(20261016)
+    
+    def random_birth():
+        return (rng.randint(1940, 2010), rng.randint(1, 12), rng.randint(1, 28), rng.randint(0, 23))
+    
+    users = [calculate_bazi(*random_birth(), gender=rng.choice(['男', '女'])) for _ in range(user_count)]
+    births = [random_birth() for _ in range(candidate_count)]
+    full_charts = [calculate_bazi(*birth, gender='女') for birth in births]
+    pillar_charts = [calculate_pillars(*birth, gender='女') for birth in births]
+    
+    # 部分資料級別：只有年柱、年月柱、三柱加出生年、四柱五行（排盤快速路徑）、完整八字
+    levels = {
+        '年柱': lambda i: {'year_pillar': full_charts[i]['year_pillar']},
+        '年月柱': lambda i: {k: full_charts[i][k] for k in ('year_pillar', 'month_pillar')},
+        '三柱+出生年': lambda i: {k: full_charts[i][k] for k in ('year_pillar', 'month_pillar', 'day_pillar', 'birth_year')},
+        '四柱+五行': lambda i: dict(pillar_charts[i]),
+        '完整八字': lambda i: dict(full_charts[i]),
+    }
+    violations = {name: 0 for name in levels}
+    bound_sums = {name: 0.0 for name in levels}
+    final_violations = 0
+    true_sum = 0.0
+    pairs = 0
+    
+    for user in users:
+        for i in range(candidate_count):
+            true_score = calculate_match(user, full_charts[i], user['gender'], '女')['score']
+            true_sum += true_score
+            pairs += 1
+            for name, partial in levels.items():
+                bound = upper_bound_score(user, partial(i))
+                bound_sums[name] += bound
+                if bound < true_score:
+                    violations[name] += 1
+            
+            # 搜尋最終分數上界（四柱+五行資料）不得低於calculate_final_score
+            final_bound = SoulmateFinder.final_score_upper_bound(user, dict(pillar_charts[i]))
+            final_score, _ = SoulmateFinder.calculate_final_score(user, dict(full_charts[i]), user['gender'], '女')
+            if final_bound < final_score:
+                final_violations += 1
+    
+    print(f"   真實分數平均: {true_sum / pairs:.1f}")
+    for name in levels:
+        mark = "✅" if not violations[name] else "❌"
+        print(f"   {mark} {name:<8s} 上界平均: {bound_sums[name] / pairs:5.1f}  低於真實分數: {violations[name]}")
+    print(f"   {'✅' if not final_violations else '❌'} 搜尋最終分數上界 低於真實分數: {final_violations}")
+    
+    if any(violations.values()) or final_violations:
+        print("❌ 上界不可採納")
+        return False
+    print(f"✅ {pairs} 組配對上界全部不低於真實分數")
+    return True
+
+GOLDEN_CORPUS_PATH = os.getenv(
+    "BAZI_GOLDEN_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "golden_corpus.npz")
+)
+# 隨代碼提交的基準語料：性能優化系列之前的版本錄製的前2000對結果，作為回歸比對的標準答案
+# 舊版供養明細按集合次序輸出（隨雜湊種子變化），該欄位以排序後內容比對（unordered_keys）
+GOLDEN_BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "golden_baseline.npz")
+
+def _golden_digest(result, keys=None, unordered=()):
+    """
+    黃金語料摘要 - 結果字典（略去審計日誌及內部緩存欄位）的32位摘要，任何欄位變化都會改變摘要
+    keys指定時只取這些欄位（與舊版錄製的語料比對，新增欄位不計入）；unordered中的列表欄位排序後再摘要
+    """
+    import hashlib
+    
+    items = sorted((k, sorted(v) if k in unordered else v) for k, v in result.items()
+                   if k != 'audit_log' and not k.startswith('_') and (keys is None or k in keys))
+    return int.from_bytes(hashlib.blake2b(repr(items).encode('utf-8'), digest_size=4).digest(), 'little')
+
+def _golden_births(pair_count, seed=20261016):
+    """黃金語料出生資料 - 固定種子生成 pair_count 對（1925–2025年，含分鐘、經度、信心度變化）"""
+    import calendar
+    import random
+    
+    rng = random.Random(seed)
+    births = []
+    for i in range(pair_count * 2):
+        year = rng.randint(1925, 2025)
+        month = rng.randint(1, 12)
+        births.append({
+            'year': year,
+            'month': month,
+            'day': rng.randint(1, calendar.monthrange(year, month)[1]),
+            'hour': rng.randint(0, 23),
+            'minute': rng.randint(0, 59),
+            'longitude': rng.choice([114.17, 120.0, 87.6, 121.5, 135.0]),
+            'gender': '男' if i % 2 == 0 else '女',
+            'hour_confidence': rng.choice(['高', '中', '低', '估算'])
+        })
+    return births
+
+def _latency_summary(label, durations):
+    """計時摘要 - 每秒次數及每次p50/p99（微秒）"""
+    import numpy as np
+    
+    values = np.asarray(durations)
+    print(f"   {label}: {len(values) / max(values.sum(), 1e-9):,.0f}次/秒  "
+          f"p50: {np.percentile(values, 50) * 1e6:.1f}微秒  p99: {np.percentile(values, 99) * 1e6:.1f}微秒")
+
+def run_golden_check(record=False, pair_count=100000, path=GOLDEN_CORPUS_PATH):
+    """
+    黃金語料回歸及性能基準 - 固定種子大量出生資料對，逐個calculate_bazi及calculate_match
+    record=True時把分數、結構類型及排盤/配對結果摘要寫入黃金文件；否則與黃金文件比對分數漂移，並報告吞吐量
+    摘要只比對黃金文件錄製時已有的欄位（chart_keys/match_keys），之後新增的欄位不算漂移
+    """
+    import numpy as np
+    
+    try:
+        from new_calculator import calculate_bazi, calculate_match, ProfessionalChartCache, ProfessionalMatchCache
+    except ImportError as e:
+        print(f"❌ 導入失敗: {e}")
+        return False
+    
+    golden = None
+    chart_keys = match_keys = None
+    unordered = ()
+    if not record:
+        if not os.path.exists(path):
+            print(f"❌ 黃金文件不存在: {path}（先運行 python simple_test.py golden record）")
+            return False
+        golden = np.load(path)
+        pair_count = int(golden['pair_count'])
+        if 'chart_keys' in golden.files:
+            chart_keys = set(golden['chart_keys'].tolist())
+            match_keys = set(golden['match_keys'].tolist())
+        if 'unordered_keys' in golden.files:
+            unordered = set(golden['unordered_keys'].tolist())
+    
+    print(f"🔍 黃金語料{'錄製' if record else '回歸'}: {pair_count} 對出生資料  文件: {path}")
+    births = _golden_births(pair_count)
+    
+    # 關閉緩存，計時反映真實計算量
+    chart_cache_enabled = ProfessionalChartCache.is_enabled()
+    match_cache_enabled = ProfessionalMatchCache.is_enabled()
+    ProfessionalChartCache.configure(enabled=False)
+    ProfessionalMatchCache.configure(enabled=False)
+    try:
+        charts = []
+        chart_times = []
+        for birth in births:
+            start_time = time.perf_counter()
+            charts.append(calculate_bazi(**birth))
+            chart_times.append(time.perf_counter() - start_time)
+        chart_digests = np.array([_golden_digest(chart, chart_keys) for chart in charts],
+                                 dtype=np.uint32).reshape(-1, 2)
+        
+        matches = []
+        match_times = []
+        for i in range(0, len(charts), 2):
+            start_time = time.perf_counter()
+            matches.append(calculate_match(charts[i], charts[i + 1], charts[i]['gender'], charts[i + 1]['gender']))
+            match_times.append(time.perf_counter() - start_time)
+    finally:
+        ProfessionalChartCache.configure(enabled=chart_cache_enabled)
+        ProfessionalMatchCache.configure(enabled=match_cache_enabled)
+    
+    scores = np.array([match['score'] for match in matches], dtype=np.float64)
+    structures = np.array([match.get('structure_type', '') for match in matches])
+    match_digests = np.array([_golden_digest(match, match_keys, unordered) for match in matches], dtype=np.uint32)
+    
+    _latency_summary("排盤", chart_times)
+    _latency_summary("配對", match_times)
+    
+    if record:
+        chart_keys = sorted(k for k in charts[0] if k != 'audit_log' and not k.startswith('_'))
+        match_keys = sorted(k for k in matches[0] if k != 'audit_log' and not k.startswith('_'))
+        np.savez_compressed(path, pair_count=pair_count, scores=scores, structures=structures,
+                            chart_digests=chart_digests, match_digests=match_digests,
+                            chart_keys=np.array(chart_keys), match_keys=np.array(match_keys))
+        print(f"✅ 已錄製 {pair_count} 對結果（{os.path.getsize(path) / 1024:.0f}KB）")
+        return True
+    
+    score_drift = scores != golden['scores']
+    structure_drift = structures != golden['structures']
+    chart_drift = (chart_digests != golden['chart_digests']).any(axis=1)
+    match_drift = match_digests != golden['match_digests']
+    
+    print(f"   分數漂移: {int(score_drift.sum())}  結構類型變化: {int(structure_drift.sum())}  "
+          f"排盤結果變化: {int(chart_drift.sum())}  配對結果變化: {int(match_drift.sum())}")
+    if score_drift.any():
+        print(f"   最大分數漂移: {np.abs(scores - golden['scores']).max():.4f}")
+    for i in np.flatnonzero(score_drift | structure_drift | chart_drift | match_drift)[:3]:
+        print(f"  ❌ 第{i}對: {births[2 * i]} × {births[2 * i + 1]}  "
+              f"分數 {golden['scores'][i]} → {scores[i]}  結構 {golden['structures'][i]} → {structures[i]}")
+    
+    if score_drift.any() or structure_drift.any() or chart_drift.any() or match_drift.any():
+        print("❌ 結果與黃金文件不一致")
+        return False
+    print(f"✅ {pair_count} 對排盤及配對結果與黃金文件完全一致")
+    return True
+
+def run_soulmate_check(years=5, user_count=3, verify_years=1):
+    """
+    窮舉搜尋檢查 - verify_years年範圍內enumerate_top_matches的Top結果須與全部候選逐個評分的真正Top（每日一個）完全一致，
+    兩次搜尋結果相同（結果可重現）、進度回調最後回報的最高分等於結果最高分，並報告years年範圍的搜尋耗時（與抽樣搜尋比較）
+    """
+    import random
+    
+    try:
+        from new_calculator import calculate_bazi
+        from bazi_soulmate import SoulmateFinder, BRANCH_HOURS, SEARCH_MODE_SAMPLED, SEARCH_MODE_EXHAUSTIVE
+    except ImportError as e:
+        print(f"❌ 導入失敗: {e}")
+        return False
+    
+    print(f"🔍 窮舉搜尋檢查: {user_count} 個用戶  驗證範圍: {verify_years}年  計時範圍: {years}年")
+    
+    rng = random.Random(20261016)
+    failures = 0
+    for _ in range(user_count):
+        birth = (rng.randint(1960, 2000), rng.randint(1, 12), rng.randint(1, 28), rng.randint(0, 23))
+        gender = rng.choice(['男', '女'])
+        target_gender = '女' if gender == '男' else '男'
+        user = calculate_bazi(*birth, gender=gender)
+        start_year = rng.randint(1960, 2000)
+        purpose = rng.choice(['正緣', '合夥'])
+        
+        # 真正Top：全部候選逐個評分（未封頂分數），每日只取最高分時辰，同分按出生日期時辰先後；顯示分數封頂
+        date_hours = [(year, month, day, hour)
+                      for year, month, day in SoulmateFinder.generate_date_range(start_year, start_year + verify_years - 1)
+                      for hour in BRANCH_HOURS]
+        charts = SoulmateFinder.calculate_charts(date_hours, target_gender)
+        matches = SoulmateFinder.calculate_base_matches(user, charts, gender, target_gender)
+        scored = [(-SoulmateFinder.calculate_final_score(user, chart, gender, target_gender, purpose, match,
+                                                         capped=False)[0], index)
+                  for index, (chart, match) in enumerate(zip(charts, matches)) if chart]
+        expected = []
+        seen_days = set()
+        for score, index in sorted(scored):
+            if date_hours[index][:3] not in seen_days and len(expected) < 10:
+                seen_days.add(date_hours[index][:3])
+                expected.append((date_hours[index], round(SoulmateFinder.display_score(-score), 6)))
+        
+        found = SoulmateFinder.enumerate_top_matches(user, gender, start_year, start_year + verify_years - 1, purpose, 10)
+        actual = [((match['bazi']['birth_year'], match['bazi']['birth_month'], match['bazi']['birth_day'],
+                    match['bazi']['birth_hour']), round(match['score'], 6)) for match in found]
+        if actual != expected:
+            failures += 1
+            print(f"  ❌ 用戶{birth} {purpose}: 窮舉Top與逐個評分不一致")
+            print(f"     預期: {expected[:3]}")
+            print(f"     實際: {actual[:3]}")
+        
+        start_time = time.perf_counter()
+        first = SoulmateFinder.find_top_matches(user, gender, start_year, start_year + years - 1, purpose, limit=5,
+                                                mode=SEARCH_MODE_EXHAUSTIVE)
+        exhaustive_time = time.perf_counter() - start_time
+        events = []
+        second = SoulmateFinder.find_top_matches(user, gender, start_year, start_year + years - 1, purpose, limit=5,
+                                                 mode=SEARCH_MODE_EXHAUSTIVE,
+                                                 progress=lambda *event: events.append(event))
+        start_time = time.perf_counter()
+        sampled = SoulmateFinder.find_top_matches(user, gender, start_year, start_year + years - 1, purpose, limit=5,
+                                                  mode=SEARCH_MODE_SAMPLED)
+        sampled_time = time.perf_counter() - start_time
+        
+        if [(m['date'], m['hour'], m['score']) for m in first] != [(m['date'], m['hour'], m['score']) for m in second]:
+            failures += 1
+            print(f"  ❌ 用戶{birth} {purpose}: 兩次窮舉搜尋結果不同")
+        if not events or (second and events[-1][3] != second[0]['score']):
+            failures += 1
+            print(f"  ❌ 用戶{birth} {purpose}: 進度回調未回報或最後最高分與結果不符 {events[-1:]}")
+        if sampled and first and sampled[0]['score'] > first[0]['score']:
+            failures += 1
+            print(f"  ❌ 用戶{birth} {purpose}: 抽樣最高分{sampled[0]['score']:.1f} 高於窮舉{first[0]['score']:.1f}")
+        print(f"   用戶{birth} {purpose} {start_year}-{start_year + years - 1}: "
+              f"窮舉 {exhaustive_time:.2f}秒 最高{first[0]['score'] if first else 0:.1f}分  "
+              f"抽樣 {sampled_time:.2f}秒 最高{sampled[0]['score'] if sampled else 0:.1f}分")
+    
+    if failures:
+        print(f"❌ {failures} 項檢查失敗")
+        return False
+    print("✅ 窮舉搜尋結果與逐個評分的真正Top一致，且可重現")
+    return True
+
+def run_elite_check(user_count=5):
+    """
+    精英八字庫檢查 - 比較精英庫（python new_calculator.py elite-build生成）切片評分與即時排盤窮舉的Top結果，
+    兩者須完全一致，並報告精英庫搜尋20年範圍的耗時
+    """
+    import random
+    
+    try:
+        from new_calculator import calculate_bazi, PC, ProfessionalEliteLibrary
+        from bazi_soulmate import SoulmateFinder
+    except ImportError as e:
+        print(f"❌ 導入失敗: {e}")
+        return False
+    
+    if not ProfessionalEliteLibrary.is_available():
+        print(f"❌ 精英八字庫不存在: {PC.ELITE_LIBRARY_PATH}（先運行 python new_calculator.py elite-build）")
+        return False
+    
+    print(f"🔍 精英八字庫檢查: {user_count} 個用戶")
+    rng = random.Random(20261016)
+    library_path = PC.ELITE_LIBRARY_PATH
+    failures = 0
+    for _ in range(user_count):
+        birth = (rng.randint(1960, 2000), rng.randint(1, 12), rng.randint(1, 28), rng.randint(0, 23))
+        gender = rng.choice(['男', '女'])
+        user = calculate_bazi(*birth, gender=gender)
+        purpose = rng.choice(['正緣', '合夥'])
+        year = rng.randint(PC.ELITE_START_YEAR, PC.ELITE_END_YEAR)
+        
+        library = SoulmateFinder.enumerate_top_matches(user, gender, year, year, purpose, 20)
+        PC.ELITE_LIBRARY_PATH = os.devnull
+        ProfessionalEliteLibrary.reload()
+        try:
+            live = SoulmateFinder.enumerate_top_matches(user, gender, year, year, purpose, 20)
+        finally:
+            PC.ELITE_LIBRARY_PATH = library_path
+            ProfessionalEliteLibrary.reload()
+        
+        if [(m['date'], m['hour'], m['score']) for m in library] != [(m['date'], m['hour'], m['score']) for m in live]:
+            failures += 1
+            print(f"  ❌ 用戶{birth} {purpose} {year}年: 精英庫與即時排盤結果不一致")
+        
+        start_year = min(max(year, PC.ELITE_START_YEAR), PC.ELITE_END_YEAR - 19)
+        start_time = time.perf_counter()
+        SoulmateFinder.enumerate_top_matches(user, gender, start_year, start_year + 19, purpose, 5)
+        print(f"   用戶{birth} {purpose}: {year}年結果一致={not failures}  "
+              f"{start_year}-{start_year + 19}年精英庫搜尋 {time.perf_counter() - start_time:.3f}秒")
+    
+    if failures:
+        print(f"❌ {failures} 個用戶結果不一致")
+        return False
+    print("✅ 精英庫切片評分與即時排盤窮舉結果完全一致")
+    return True
+
+def run_parallel_check(worker_counts=(2, 3), user_count=3, years=5):
+    """
+    並行搜尋檢查 - 不用精英庫（即時排盤），不同進程數的parallel_top_matches結果須與單進程窮舉完全一致，並報告耗時
+    """
+    import random
+    
+    os.environ["BAZI_ELITE_PATH"] = os.devnull  # 子進程以spawn啟動，經環境變數關閉精英庫
+    try:
+        import bazi_soulmate
+        from new_calculator import calculate_bazi, PC, ProfessionalEliteLibrary
+        from bazi_soulmate import SoulmateFinder
+    except ImportError as e:
+        print(f"❌ 導入失敗: {e}")
+        return False
+    PC.ELITE_LIBRARY_PATH = os.devnull
+    ProfessionalEliteLibrary.reload()
+    
+    print(f"🔍 並行搜尋檢查: 進程數 {worker_counts}  {user_count} 個用戶 × {years}年範圍")
+    rng = random.Random(20261016)
+    cases = []
+    for _ in range(user_count):
+        birth = (rng.randint(1960, 2000), rng.randint(1, 12), rng.randint(1, 28), rng.randint(0, 23))
+        gender = rng.choice(['男', '女'])
+        start_year = rng.randint(1960, 2000)
+        cases.append((calculate_bazi(*birth, gender=gender), gender, start_year, rng.choice(['正緣', '合夥'])))
+    
+    def key(matches):
+        return [(m['date'], m['hour'], m['score']) for m in matches]
+    
+    failures = 0
+    serial = []
+    for user, gender, start_year, purpose in cases:
+        start_time = time.perf_counter()
+        serial.append(key(SoulmateFinder.enumerate_top_matches(user, gender, start_year, start_year + years - 1, purpose, 10)))
+        print(f"   單進程: {time.perf_counter() - start_time:.2f}秒")
+    
+    for workers in worker_counts:
+        bazi_soulmate.SEARCH_WORKERS = workers
+        bazi_soulmate.warm_search_pool()
+        for (user, gender, start_year, purpose), expected in zip(cases, serial):
+            start_time = time.perf_counter()
+            actual = key(SoulmateFinder.parallel_top_matches(user, gender, start_year, start_year + years - 1, purpose, 10))
+            elapsed = time.perf_counter() - start_time
+            if actual != expected:
+                failures += 1
+                print(f"  ❌ {workers}個進程 {start_year}年起 {purpose}: 結果與單進程不一致")
+            else:
+                print(f"   {workers}個進程: {elapsed:.2f}秒")
+    bazi_soulmate.shutdown_search_pool()
+    
+    if failures:
+        print(f"❌ {failures} 次並行搜尋結果不一致")
+        return False
+    print("✅ 不同進程數的並行搜尋結果與單進程窮舉完全一致")
+    return True
+
 def main():
     """主函數"""
     print("🔧 八字配對系統 - 本地測試工具")
@@ -471,6 +1040,42 @@ def main():
             except ValueError:
                 print("❌ 請輸入有效的測試編號")
                 return
+        elif command == "batch":
+            sample_size = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+            ok = run_batch_check(sample_size)
+            sys.exit(0 if ok else 1)
+        elif command == "eot":
+            sample_size = int(sys.argv[2]) if len(sys.argv) > 2 else 20000
+            ok = run_eot_check(sample_size)
+            sys.exit(0 if ok else 1)
+        elif command == "many":
+            sizes = tuple(int(n) for n in sys.argv[2:]) or (1000, 10000, 100000)
+            ok = run_many_check(sizes)
+            sys.exit(0 if ok else 1)
+        elif command == "bound":
+            ok = run_bound_check()
+            sys.exit(0 if ok else 1)
+        elif command == "golden":
+            args = sys.argv[2:]
+            if args[:1] == ["record"]:
+                pair_count = int(args[1]) if len(args) > 1 else 100000
+                ok = run_golden_check(True, pair_count)
+            elif args[:1] == ["local"]:
+                ok = run_golden_check(path=GOLDEN_CORPUS_PATH)
+            else:
+                ok = run_golden_check(path=GOLDEN_BASELINE_PATH)
+            sys.exit(0 if ok else 1)
+        elif command == "soulmate":
+            years = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+            ok = run_soulmate_check(years)
+            sys.exit(0 if ok else 1)
+        elif command == "elite":
+            ok = run_elite_check()
+            sys.exit(0 if ok else 1)
+        elif command == "parallel":
+            worker_counts = tuple(int(n) for n in sys.argv[2:]) or (2, 3)
+            ok = run_parallel_check(worker_counts)
+            sys.exit(0 if ok else 1)
         elif command == "help":
             print_help()
             return
@@ -499,6 +1104,16 @@ def print_help():
     print("  python simple_test.py              # 運行所有測試")
     print("  python simple_test.py list         # 列出所有測試案例")
     print("  python simple_test.py single <編號>  # 運行單個測試案例")
+    print("  python simple_test.py batch [數量]  # 批量排盤與逐個計算一致性檢查")
+    print("  python simple_test.py eot [數量]    # 均時差預計算表誤差與速度檢查")
+    print("  python simple_test.py many [規模...] # 一對多批量配對一致性與速度檢查")
+    print("  python simple_test.py bound        # 配對分數上界可採納性檢查")
+    print("  python simple_test.py golden       # 與隨代碼提交的基準語料比對（分數漂移）及吞吐量、p50/p99基準")
+    print("  python simple_test.py golden record [對數] # 以當前代碼錄製本地黃金語料（排盤及配對結果摘要）")
+    print("  python simple_test.py golden local # 與本地黃金語料比對")
+    print("  python simple_test.py soulmate [年數] # 窮舉搜尋真正Top、可重現性及耗時檢查")
+    print("  python simple_test.py elite         # 檢查精英庫切片評分與即時排盤一致")
+    print("  python simple_test.py parallel [進程數...] # 並行搜尋與單進程窮舉一致性及耗時檢查")
     print("  python simple_test.py help         # 顯示此幫助信息")
     print()
     print("示例:")
@@ -2,7 +2,7 @@
 # -*- coding: utf-8 -*-
 """
 真命天子搜索服務 - 處理搜索最佳八字匹配
-最後更新: 2026年1月31日
+最後更新: 2026年10月16日
 """
 
 import logging
@@ -10,6 +10,7 @@ from typing import Dict, List, Optional, Tuple
 from datetime import datetime
 from database.db_manager import DatabaseManager
 from core.scoring_engine import ScoringEngine
+from new_calculator import ProfessionalEliteLibrary
 from config.constants import (
     SOULMATE_YEAR_RANGE, DAILY_SOULMATE_LIMIT,
     THRESHOLD_GOOD_MATCH, THRESHOLD_EXCELLENT_MATCH, THRESHOLD_PERFECT_MATCH
@@ -65,10 +66,11 @@ class SoulmateService:
             search_gender = self._get_search_gender(user_gender, purpose)
             
             # ========== 1.4 從精英庫獲取候選 ==========
-            candidates = self.db_manager.get_elite_bazi_seeds(
+            # 精英庫為預計算欄式文件（見new_calculator 1.20），按質量分取前500個，請求時不排盤
+            candidates = ProfessionalEliteLibrary.seeds(
                 start_year=start_year,
                 end_year=end_year,
-                gender_suitability=search_gender,
+                gender=search_gender,
                 limit=500
             )
             
@@ -297,6 +297,7 @@ ADMIN_MENU_TEXT = """
 /stats - 查看系統統計
 /quicktest - 系統健康檢查
 /listtests - 列出測試案例
+/cachestats - 排盤及配對結果緩存統計（[chart|match] on/off/clear/reset）
 """
 # ========1.3 功能選單文本結束 ========#
 
@@ -376,6 +377,21 @@ FIND_SOULMATE_CALCULATING_TEXT = """
 🔍 搜索範圍：約{date_count}個日期
 """
 
+FIND_SOULMATE_PROGRESS_TEXT = """
+⚡ 正在掃描{start_year}-{end_year}年內所有出生時空...\n
+⏳ 目前階段：{stage}\n
+🔍 已掃描：{scanned:,}/{total:,}個八字（{percent}%）\n
+🏆 目前最高分：{best}
+"""
+
+FIND_SOULMATE_STAGE_TEXTS = {
+    "charting": "排盤",
+    "scoring": "配對評分",
+    "merging": "合併分區結果"
+}
+
+FIND_SOULMATE_BEST_PENDING_TEXT = "計算中"
+
 FIND_SOULMATE_NO_RESULTS_TEXT = """
 ❌ 在{start_year}-{end_year}年內未找到合適的匹配時空。\n
 建議：\n
@@ -392,6 +408,8 @@ FIND_SOULMATE_SEARCH_ERROR_TEXT = """
 
 FIND_SOULMATE_CANCELLED_TEXT = "已取消真命天子搜尋。"
 
+FIND_SOULMATE_ALREADY_RUNNING_TEXT = "⏳ 你的真命天子搜尋仍在進行中，完成後會自動發送結果，請稍候。"
+
 FIND_SOULMATE_COMPLETE_TEXT = "✅ 搜尋完成！找到 {count} 個匹配時空。"
 
 FIND_SOULMATE_RESULT_TEMPLATE = """🔮 真命天子搜尋結果
@@ -561,6 +579,8 @@ QUICK_TEST_FAILED_TEXT = "❌ 快速測試失敗: {error}"
 LIST_TESTS_IMPORT_ERROR_TEXT = "❌ 導入測試案例失敗: {error}"
 
 LIST_TESTS_FAILED_TEXT = "❌ 列出測試失敗: {error}"
+
+CACHE_STATS_FAILED_TEXT = "❌ 獲取緩存統計失敗: {error}"
 # ========1.7 管理員文本結束 ========#
 
 # 🔖 文件信息
@@ -577,5 +597,8 @@ LIST_TESTS_FAILED_TEXT = "❌ 列出測試失敗: {error}"
 # 1.7 管理員文本
 
 # 🔖 修正紀錄
+# 2026-10-16: 新增 FIND_SOULMATE_PROGRESS_TEXT、FIND_SOULMATE_STAGE_TEXTS、FIND_SOULMATE_BEST_PENDING_TEXT 及 FIND_SOULMATE_ALREADY_RUNNING_TEXT，真命天子背景搜尋進度訊息
+# 2026-10-16: /cachestats 說明加入配對結果緩存（match）參數
+# 2026-10-16: 新增 CACHE_STATS_FAILED_TEXT 及 /cachestats 管理員命令說明
 # 2026-02-10: 新增 AI_ANALYSIS_PROMPTS 常量，用於提供AI分析提示
 # 2026-02-10: 保持所有其他文本不變，只新增缺失的常量
\ No newline at end of file